@@ -1,7 +1,7 @@
 """
 Task configuration editor module.
 Handles the detailed parameter entry for individual training sets, 
-including Pacer synchronization logic and JSON data persistence.
+including Pacer synchronization logic and persistence in the training repository.
 """
 
 import sys
@@ -10,11 +10,12 @@ from PyQt5.QtWidgets import QWidget, QMainWindow, QApplication, QPushButton, QHB
     QSizePolicy, QTextEdit, QPlainTextEdit, QLayout, QSpacerItem, QScrollArea, QLineEdit, QComboBox
 from PyQt5.QtGui import QPainter, QLinearGradient, QColor, QIcon, QPixmap, QPen, QBrush
 from PyQt5.QtCore import Qt, QSize, QTimer, QPoint
-from app_config import PROJECT_PATH
+from app_config import DATA_ROOT
 
 # Input modules for touch-interface compatibility
 from virtual_keyboard import VirtualKeyboard
 from numeric_keyboard import NumericKeyboard
+from training_repository import get_repository
 
 import math
 import time
@@ -197,7 +198,7 @@ class AddTask(QWidget):
 
     def save_button_clicked(self):
         """
-        Serializes form data into a JSON file for the specific training plan.
+        Stores form data as a task of the specific training plan.
         """
         task_data = {
             "task_name": self.task_name.text() if self.task_name.text() else self.default_task_name,
@@ -209,10 +210,9 @@ class AddTask(QWidget):
             "block_reps": self.block_rep.text() if self.block_rep.text() else "1",
             "pacer": self.pace_limit.currentText()
         }
-        # File I/O: Writing task configuration to disk
-        path = f"{PROJECT_PATH}/planned_trainings/{self.training_name}/{self.default_task_name}.json"
-        with open(path, 'w') as task_file:
-            json.dump(task_data, task_file, indent=4)
+        # Repository write: one row per task, keyed by the number in "Task N"
+        task_number = int(self.default_task_name.split()[-1])
+        get_repository().save_task(self.training_name, task_number, task_data)
 
         self.close()
 
@@ -229,7 +229,7 @@ class AddTask(QWidget):
         """Loads customized physiological heart rate zones from global config."""
         self.hear_rate.addItem("None")
         try:
-            with open(f"{PROJECT_PATH}/hr_zones.json", "r") as file:
+            with open(f"{DATA_ROOT}/hr_zones.json", "r") as file:
                 data = json.load(file)
                 for zone, range_val in data.items():
                     self.hear_rate.addItem(f"{zone} {range_val}")
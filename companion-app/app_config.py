@@ -1,10 +1,18 @@
 
 from PyQt5.QtWidgets import QApplication
 import sys
+import os
 from PyQt5.QtGui import QPainter, QLinearGradient, QColor, QIcon, QPixmap
 
 PROJECT_PATH = "/home/tomraspberry/Inteligent_training_asistant/aplikacja_python"
 
+###----------------------------DATA STORAGE ----------------------------###
+
+# Trainings, sessions, database and HR zones (persistent, on the SD card by default)
+DATA_ROOT = os.environ.get("SWIM_DATA_ROOT", PROJECT_PATH)
+# Working copy of the running session in RAM (tmpfs); empty writes straight to DATA_ROOT
+RUNTIME_ROOT = os.environ.get("SWIM_RUNTIME_ROOT", "/dev/shm/swim_assistant" if os.path.isdir("/dev/shm") else "")
+
 ###----------------------------FONT SIZES ----------------------------###
 
 FONT_1 = "29"
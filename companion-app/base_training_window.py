@@ -1,10 +1,9 @@
 """
 Base graphical engine for training sessions.
 Provides the shared infrastructure for Pace Clock rendering, BLE telemetry acquisition,
-and dynamic task description loading from JSON.
+and task descriptions of the preloaded training plan.
 """
 
-import json
 import sys
 from app_config import PROJECT_PATH, RETURN_BUTTON_STYLE, PARAMETERS_STYLE, LABELS_STYLE, TEXT_EDIT_STYLE, START_BUTTON_STYLE, END_BUTTON_STYLE
 from PyQt5.QtWidgets import QWidget, QMainWindow, QApplication, QPushButton, QHBoxLayout, QVBoxLayout, QLabel, \
@@ -12,7 +11,9 @@ from PyQt5.QtWidgets import QWidget, QMainWindow, QApplication, QPushButton, QHB
 from PyQt5.QtGui import QPainter, QLinearGradient, QColor, QIcon, QPixmap, QPen, QFont
 from PyQt5.QtCore import Qt, QSize, QTimer, QRect
 
-import bluetooth_connection
+from telemetry_hub import get_hub
+from session_recorder import is_valid_sample
+from training_plan import TrainingPlan
 import math
 import os
 
@@ -22,7 +23,7 @@ class GeneralTaskWindow(QWidget):
     Manages the split-screen layout: real-time stats/task details on the left, 
     and the analog-style Pace Clock on the right.
     """
-    def __init__(self, training_directory):
+    def __init__(self, training_directory, plan=None):
         super().__init__()
 
         # --- Display Configuration ---
@@ -33,6 +34,9 @@ class GeneralTaskWindow(QWidget):
         self.setGeometry(0, 0, self.available_width, self.available_height)
         self.setCursor(Qt.BlankCursor) # Hide cursor for embedded touch use
         self.current_training_directory = training_directory
+        self.training_name = os.path.basename(training_directory)
+        # Parsed once when the training is chosen and shared by all its windows
+        self.plan = plan if plan is not None else TrainingPlan.load(training_directory)
 
         # --- Metric Display Components ---
         self.heart_rate_button = QPushButton(self)
@@ -44,12 +48,7 @@ class GeneralTaskWindow(QWidget):
 
         # --- Task State Data ---
         self.task_number = 1
-        self.num_reps = ""
-        self.distance = ""
-        self.description = ""
-        self.time_limit = ""
-        self.target_hr = ""
-        self.block_reps = ""
+        self.task_record = None # TaskRecord of task_number
 
         # --- Descriptive UI Windows ---
         self.details_text_window = QTextEdit()
@@ -97,9 +96,8 @@ class GeneralTaskWindow(QWidget):
         self.emoji_timer.start(1000)
         self.emoji_timer.timeout.connect(self.toggle_emoji_size)
 
-        # BLE data polling timer (1Hz)
-        self.parameters_timer = QTimer(self)
-        self.parameters_timer.timeout.connect(self.update_parameters)
+        # BLE telemetry subscription (display only; the session recorder does the logging)
+        self.telemetry_hub = get_hub()
 
         # Available button sizes
         self.big_button = (int(self.available_width / 6), int(self.available_height / 8))
@@ -110,7 +108,7 @@ class GeneralTaskWindow(QWidget):
         self.get_task_info()
         self.set_task_info()
         self.init_ui()
-        self.parameters_timer.start(1000)
+        self.start_telemetry()
 
     def paintEvent(self, event):
         """
@@ -221,28 +219,26 @@ class GeneralTaskWindow(QWidget):
         self.details_text_window.setStyleSheet(TEXT_EDIT_STYLE)
 
     def set_task_info(self):
-        """Populates text windows with data parsed from the session JSON."""
+        """Populates text windows with the current task record."""
         self.details_text_window.clear()
         self.target_heart_rate_window.clear()
         self.time_limit_window.clear()
+        task = self.task_record
+        if task is None:
+            return
         
-        if self.num_reps:
-            self.task_label.setText(f" {self.num_reps} x {self.distance}m")
+        if task.reps:
+            self.task_label.setText(f" {task.reps} x {task.meters}m")
         
-        self.details_text_window.append(self.description)
+        self.details_text_window.append(task.description)
         self.details_text_window.append("\n")
         
-        if int(self.block_reps) >= 2:    
+        if task.block_reps >= 2:    
             self.details_text_window.append("---------------------------------------")
-            self.details_text_window.append(f"Repeat Everything {self.block_reps} times")
+            self.details_text_window.append(f"Repeat Everything {task.block_reps} times")
         
-        if ":" in self.target_hr:
-            hr_value = self.target_hr.split(":")[1]
-            self.target_heart_rate_window.append(f"Target HR:       {hr_value}")
-        else:
-            self.target_heart_rate_window.append(f"Target HR:       {self.target_hr}")
-            
-        self.time_limit_window.append(f"Time limit:    {self.time_limit}")
+        self.target_heart_rate_window.append(f"Target HR:       {task.target_hr_text}")
+        self.time_limit_window.append(f"Time limit:    {task.time_limit_text}")
         self.details_text_window.setAlignment(Qt.AlignCenter)
 
     def layout_settings(self):
@@ -278,39 +274,37 @@ class GeneralTaskWindow(QWidget):
             button.setIconSize(QSize(size, size))
 
     def get_task_info(self):
-        """Filesystem read: extracts current task metadata from the training folder."""
-        current_task = f"Task {self.task_number}.json"
+        """Selects the current task of the preloaded plan (no disk access)."""
+        try:
+            self.task_record = self.plan.task(self.task_number)
+        except KeyError as e: print(f"Task Read Error: {e}")
+
+    def start_telemetry(self):
+        """Subscribes the window to push-based telemetry updates."""
+        self.telemetry_hub.sample_received.connect(self.update_parameters)
+        self.telemetry_hub.connection_changed.connect(self.connection_changed)
+
+    def stop_telemetry(self):
+        """Unsubscribes from telemetry; called when the window closes."""
         try:
-            with open(f"{self.current_training_directory}/{current_task}", 'r') as f:
-                task_data = json.load(f)
-                self.num_reps = task_data['ammount_reps']
-                self.distance = task_data['meters']
-                self.description = task_data["detailed_description"]
-                self.time_limit = task_data["time_limit"]
-                self.target_hr = task_data["target_heart_rate"]
-                self.block_reps = task_data["block_reps"]
-        except Exception as e: print(f"JSON Read Error: {e}")
-
-    def update_parameters(self):
+            self.telemetry_hub.sample_received.disconnect(self.update_parameters)
+            self.telemetry_hub.connection_changed.disconnect(self.connection_changed)
+        except TypeError: pass # Already disconnected
+
+    def update_parameters(self, latest):
         """
-        Retrieves real-time telemetry from the BLE manager.
-        Performs data validation and logs valid physiological points to disk.
+        Slot for TelemetryHub.sample_received: shows the newest sample.
+        Logging happens once per session in the SessionRecorder, not per window.
         """
-        latest = getattr(bluetooth_connection, "latest_values", {})
-        bpm = latest.get("bpm")
-        spo2 = latest.get("spo2")
-
-        if bpm is not None and spo2 is not None:
-            # Range validation for clinical/athletic plausibility
-            if 30 <= bpm <= 220 and 50 <= spo2 <= 100:
-                self.heart_rate_button.setText(f"{int(bpm)}")
-                self.saturation_button.setText(f"{int(spo2)}%")
-                # Persistent logging for post-training analytics
-                with open(f"{self.current_training_directory}/training_data.txt", "a") as file:
-                    file.write(f"{bpm},{spo2}\n")
-            else:
-                self.heart_rate_button.setText("--")
-                self.saturation_button.setText("--")
+        if is_valid_sample(latest):
+            self.heart_rate_button.setText(f"{int(latest.bpm)}")
+            self.saturation_button.setText(f"{int(latest.spo2)}%")
         else:
             self.heart_rate_button.setText("--")
-            self.saturation_button.setText("--")
\ No newline at end of file
+            self.saturation_button.setText("--")
+
+    def connection_changed(self, connected):
+        """Blanks the metrics while the sensor link is down."""
+        if not connected:
+            self.heart_rate_button.setText("--")
+            self.saturation_button.setText("--")
@@ -0,0 +1,93 @@
+"""
+Buzzer sequencer benchmark.
+Plays countdowns (3 short beeps and a long one) on the simulated backend and
+reports the cost of a beep call and the error of every pin edge against its
+schedule, next to the previous approach of one threading.Timer per beep.
+No GPIO is needed.
+
+Usage: python benchmark_buzzer.py [--countdowns N]
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+from buzzer import LONG_BEEP, SHORT_BEEP, BuzzerSequencer, SimulatedBackend
+
+
+def countdown_schedule(start):
+    """(monotonic start, pattern) of a 3-2-1-GO countdown."""
+    return [(start + 0.0, SHORT_BEEP), (start + 1.0, SHORT_BEEP), (start + 2.0, SHORT_BEEP), (start + 3.0, LONG_BEEP)]
+
+
+def expected_edges(schedule):
+    edges = []
+    for start, (duration,) in schedule:
+        edges += [(start, True), (start + duration, False)]
+    return edges
+
+
+def edge_errors_ms(recorded, expected):
+    recorded = [edge for edge in recorded if edge[0] >= expected[0][0] - 0.5]
+    return [(actual - wanted) * 1000 for (actual, _), (wanted, _) in zip(recorded, expected)]
+
+
+def run_sequencer(countdowns):
+    backend = SimulatedBackend()
+    sequencer = BuzzerSequencer(backend)
+    call_us, errors = [], []
+    threads = threading.active_count()
+    for _ in range(countdowns):
+        schedule = countdown_schedule(time.monotonic() + 0.2)
+        backend.edges.clear()
+        for start, pattern in schedule:
+            # Called when the beep is due, like the timing engine does
+            while time.monotonic() < start:
+                time.sleep(0.0002)
+            started = time.perf_counter()
+            sequencer.play(pattern, at=start)
+            call_us.append((time.perf_counter() - started) * 1e6)
+        time.sleep(1.2)
+        errors += edge_errors_ms(backend.edges, expected_edges(schedule))
+    extra_threads = threading.active_count() - threads
+    sequencer.close()
+    return call_us, errors, extra_threads
+
+
+def run_timer_threads(countdowns):
+    """The previous implementation: pin on in the caller, a new Timer thread turns it off."""
+    backend = SimulatedBackend()
+    call_us, errors = [], []
+    for _ in range(countdowns):
+        schedule = countdown_schedule(time.monotonic() + 0.2)
+        backend.edges.clear()
+        for start, (duration,) in schedule:
+            while time.monotonic() < start:
+                time.sleep(0.0002)
+            started = time.perf_counter()
+            backend.set(True)
+            threading.Timer(duration, backend.set, args=(False,)).start()
+            call_us.append((time.perf_counter() - started) * 1e6)
+        time.sleep(1.2)
+        errors += edge_errors_ms(backend.edges, expected_edges(schedule))
+    return call_us, errors, None
+
+
+def report(name, call_us, errors, extra_threads):
+    absolute = sorted(abs(error) for error in errors)
+    print(f"{name:<16} call median {statistics.median(call_us):7.1f} us   "
+          f"edge error median {statistics.median(absolute):6.3f} ms  p95 {absolute[int(0.95 * (len(absolute) - 1))]:6.3f} ms  "
+          f"max {absolute[-1]:6.3f} ms" + ("" if extra_threads is None else f"   threads +{extra_threads}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--countdowns", type=int, default=5)
+    args = parser.parse_args()
+    report("sequencer", *run_sequencer(args.countdowns))
+    report("timer per beep", *run_timer_threads(args.countdowns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Session logging benchmark.
+Compares the old open-append-close per sample logging with SessionRecorder on a
+throttled filesystem that adds SD-card-like latency to every syscall, and
+reports the time the caller (the GUI thread) is blocked and the syscall count.
+
+Usage: python benchmark_session_recorder.py [--samples N] [--interval S]
+                                            [--open-ms MS] [--write-ms MS] [--fsync-ms MS]
+"""
+
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+import session_recorder
+from sample_buffer import Sample
+from session_recorder import SessionRecorder
+
+syscalls = Counter()
+delays = {"open": 0.005, "write": 0.002, "fsync": 0.02, "close": 0.001}
+
+
+class ThrottledRawFile(io.FileIO):
+    """Unbuffered file whose syscalls are counted and slowed down."""
+    def __init__(self, path, mode):
+        syscalls["open"] += 1
+        time.sleep(delays["open"])
+        super().__init__(path, mode)
+
+    def write(self, data):
+        syscalls["write"] += 1
+        time.sleep(delays["write"])
+        return super().write(data)
+
+    def close(self):
+        if not self.closed:
+            syscalls["close"] += 1
+            time.sleep(delays["close"])
+        super().close()
+
+
+def throttled_open(path, mode):
+    """Text-mode open() on top of ThrottledRawFile."""
+    return io.TextIOWrapper(io.BufferedWriter(ThrottledRawFile(path, mode)), encoding="utf-8")
+
+
+_real_fsync = os.fsync
+
+def throttled_fsync(fd):
+    syscalls["fsync"] += 1
+    time.sleep(delays["fsync"])
+    _real_fsync(fd)
+
+
+def make_samples(count):
+    start = time.monotonic()
+    return [Sample(start + index, 60 + index % 100, 97, 80, 3.9, index) for index in range(count)]
+
+
+def run_per_sample(path, samples, interval):
+    """Baseline: what update_parameters used to do for every sample."""
+    blocked = []
+    for sample in samples:
+        started = time.perf_counter()
+        with throttled_open(path, "a") as file:
+            file.write(f"{sample.bpm},{sample.spo2},{sample.timestamp:.3f}\n")
+        blocked.append(time.perf_counter() - started)
+        time.sleep(interval)
+    return blocked, 0.0
+
+
+def run_recorder(path, samples, interval, fsync):
+    recorder = SessionRecorder(path, flush_interval_s=max(0.1, interval * 50), fsync=fsync, opener=throttled_open)
+    blocked = []
+    for sample in samples:
+        started = time.perf_counter()
+        recorder.record_samples([sample])
+        blocked.append(time.perf_counter() - started)
+        time.sleep(interval)
+    started = time.perf_counter()
+    recorder.close()
+    return blocked, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between samples")
+    parser.add_argument("--open-ms", type=float, default=5.0)
+    parser.add_argument("--write-ms", type=float, default=2.0)
+    parser.add_argument("--fsync-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    delays.update({"open": args.open_ms / 1000, "write": args.write_ms / 1000, "fsync": args.fsync_ms / 1000})
+    session_recorder.os.fsync = throttled_fsync
+    samples = make_samples(args.samples)
+
+    scenarios = [
+        ("per-sample open/append", lambda path: run_per_sample(path, samples, args.interval)),
+        ("SessionRecorder", lambda path: run_recorder(path, samples, args.interval, fsync=False)),
+        ("SessionRecorder+fsync", lambda path: run_recorder(path, samples, args.interval, fsync=True)),
+    ]
+
+    print(f"{'approach':<24} {'mean ms':>8} {'p99 ms':>8} {'max ms':>8} {'close ms':>8} "
+          f"{'open':>5} {'write':>6} {'fsync':>6} {'close':>6}")
+    for name, scenario in scenarios:
+        syscalls.clear()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "training_data.txt")
+            blocked, closing = scenario(path)
+            with open(path) as file:
+                assert sum(1 for _ in file) == len(samples)
+
+        blocked_ms = sorted(1000 * value for value in blocked)
+        print(f"{name:<24} {statistics.mean(blocked_ms):>8.3f} {blocked_ms[int(0.99 * (len(blocked_ms) - 1))]:>8.3f} "
+              f"{blocked_ms[-1]:>8.3f} {closing * 1000:>8.1f} {syscalls['open']:>5} {syscalls['write']:>6} "
+              f"{syscalls['fsync']:>6} {syscalls['close']:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Pluggable BLE transport layer.
+BleakTransport talks to real wearables; SimulatedTransport hosts in-process fake
+peripherals so acquisition, reconnects and latency can be exercised without a radio.
+"""
+
+import asyncio
+import random
+from abc import ABC, abstractmethod
+import time
+from collections import deque
+from bleak import BleakClient, BleakScanner
+
+import telemetry_protocol
+from interval_timeline import EVENT_KINDS, PACER, IntervalProgram
+
+
+class Transport(ABC):
+    """
+    Interface used by DeviceManager to reach wearables.
+
+    Clients returned by create_client() must offer the BleakClient subset used by
+    DeviceSession: connect(), disconnect(), is_connected, read_gatt_char(),
+    write_gatt_char() and start_notify().
+    """
+    @abstractmethod
+    async def resolve(self, address):
+        """Maps an address to a connectable device object (None if not found)."""
+
+    @abstractmethod
+    def create_client(self, device, disconnected_callback):
+        """Builds a client for a resolved device."""
+
+
+class BleakTransport(Transport):
+    """Production transport backed by the Bleak library."""
+    async def resolve(self, address):
+        return await BleakScanner.find_device_by_address(address, timeout=10.0)
+
+    def create_client(self, device, disconnected_callback):
+        return BleakClient(device, disconnected_callback=disconnected_callback)
+
+
+class SimulatedPeripheral:
+    """
+    Fake ESP32 wearable emitting telemetry on its own schedule.
+
+    Models the firmware behaviour the Pi relies on: capability read, format
+    negotiation, the legacy pacer write, interval programs run on the device
+    clock, and a RAM history of sequenced samples that keeps filling while
+    disconnected and can be backfilled.
+    Impairments are configurable:
+    - rate_hz: samples per second (also settable by CMD_SET_RATE),
+    - batch_window_s: how long batched samples may wait (also settable by CMD_SET_RATE),
+    - mtu: negotiated ATT MTU bounding the batch size,
+    - jitter_s: maximum random delay added to each notification,
+    - dropout_rate: link losses per second, each lasting dropout_s,
+    - malformed_rate: fraction of notifications replaced by garbage bytes,
+    - max_format: richest frame format advertised (emulates older firmware),
+    - clock_drift_ppm: how fast the device clock runs against the host clock.
+    """
+    def __init__(self, address, rate_hz=1.0, jitter_s=0.0, dropout_rate=0.0, dropout_s=1.0,
+                 malformed_rate=0.0, max_format=telemetry_protocol.FORMAT_BATCHED, batch_window_s=0.0,
+                 mtu=247, clock_drift_ppm=0.0, seed=None):
+        self.address = address
+        self.rate_hz = rate_hz
+        self.batch_window_s = batch_window_s
+        self.mtu = mtu
+        self.clock_drift_ppm = clock_drift_ppm
+        self.jitter_s = jitter_s
+        self.dropout_rate = dropout_rate
+        self.dropout_s = dropout_s
+        self.malformed_rate = malformed_rate
+        self.max_format = max_format
+        self.random = random.Random(seed)
+
+        # --- Device State ---
+        self.frame_format = telemetry_protocol.FORMAT_CSV
+        self.pacer_seconds = 0
+        self.writes = []
+        self.program_id = 0
+        self.program = None
+        self.program_state = telemetry_protocol.PROGRAM_IDLE
+        self.program_events = [] # Expansion of the loaded program, fired from program_index on
+        self.program_index = 0
+        self.program_origin = 0.0 # Device time of program time 0 while running
+        self.program_frozen_s = 0.0 # Program time while paused
+        self.program_runner = None
+        self.program_client = None
+        self.program_fired = [] # (kind, rep, program time, device time) of every fired event
+        self.down_until = 0.0
+        self.booted_at = time.monotonic()
+        self.next_due = self.booted_at # Sampling clock keeps running while disconnected
+        self.next_seq = 0
+        self.history = deque(maxlen=telemetry_protocol.DEVICE_RING_CAPACITY)
+
+        # --- Measurements ---
+        self.live_due = {} # Scheduled time of every sample delivered in a valid live frame, by sequence number
+        self.sent = 0
+        self.malformed_sent = 0
+        self.dropouts = 0
+
+    def is_reachable(self):
+        return time.monotonic() >= self.down_until
+
+    def device_time(self, host_time):
+        """esp_timer reading (seconds since boot) at a given host monotonic time."""
+        return (host_time - self.booted_at) * (1.0 + self.clock_drift_ppm * 1e-6)
+
+    def record(self, due):
+        """Takes the sample scheduled at `due` and stores it in the history ring."""
+        seq = self.next_seq
+        device_ms = int(self.device_time(due) * 1000)
+        sample = (seq, device_ms, 60 + seq % 120, 97, 80, 3900)
+        self.history.append(sample)
+        self.next_seq += 1
+        return sample
+
+    def handle_write(self, client, data):
+        """GATT write handler: binary commands or the ASCII pacer interval."""
+        self.writes.append(bytes(data))
+        if data and data[0] & telemetry_protocol.FRAME_BINARY_FLAG:
+            if data[0] == telemetry_protocol.CMD_SET_FORMAT and len(data) >= 2:
+                self.frame_format = min(data[1], self.max_format)
+            elif data[0] == telemetry_protocol.CMD_BACKFILL:
+                _, from_seq, count = telemetry_protocol.BACKFILL_COMMAND.unpack(bytes(data))
+                asyncio.ensure_future(self.replay(client, from_seq, count))
+            elif data[0] == telemetry_protocol.CMD_TIME_SYNC:
+                _, token = telemetry_protocol.TIME_SYNC_COMMAND.unpack(bytes(data))
+                asyncio.ensure_future(self.answer_sync(client, token))
+            elif data[0] == telemetry_protocol.CMD_SET_RATE:
+                _, period_ms, window_ms = telemetry_protocol.SET_RATE_COMMAND.unpack(bytes(data))
+                self.rate_hz = 1000.0 / period_ms
+                self.batch_window_s = window_ms / 1000.0
+            elif data[0] == telemetry_protocol.CMD_PROGRAM_LOAD:
+                self.load_program(client, *telemetry_protocol.PROGRAM_LOAD_COMMAND.unpack(bytes(data))[1:])
+            elif data[0] == telemetry_protocol.CMD_PROGRAM_CONTROL:
+                self.control_program(client, *telemetry_protocol.PROGRAM_CONTROL_COMMAND.unpack(bytes(data))[1:])
+        else:
+            self.pacer_seconds = int(data.decode("utf-8") or 0)
+
+    # --- Interval Program Executor (mirrors interval_program.c) ---
+    def load_program(self, client, program_id, prestart_ms, interval_ms, pacer_ms, total_ms, countdown):
+        self.stop_program_runner()
+        reps = (total_ms - prestart_ms) // interval_ms if interval_ms else 0
+        self.program = IntervalProgram(prestart_ms / 1000, interval_ms / 1000, pacer_ms / 1000, reps, countdown)
+        self.program_id = program_id
+        self.program_events = list(self.program.events())
+        self.program_index = 0
+        self.program_frozen_s = 0.0
+        self.program_state = telemetry_protocol.PROGRAM_LOADED
+        self.report_program(client, None, 0, 0.0)
+
+    def control_program(self, client, program_id, action, program_ms, at_device_ms):
+        if program_id != self.program_id or self.program is None:
+            return
+        now = self.device_time(time.monotonic())
+        at = at_device_ms / 1000 if at_device_ms else now
+        program_s = program_ms / 1000
+        self.stop_program_runner()
+        if action == telemetry_protocol.PROGRAM_START:
+            # Events before the start time were gone through before (a resumed task)
+            self.program_index = sum(1 for event in self.program_events if event[0] < program_s)
+        if action in (telemetry_protocol.PROGRAM_START, telemetry_protocol.PROGRAM_RESUME):
+            self.program_origin = at - program_s
+            self.program_state = telemetry_protocol.PROGRAM_RUNNING
+            self.program_client = client
+            self.program_runner = asyncio.ensure_future(self.run_program())
+        elif action == telemetry_protocol.PROGRAM_PAUSE:
+            self.program_frozen_s = program_s
+            self.program_state = telemetry_protocol.PROGRAM_PAUSED
+        elif action == telemetry_protocol.PROGRAM_STOP:
+            self.program_state = telemetry_protocol.PROGRAM_IDLE
+        self.report_program(client, None, 0, program_s)
+
+    def stop_program_runner(self):
+        if self.program_runner is not None:
+            self.program_runner.cancel()
+            self.program_runner = None
+
+    def next_program_event(self):
+        """Next event of the running program; an open-ended program keeps pacing after the start."""
+        if self.program_index < len(self.program_events):
+            return self.program_events[self.program_index]
+        if not self.program.interval_s and self.program.pacer_s:
+            last_time, _, _ = self.program_events[-1]
+            self.program_events.append((last_time + self.program.pacer_s, PACER, 1))
+            return self.program_events[-1]
+        return None
+
+    async def run_program(self):
+        """Fires the program's events on the device clock, with progress reports, independent of the link."""
+        while True:
+            event = self.next_program_event()
+            if event is None:
+                self.program_state = telemetry_protocol.PROGRAM_FINISHED
+                self.report_program(self.program_client, None, 0, self.program_events[-1][0])
+                return
+            time_s, kind, rep = event
+            device_due = self.program_origin + time_s
+            host_due = self.booted_at + device_due / (1.0 + self.clock_drift_ppm * 1e-6)
+            await asyncio.sleep(max(0.0, host_due - time.monotonic()))
+            self.program_index += 1
+            self.program_fired.append((kind, rep, time_s, self.device_time(time.monotonic())))
+            self.report_program(self.program_client, kind, rep, time_s)
+
+    def report_program(self, client, kind, rep, program_s):
+        """Progress notification; lost, like on the device, while nobody is connected."""
+        callback = client.callbacks.get(telemetry_protocol.CHAR_UUID) if client is not None else None
+        if client is None or not client.is_connected or callback is None:
+            return
+        code = telemetry_protocol.PROGRAM_NO_EVENT if kind is None else EVENT_KINDS.index(kind)
+        device_ms = int(self.device_time(time.monotonic()) * 1000)
+        callback(None, telemetry_protocol.PROGRAM_PROGRESS_FRAME.pack(
+            telemetry_protocol.HEADER_PROGRAM_V2, self.program_id, self.program_state, code, rep,
+            int(round(program_s * 1000)), device_ms & 0xFFFFFFFF))
+
+    def make_frame(self, sample):
+        """Encodes a stored sample in the negotiated format."""
+        seq, device_ms, bpm, spo2, battery, millivolts = sample
+        if self.frame_format == telemetry_protocol.FORMAT_SEQUENCED:
+            return telemetry_protocol.SAMPLE_FRAME_V2.pack(telemetry_protocol.HEADER_SAMPLE_V2, *sample)
+        if self.frame_format == telemetry_protocol.FORMAT_BINARY:
+            return telemetry_protocol.SAMPLE_FRAME_V1.pack(
+                telemetry_protocol.HEADER_SAMPLE_V1, bpm, spo2, battery, millivolts)
+        return f"{bpm},{spo2},{battery},{millivolts / 1000:.2f}".encode("utf-8")
+
+    def batch_capacity(self):
+        payload = self.mtu - 3 - telemetry_protocol.BATCH_HEADER.size
+        return max(1, min(32, payload // telemetry_protocol.BATCH_ENTRY.size))
+
+    def make_batch(self, samples):
+        """Encodes pending samples as one batched notification."""
+        first_seq, first_ms = samples[0][0], samples[0][1]
+        header = telemetry_protocol.BATCH_HEADER.pack(telemetry_protocol.HEADER_BATCH_V2, first_seq, first_ms, len(samples))
+        return header + b"".join(telemetry_protocol.BATCH_ENTRY.pack(device_ms - first_ms, *values)
+                                 for _, device_ms, *values in samples)
+
+    async def answer_sync(self, client, token):
+        """Clock sync reply, delayed on both radio legs by up to jitter_s."""
+        await asyncio.sleep(self.random.uniform(0.0, self.jitter_s))
+        device_us = int(self.device_time(time.monotonic()) * 1e6)
+        await asyncio.sleep(self.random.uniform(0.0, self.jitter_s))
+        callback = client.callbacks.get(telemetry_protocol.CHAR_UUID)
+        if client.is_connected and callback is not None:
+            callback(None, telemetry_protocol.TIME_SYNC_FRAME.pack(telemetry_protocol.HEADER_TIME_SYNC_V2, token, device_us))
+
+    async def replay(self, client, from_seq, count):
+        """Backfill response: stored samples of the requested range, then the end marker."""
+        callback = client.callbacks.get(telemetry_protocol.BACKFILL_CHAR_UUID)
+        if callback is None:
+            return
+        replayed = [sample for sample in list(self.history) if from_seq <= sample[0] < from_seq + count]
+        for sample in replayed:
+            await asyncio.sleep(0)
+            if not client.is_connected:
+                return
+            callback(None, telemetry_protocol.SAMPLE_FRAME_V2.pack(telemetry_protocol.HEADER_SAMPLE_V2, *sample))
+        first_seq = replayed[0][0] if replayed else from_seq
+        callback(None, telemetry_protocol.BACKFILL_END_FRAME.pack(
+            telemetry_protocol.HEADER_BACKFILL_END_V2, first_seq, len(replayed)))
+
+    async def stream(self, client, callback):
+        """Notification loop for one connection; ends on disconnect or simulated dropout."""
+        # Samples taken while nobody was connected only go to the history ring
+        while self.next_due + 1.0 / self.rate_hz <= time.monotonic():
+            self.next_due += 1.0 / self.rate_hz
+            self.record(self.next_due)
+
+        batch = []
+        while client.is_connected:
+            period = 1.0 / self.rate_hz
+            self.next_due += period
+            due = self.next_due
+            delay = due - time.monotonic() + self.random.uniform(0.0, self.jitter_s)
+            await asyncio.sleep(max(0.0, delay))
+            sample = self.record(due)
+            if not client.is_connected:
+                return
+
+            if self.dropout_rate and self.random.random() < self.dropout_rate * period:
+                self.dropouts += 1
+                self.down_until = time.monotonic() + self.dropout_s
+                client.drop_link()
+                return
+
+            if self.frame_format == telemetry_protocol.FORMAT_BATCHED:
+                batch.append((sample, due))
+                span = (sample[1] - batch[0][0][1]) / 1000.0
+                if len(batch) < self.batch_capacity() and span + period <= self.batch_window_s:
+                    continue
+                pending, batch = batch, []
+                frame = self.make_batch([queued for queued, _ in pending])
+            else:
+                pending = [(sample, due)]
+                frame = self.make_frame(sample)
+
+            if self.malformed_rate and self.random.random() < self.malformed_rate:
+                self.malformed_sent += 1
+                frame = bytes([frame[0], 0xFF])
+            else:
+                self.live_due.update((queued[0], queued_due) for queued, queued_due in pending)
+            callback(None, frame)
+            self.sent += 1
+
+
+class SimulatedClient:
+    """BleakClient look-alike connected to a SimulatedPeripheral."""
+    def __init__(self, peripheral, disconnected_callback=None):
+        self.peripheral = peripheral
+        self.disconnected_callback = disconnected_callback
+        self.is_connected = False
+        self.callbacks = {}
+        self._stream = None
+
+    async def connect(self, timeout=10.0):
+        if not self.peripheral.is_reachable():
+            await asyncio.sleep(min(timeout, 0.05))
+            raise ConnectionError(f"{self.peripheral.address} out of range")
+        self.peripheral.frame_format = telemetry_protocol.FORMAT_CSV
+        self.is_connected = True
+
+    async def disconnect(self):
+        self.is_connected = False
+        if self._stream is not None:
+            self._stream.cancel()
+
+    def drop_link(self):
+        """Simulated radio loss: reported through the disconnected callback like Bleak does."""
+        self.is_connected = False
+        if self.disconnected_callback is not None:
+            self.disconnected_callback(self)
+
+    async def read_gatt_char(self, uuid):
+        features = 0
+        if self.peripheral.max_format >= telemetry_protocol.FORMAT_BATCHED:
+            features = telemetry_protocol.FEATURE_TIME_SYNC | telemetry_protocol.FEATURE_PROGRAM
+        return bytes([telemetry_protocol.HEADER_INFO_V1, self.peripheral.max_format, features])
+
+    async def write_gatt_char(self, uuid, data, response=True):
+        if not self.is_connected:
+            raise ConnectionError("Not connected")
+        if response:
+            await asyncio.sleep(0) # Yield like a real acknowledged write
+        self.peripheral.handle_write(self, data)
+
+    async def start_notify(self, uuid, callback):
+        self.callbacks[uuid] = callback
+        if uuid == telemetry_protocol.CHAR_UUID:
+            # Progress of a program that kept running through a link loss goes to the new connection
+            self.peripheral.program_client = self
+            self._stream = asyncio.ensure_future(self.peripheral.stream(self, callback))
+
+
+class SimulatedTransport(Transport):
+    """
+    Transport serving SimulatedPeripherals registered by address.
+    Unknown addresses get a default 1 Hz peripheral, so any device ID can be simulated.
+    """
+    def __init__(self, **defaults):
+        self.defaults = defaults
+        self.peripherals = {}
+
+    def add_peripheral(self, address, **options):
+        peripheral = SimulatedPeripheral(address, **{**self.defaults, **options})
+        self.peripherals[address] = peripheral
+        return peripheral
+
+    async def resolve(self, address):
+        if address not in self.peripherals:
+            self.add_peripheral(address)
+        return self.peripherals[address]
+
+    def create_client(self, device, disconnected_callback):
+        return SimulatedClient(device, disconnected_callback)
@@ -1,176 +1,211 @@
 """
 Bluetooth Low Energy (BLE) communication manager.
-Handles background connection to the ESP32 wearable device, data parsing, 
+Handles background connection to the ESP32 wearable devices, data parsing,
 and command transmission for the training assistant.
-"""
 
-import asyncio
-import threading
-from bleak import BleakClient, BleakScanner
+The public API is keyed by device ID; omitting it addresses the swimmer's own
+wearable (DEFAULT_DEVICE_ID), so single-device callers keep working unchanged.
+"""
 
-# --- Global State Management ---
-_ble_client = None
-_ble_thread = None
-_ble_loop = None
-_stop_event = None
-_ble_connected = False
+import telemetry_protocol
+from device_manager import DeviceManager, EVENT_SAMPLE, EVENT_CONNECTION
 
 # --- Hardware Configuration ---
 BLE_NAME = "ESP32C3_BLE"
 ESP_MAC = "94:A9:90:7C:B1:CE"
-CHAR_UUID = "0000ff01-0000-1000-8000-00805f9b34fb"
+CHAR_UUID = telemetry_protocol.CHAR_UUID
+DEFAULT_DEVICE_ID = "default"
 
-# Shared telemetry data structure
-latest_values = {
-    "bpm": None,
-    "spo2": None,
-    "battery": None,
-    "voltage": None
-}
+# --- Global State Management ---
+# One loop thread serves every registered wearable
+_manager = DeviceManager()
+_manager.add_device(DEFAULT_DEVICE_ID, ESP_MAC)
 
-def ble_notification_handler(sender, data):
-    """
-    Asynchronous callback for processing incoming GATT notifications.
-    Parses CSV-formatted string: 'BPM,SpO2,Battery,Voltage'.
-    """
-    try:
-        text = data.decode("utf-8").strip()
-        parts = text.split(",")
-        
-        if len(parts) >= 4:
-            latest_values["bpm"] = int(parts[0])
-            latest_values["spo2"] = int(parts[1])
-            latest_values["battery"] = int(parts[2])
-            latest_values["voltage"] = float(parts[3])
-    except Exception as e:
-        print(f"[BLE Handler Error] {e}")
-
-
-async def _ble_task(stop_event):
+
+def add_listener(callback):
     """
-    Core asyncio task for maintaining the BLE connection lifecycle.
-    Implements automatic reconnection and notification subscription.
+    Registers a callable invoked with (device_id, EVENT_SAMPLE | EVENT_CONNECTION).
+    Callbacks run on the BLE thread, so they must only hand the event over (e.g. emit a Qt signal).
     """
-    global _ble_client, _ble_connected
+    _manager.add_listener(callback)
 
-    while not stop_event.is_set():
-        try:
-            print(f"Connecting to {ESP_MAC}...")
-            client = BleakClient(ESP_MAC)
-            await client.connect(timeout=10.0)
 
-            if not client.is_connected:
-                await asyncio.sleep(2)
-                continue
+def remove_listener(callback):
+    """Unregisters a callable previously passed to add_listener()."""
+    _manager.remove_listener(callback)
 
-            _ble_client = client
-            _ble_connected = True
-            print(f"Connected to {ESP_MAC}")
 
-            # Subscribe to real-time telemetry updates
-            await client.start_notify(CHAR_UUID, ble_notification_handler)
+def start_ble_in_thread():
+    """Spawns the background thread running the asyncio loop for all registered devices."""
+    _manager.start()
 
-            # Keep task alive while connected and stop event not set
-            while not stop_event.is_set() and client.is_connected:
-                await asyncio.sleep(0.5)
 
-            if client.is_connected:
-                await client.disconnect()
+def disconnect_ble():
+    """Signals the BLE thread to terminate; each session closes its connection itself."""
+    _manager.stop()
 
-            _ble_connected = False
-            _ble_client = None
-            print("BLE session closed.")
 
-        except Exception as e:
-            print(f"[BLE Error] {e}")
-            _ble_connected = False
-            await asyncio.sleep(2)
+def connect_device(device_id, address):
+    """Adds another wearable (e.g. a lane mate) to the running acquisition loop."""
+    _manager.add_device(device_id, address)
 
 
-def start_ble_in_thread():
-    """Spawns a dedicated background thread for the asyncio event loop."""
-    global _ble_thread, _ble_loop, _stop_event
+def disconnect_device(device_id):
+    """Disconnects a single wearable and stops tracking it."""
+    _manager.remove_device(device_id)
 
-    if _ble_thread and _ble_thread.is_alive():
-        return
 
-    _stop_event = threading.Event()
+def device_ids():
+    """Returns the IDs of all registered wearables."""
+    return _manager.device_ids()
 
-    def runner():
-        global _ble_loop
-        _ble_loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(_ble_loop)
-        try:
-            _ble_loop.run_until_complete(_ble_task(_stop_event))
-        finally:
-            _ble_loop.close()
 
-    _ble_thread = threading.Thread(target=runner, daemon=True)
-    _ble_thread.start()
-    print("BLE service thread started.")
+def is_connected(device_id=DEFAULT_DEVICE_ID):
+    """Thread-safe check for current BLE link status of a device."""
+    return _manager.session(device_id).is_connected()
 
 
-def disconnect_ble():
-    """Signals the BLE thread to terminate and closes active connections safely."""
-    global _stop_event, _ble_client, _ble_connected
+def link_timeout_s(device_id=DEFAULT_DEVICE_ID):
+    """Telemetry silence after which a device's link counts as lost (see DeviceSession.link_timeout_s)."""
+    return _manager.session(device_id).link_timeout_s()
+
+
+def sample_stream(device_id=DEFAULT_DEVICE_ID):
+    """Returns the SampleRingBuffer of a device for cursor-based reads."""
+    return _manager.session(device_id).samples
 
-    if _stop_event:
-        _stop_event.set()
 
-    if _ble_client and _ble_client.is_connected:
-        try:
-            # Safely schedule disconnect in the background event loop
-            fut = asyncio.run_coroutine_threadsafe(_ble_client.disconnect(), _ble_loop)
-            fut.result(timeout=3)
-        except Exception as e:
-            print(f"[BLE Disconnect Error] {e}")
+def reading_parameters(device_id=DEFAULT_DEVICE_ID):
+    """Returns the newest telemetry Sample or None if no data received."""
+    return sample_stream(device_id).latest()
 
-    _ble_connected = False
-    _ble_client = None
 
+def link_statistics(device_id=DEFAULT_DEVICE_ID):
+    """Reports link-loss recovery times of a device (see DeviceSession.link_statistics)."""
+    return _manager.session(device_id).link_statistics()
 
-def is_connected():
-    """Thread-safe check for current BLE link status."""
-    return _ble_connected
 
+def clock_statistics(device_id=DEFAULT_DEVICE_ID):
+    """Reports the device clock sync estimate: offset, drift and measured sync error."""
+    return _manager.session(device_id).clock_statistics()
 
-def reading_parameters():
-    """Returns the latest telemetry dictionary or None if no data received."""
-    if latest_values["bpm"] is not None:
-        return latest_values
-    return None
 
+def command_statistics(device_id=DEFAULT_DEVICE_ID):
+    """Returns round-trip latency statistics of recent outbound commands."""
+    commands = _manager.session(device_id).commands
+    if commands is None:
+        return {"count": 0, "mean_s": None, "max_s": None}
+    return commands.latency_statistics()
 
-def send_timer_seconds(seconds: int):
+
+def set_sample_rate(rate_hz, batch_window_s=0.0, device_id=DEFAULT_DEVICE_ID):
     """
-    Transmits an integer value to the ESP32 to set the buzzer interval.
-    Utilizes GATT write with response.
+    Sets how often the wearable samples the sensor and how long samples may be
+    held to share one notification (fewer radio wake-ups at higher rates).
+
+    Args:
+        rate_hz (float): Samples per second (0.2 - 10 Hz).
+        batch_window_s (float): Maximum batching delay, 0 sends every sample at once.
+        device_id (str): Target wearable.
+
+    Returns:
+        concurrent.futures.Future: resolves once the command is written (None if deferred to the next connect).
     """
-    global _ble_client, _ble_loop, _ble_connected
+    return _manager.session(device_id).set_sample_rate(rate_hz, batch_window_s)
 
-    if not _ble_connected or _ble_client is None:
-        print("[BLE Write Error] No active connection.")
-        return
 
+def send_timer_seconds(seconds: int, response=True, device_id=DEFAULT_DEVICE_ID):
+    """
+    Transmits an integer value to the ESP32 to set the buzzer interval.
+    Non-blocking: the write is queued on the BLE event loop and a newer pacer
+    value replaces one that has not been written yet (last write wins).
+
+    Args:
+        seconds (int): Pacer interval, 0 stops the pacer.
+        response (bool): False uses write-without-response (no link-layer acknowledgement).
+        device_id (str): Target wearable.
+
+    Returns:
+        concurrent.futures.Future: resolves with the write round-trip latency in seconds.
+    """
     # Convert to UTF-8 string as expected by the ESP32 GATT callback
     data_to_send = str(seconds).encode("utf-8")
 
-    try:
-        # Cross-thread communication: injecting coroutine into the BLE thread loop
-        future = asyncio.run_coroutine_threadsafe(
-            _ble_client.write_gatt_char(CHAR_UUID, data_to_send, response=True), 
-            _ble_loop
-        )
-        future.result(timeout=2) 
-        print(f"Buzzer interval set to: {seconds}s")
-    except Exception as e:
-        print(f"[BLE Write Error] {e}")
+    future = _manager.session(device_id).send_command(data_to_send, key="pacer", response=response)
+    future.add_done_callback(lambda f: _report_pacer_write(f, device_id, seconds))
+    return future
+
+
+def _report_pacer_write(future, device_id, seconds):
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        print(f"[BLE Write Error] {device_id}: {future.exception()}")
+    elif future.result() is not None:
+        print(f"Buzzer interval set to: {seconds}s on {device_id} ({future.result() * 1000:.0f} ms)")
+
+
+def upload_program(program, device_id=DEFAULT_DEVICE_ID):
+    """
+    Uploads a task's interval program; the wearable then beeps its countdown cues,
+    send-offs, pacer and end on its own clock, so only start/pause/resume/stop
+    cross the radio afterwards.
+
+    Args:
+        program (IntervalProgram): Program of the task (see interval_timeline).
+        device_id (str): Target wearable.
+
+    Returns:
+        int: Program id for control_program(), or None if the wearable is not
+        connected or its firmware only has the legacy pacer (send_timer_seconds).
+    """
+    program_id, future = _manager.session(device_id).load_program(
+        program.prestart_s, program.interval_s, program.pacer_s, program.total_s, program.countdown_s)
+    if future is not None:
+        future.add_done_callback(lambda f: _report_command_write(f, device_id, f"program {program_id} upload"))
+    return program_id
+
+
+def control_program(program_id, action, program_s=0.0, at=None, device_id=DEFAULT_DEVICE_ID):
+    """
+    Starts, pauses, resumes or stops an uploaded program (non-blocking).
+
+    Args:
+        program_id (int): Id returned by upload_program().
+        action (int): telemetry_protocol.PROGRAM_START / PROGRAM_PAUSE / PROGRAM_RESUME / PROGRAM_STOP.
+        program_s (float): Task clock time at the moment of the action.
+        at (float): time.monotonic() of the action; once the device clock is synced the
+            wearable applies it at that instant, so the radio delay does not shift the program.
+        device_id (str): Target wearable.
+
+    Returns:
+        concurrent.futures.Future: resolves with the write round-trip latency in seconds.
+    """
+    future = _manager.session(device_id).control_program(program_id, action, program_s, at)
+    future.add_done_callback(lambda f: _report_command_write(f, device_id, f"program {program_id} action {action}"))
+    return future
+
+
+def program_progress(device_id=DEFAULT_DEVICE_ID):
+    """
+    Newest progress report of the program running on the wearable.
+
+    Returns:
+        tuple: (program_id, state, event kind code or None, rep, program time in seconds,
+        host monotonic time of the report) or None before the first report.
+    """
+    return _manager.session(device_id).program_progress
+
+
+def _report_command_write(future, device_id, description):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"[BLE Write Error] {device_id}: {description}: {future.exception()}")
 
 if __name__ == "__main__":
     # Test script for standalone verification
     import time
     start_ble_in_thread()
-    
+
     try:
         while True:
             data = reading_parameters()
@@ -178,4 +213,4 @@ if __name__ == "__main__":
                 print(f"Data stream: {data}")
             time.sleep(1)
     except KeyboardInterrupt:
-        disconnect_ble()
\ No newline at end of file
+        disconnect_ble()
@@ -1,45 +1,185 @@
 """
 Hardware abstraction layer for the base station buzzer.
-Provides asynchronous audio signaling for training events using RPi.GPIO.
+Provides asynchronous audio signaling for training events: one long-lived
+sequencer thread plays beep patterns (alternating on/off durations) from a
+schedule, with precise sleeps, instead of starting a timer thread per beep.
+Overlapping patterns are merged (or replace what is pending), so beeps never
+race each other on the pin. Without RPi.GPIO (or with SWIM_BUZZER=sim) a
+simulated backend records the pin edges, so the sequencer runs on any Linux box.
 """
 
-import RPi.GPIO as GPIO
+import os
 import threading
 import time
 
 # --- GPIO Configuration ---
 BUZZER_PIN = 17
 
-# Initialize GPIO settings
-GPIO.setmode(GPIO.BCM)
-# Active-low configuration: HIGH = Off, LOW = On
-GPIO.setup(BUZZER_PIN, GPIO.OUT, initial=GPIO.HIGH)
+# --- Beep Patterns (seconds on, off, on, ...) ---
+SHORT_BEEP = (0.1,)
+LONG_BEEP = (1.0,)
 
-def buzzer_on():
-    """Activates the buzzer (active-low state)."""
-    GPIO.output(BUZZER_PIN, GPIO.LOW)
+# --- Sequencer Timing ---
+SPIN_S = 0.0005  # Last part of every wait is spun, sleeping is only this precise
+
+
+class GPIOBackend:
+    """Active-low buzzer on a Raspberry Pi pin: LOW = On, HIGH = Off."""
+    def __init__(self, pin=BUZZER_PIN):
+        import RPi.GPIO as GPIO
+        self.GPIO = GPIO
+        self.pin = pin
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.OUT, initial=GPIO.HIGH)
+
+    def set(self, on):
+        self.GPIO.output(self.pin, self.GPIO.LOW if on else self.GPIO.HIGH)
+
+
+class SimulatedBackend:
+    """GPIO-free pin: records (monotonic time, state) edges for tests and benchmarks."""
+    def __init__(self):
+        self.edges = []
+
+    def set(self, on):
+        self.edges.append((time.monotonic(), on))
+
+
+class BuzzerSequencer:
+    """
+    Single thread driving the buzzer from a schedule of on-intervals.
+
+    play() converts a pattern into absolute [start, end] on-intervals and
+    returns at once. Merged patterns are united with the schedule (an overlap
+    keeps the buzzer on for the union); a replacing pattern cancels everything
+    pending first. The thread sleeps until the next edge, minus SPIN_S that
+    it spins, and wakes early when the schedule changes.
+    """
+    def __init__(self, backend):
+        """
+        Args:
+            backend: Object with set(on) driving the pin (GPIOBackend or SimulatedBackend).
+        """
+        self.backend = backend
+        self.pin_on = False
+        self.backend.set(False)
+
+        # --- Shared State (guarded by condition) ---
+        self.condition = threading.Condition()
+        self.intervals = [] # Sorted, disjoint [start, end] monotonic times the buzzer is on
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def play(self, pattern, replace=False, at=None):
+        """
+        Schedules a beep pattern.
+
+        Args:
+            pattern (tuple): Durations in seconds, alternating on and off, starting with on.
+            replace (bool): Cancel pending beeps (and silence a running one) instead of merging.
+            at (float): time.monotonic() to start at, now if None.
+        """
+        start = time.monotonic() if at is None else at
+        new = []
+        for index, duration in enumerate(pattern):
+            if index % 2 == 0 and duration > 0:
+                new.append([start, start + duration])
+            start += duration
+        with self.condition:
+            if replace:
+                self.intervals = []
+            self.intervals = _merge(self.intervals + new)
+            self.condition.notify()
+
+    def cancel(self):
+        """Silences the buzzer and drops every pending beep."""
+        with self.condition:
+            self.intervals = []
+            self.condition.notify()
+
+    def _next_edge(self, now):
+        """Drops finished intervals; returns (pin should be on, time of the next edge or None)."""
+        while self.intervals and self.intervals[0][1] <= now:
+            self.intervals.pop(0)
+        if not self.intervals:
+            return False, None
+        start, end = self.intervals[0]
+        return (True, end) if start <= now else (False, start)
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if self.closed:
+                    break
+                on, edge = self._next_edge(time.monotonic())
+                if on != self.pin_on:
+                    self.backend.set(on)
+                    self.pin_on = on
+                    continue
+                if edge is None:
+                    self.condition.wait()
+                    continue
+                remaining = edge - time.monotonic() - SPIN_S
+                if remaining > 0:
+                    # Wakes early when play() or cancel() changes the schedule
+                    if self.condition.wait(timeout=remaining):
+                        continue
+            while time.monotonic() < edge:
+                pass
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.intervals = []
+            self.condition.notify()
+        self.thread.join(timeout=2)
+        self.backend.set(False)
+        self.pin_on = False
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+_sequencer = None
+_sequencer_lock = threading.Lock()
+
+def get_buzzer():
+    """Returns the application-wide sequencer, on the GPIO pin when RPi.GPIO is available."""
+    global _sequencer
+    with _sequencer_lock:
+        if _sequencer is None:
+            backend = None
+            if os.environ.get("SWIM_BUZZER") != "sim":
+                try:
+                    backend = GPIOBackend()
+                except (ImportError, RuntimeError) as e:
+                    print(f"[Buzzer] GPIO unavailable ({e}), using the simulated buzzer")
+            _sequencer = BuzzerSequencer(backend or SimulatedBackend())
+    return _sequencer
 
-def buzzer_off():
-    """Deactivates the buzzer."""
-    GPIO.output(BUZZER_PIN, GPIO.HIGH)
 
 def buzzer_beep(duration: float):
     """
     Generates a non-blocking audio signal for a specified duration.
-    
+
     Args:
         duration (float): Beep duration in seconds.
     """
-    buzzer_on()
-    # Asynchronous timer to turn off the buzzer without blocking the main thread
-    timer = threading.Timer(duration, buzzer_off)
-    timer.start()
+    get_buzzer().play((duration,))
 
 def buzzer_beep_short():
     """Triggers a short 100ms beep (e.g., for pacer intervals)."""
-    buzzer_beep(0.1)
+    get_buzzer().play(SHORT_BEEP)
 
 def buzzer_beep_long():
     """Triggers a 1.0s beep (e.g., for start/end signals)."""
-    buzzer_beep(1.0)
-
+    get_buzzer().play(LONG_BEEP)
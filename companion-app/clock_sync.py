@@ -0,0 +1,107 @@
+"""
+Device-to-host clock synchronisation.
+Estimates the offset and drift between the wearable's esp_timer clock and the
+Pi's monotonic clock from NTP-style request/reply exchanges, so sample device
+times can be mapped onto host timestamps.
+"""
+
+from collections import deque
+
+# Time between sync rounds while connected, and probes sent per round
+SYNC_INTERVAL_S = 30.0
+SYNC_PROBES = 5
+
+# Drift is only fitted once the retained rounds span this long; before that it is noise
+MIN_DRIFT_SPAN_S = 60.0
+
+
+class ClockSync:
+    """
+    Offset and drift estimator for one device.
+
+    Each round keeps the probe with the shortest round trip (least queuing in
+    the BLE stack), whose midpoint gives offset = host - device with an error
+    bound of half the round trip. A least-squares line through the offsets of
+    recent rounds gives the drift, so host time = device + offset + drift * (device - reference).
+    """
+    def __init__(self, history=16):
+        """
+        Args:
+            history (int): Number of sync rounds the drift fit uses.
+        """
+        self.rounds = deque(maxlen=history) # (device_s, offset_s, error_s)
+        self.offset = None
+        self.drift = 0.0
+        self.reference = 0.0
+        self.residual = 0.0
+
+    def is_synced(self):
+        return self.offset is not None
+
+    def add_round(self, probes):
+        """
+        Adds the outcome of one sync round.
+
+        Args:
+            probes (list): (sent_at, device_s, received_at) tuples; host times are time.monotonic().
+
+        Returns:
+            bool: False if no probe was answered.
+        """
+        if not probes:
+            return False
+        sent_at, device_s, received_at = min(probes, key=lambda probe: probe[2] - probe[0])
+
+        # A device clock running backwards means the wearable restarted
+        if self.rounds and device_s < self.rounds[-1][0]:
+            self.rounds.clear()
+
+        self.rounds.append((device_s, (sent_at + received_at) / 2.0 - device_s, (received_at - sent_at) / 2.0))
+        self._fit()
+        return True
+
+    def _fit(self):
+        device_times = [entry[0] for entry in self.rounds]
+        offsets = [entry[1] for entry in self.rounds]
+        span = device_times[-1] - device_times[0]
+
+        if len(self.rounds) < 3 or span < MIN_DRIFT_SPAN_S:
+            # Too little history for a slope: trust the newest round
+            self.reference, self.offset, self.drift = device_times[-1], offsets[-1], 0.0
+            self.residual = 0.0
+            return
+
+        mean_device = sum(device_times) / len(device_times)
+        mean_offset = sum(offsets) / len(offsets)
+        spread = sum((t - mean_device) ** 2 for t in device_times)
+        self.drift = sum((t - mean_device) * (o - mean_offset) for t, o in zip(device_times, offsets)) / spread
+        self.reference, self.offset = mean_device, mean_offset
+        self.residual = (sum((o - self.predict_offset(t)) ** 2 for t, o in zip(device_times, offsets))
+                         / len(offsets)) ** 0.5
+
+    def predict_offset(self, device_s):
+        return self.offset + self.drift * (device_s - self.reference)
+
+    def to_host(self, device_s):
+        """Maps a device time in seconds onto the host monotonic clock."""
+        return device_s + self.predict_offset(device_s)
+
+    def to_device(self, host_s):
+        """Maps a host monotonic time onto the device clock (inverse of to_host)."""
+        return (host_s - self.offset + self.drift * self.reference) / (1.0 + self.drift)
+
+    def statistics(self):
+        """
+        Reports the current estimate and its quality.
+
+        Returns:
+            dict: synced flag, round count, offset_s, drift_ppm (change of the
+            offset per device second; negative when the device clock runs fast),
+            error_s (half round trip of the newest round) and residual_s (RMS
+            misfit of the drift line).
+        """
+        if not self.is_synced():
+            return {"synced": False, "rounds": 0, "offset_s": None, "drift_ppm": None,
+                    "error_s": None, "residual_s": None}
+        return {"synced": True, "rounds": len(self.rounds), "offset_s": self.offset,
+                "drift_ppm": self.drift * 1e6, "error_s": self.rounds[-1][2], "residual_s": self.residual}
@@ -0,0 +1,101 @@
+"""
+Outbound command queue for the BLE link.
+Lets the GUI thread submit GATT writes without waiting for the radio: commands
+are handed to the BLE event loop and written there one at a time.
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import time
+from collections import OrderedDict, deque
+
+
+class CommandChannel:
+    """
+    Ordered, coalescing GATT write queue owned by the BLE event loop.
+
+    submit() is safe to call from any thread and returns a
+    concurrent.futures.Future right away. Commands sharing a coalescing key
+    (e.g. "pacer") replace each other while still queued: only the newest one
+    is written and the superseded futures resolve with None.
+    The future of a written command resolves with its round-trip latency in seconds.
+    """
+    def __init__(self, loop, char_uuid, history=100):
+        """
+        Args:
+            loop (asyncio.AbstractEventLoop): BLE event loop the writer runs on.
+            char_uuid (str): Characteristic the commands are written to.
+            history (int): Number of latency measurements retained.
+        """
+        self.loop = loop
+        self.char_uuid = char_uuid
+        self.latencies = deque(maxlen=history)
+        self._pending = OrderedDict()
+        self._wakeup = asyncio.Event()
+        self._unique_keys = itertools.count()
+
+    def submit(self, payload, key=None, response=True):
+        """
+        Queues a write and returns immediately.
+
+        Args:
+            payload (bytes): Value written to the characteristic.
+            key (str): Coalescing key; a newer command with the same key supersedes this one.
+            response (bool): False selects the write-without-response fast path.
+
+        Returns:
+            concurrent.futures.Future: resolves with the latency in seconds,
+            with None if superseded, or with the write exception.
+        """
+        future = concurrent.futures.Future()
+        if key is None:
+            key = next(self._unique_keys)
+        self.loop.call_soon_threadsafe(self._enqueue, key, payload, response, future)
+        return future
+
+    def _enqueue(self, key, payload, response, future):
+        superseded = self._pending.pop(key, None)
+        # A future the caller cancelled can't be resolved any more
+        if superseded is not None and not superseded[2].cancelled():
+            superseded[2].set_result(None)
+        self._pending[key] = (payload, response, future)
+        self._wakeup.set()
+
+    async def run(self, client):
+        """Writer coroutine: drains the queue in submission order while the link is up."""
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            _, (payload, response, future) = self._pending.popitem(last=False)
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.monotonic()
+            try:
+                await client.write_gatt_char(self.char_uuid, payload, response=response)
+            except asyncio.CancelledError:
+                future.set_exception(ConnectionError("BLE link closed during write"))
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            latency = time.monotonic() - started
+            self.latencies.append(latency)
+            future.set_result(latency)
+
+    def fail_pending(self, error):
+        """Resolves every queued command with an error (used when the link drops)."""
+        while self._pending:
+            _, (_, _, future) = self._pending.popitem(last=False)
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    def latency_statistics(self):
+        """Returns count, mean and max round-trip latency in seconds of recent writes."""
+        values = list(self.latencies)
+        if not values:
+            return {"count": 0, "mean_s": None, "max_s": None}
+        return {"count": len(values), "mean_s": sum(values) / len(values), "max_s": max(values)}
@@ -4,7 +4,7 @@ Handles real-time pool clock animation, multi-stage countdowns,
 synchronized buzzer signaling, and final session archiving.
 """
 
-from app_config import PROJECT_PATH, PARAMETERS_STYLE, LABELS_STYLE, TEXT_EDIT_STYLE, START_BUTTON_STYLE, SKIP_BUTTON_STYLE
+from app_config import DATA_ROOT, PARAMETERS_STYLE, LABELS_STYLE, TEXT_EDIT_STYLE, START_BUTTON_STYLE, SKIP_BUTTON_STYLE
 import sys
 from PyQt5.QtWidgets import QWidget, QApplication, QPushButton, QHBoxLayout, QVBoxLayout, QLabel, QSizePolicy, QPlainTextEdit
 from PyQt5.QtGui import QPainter, QLinearGradient, QColor, QIcon, QPixmap, QPen
@@ -13,46 +13,70 @@ from PyQt5.QtCore import Qt, QSize, QTimer, QRect
 # Hardware and communication interfaces
 from buzzer import buzzer_beep_short, buzzer_beep_long
 from base_training_window import GeneralTaskWindow
+from session_recorder import get_recorder, close_recorder
+from io_worker import get_io_worker
+from telemetry_hub import get_hub
+from session_format import convert_text_log
+from session_summary import write_summary
+from training_repository import get_repository
+from session_journal import record_state, close_journal
+from interval_timeline import TaskTimeline, COUNTDOWN, START, SENDOFF, END
+from telemetry_protocol import PROGRAM_START, PROGRAM_PAUSE, PROGRAM_RESUME, PROGRAM_STOP
+from timing_engine import TimingEngine
 import math
 import time
 import bluetooth_connection
 import os
-import shutil
 import json
 from datetime import datetime
 
+# Beeps fired more than this late are dropped (the boundary itself is still taken)
+STALE_BEEP_S = 1.0
+
 class CurrentTask(GeneralTaskWindow):
     """
     Controller for the active swimming set.
     
     Manages the 15s 'pre-start' countdown, recurring time limits, 
-    BLE pacer synchronization, and session persistent storage.
+    the wearable's interval program (or its legacy pacer), and session persistent storage.
     """
-    def __init__(self, current_directory, task_number):
-        """Initializes the active workout state with pause/resume logic and task metadata."""
-        super().__init__(training_directory=current_directory)
+    def __init__(self, current_directory, task_number, resume_from=None, plan=None):
+        """
+        Initializes the active workout state with pause/resume logic and task metadata.
+
+        Args:
+            current_directory (str): Session folder of the training.
+            task_number (int): Task to run.
+            resume_from (tuple): (journal state, wall time of its last record) to continue
+                an interrupted task at its elapsed time instead of starting it.
+            plan (TrainingPlan): Plan of the training, shared with the preview window.
+        """
+        super().__init__(training_directory=current_directory, plan=plan)
         self.is_paused = False
         self.current_training_directory = current_directory
         self.task_number = task_number
 
         # --- State Management ---
-        self.first_15_seconds = True
         self.current_set_label.setText("Current set:")
-        self.last_beep_second = None # Tracks beep events to prevent duplicates per second
 
         # Navigation Controls
         self.pause_or_resume_button = QPushButton(self, text="PAUSE")
         self.next_task_button = QPushButton(self)
 
         # --- Timing Engine ---
+        # Wall clock bookkeeping for the crash journal only; the task runs on the monotonic clock
         self.start_time = time.time()
         self.pause_clicked_time = 0
         self.total_paused_time = 0
-        self.limit_offset = 0
+        if resume_from is not None:
+            self.restore_timing(*resume_from)
+        # Journaled so the task can be resumed after a crash
+        record_state(phase="task", task_number=self.task_number, start_time=self.start_time,
+                     total_paused_time=self.total_paused_time, is_paused=False)
 
         self.lower_layout = QHBoxLayout()
 
-        # High-frequency timer for smooth UI/Clock updates
+        # High-frequency timer for smooth UI/Clock updates (display only, events are timed separately)
         self.wall_clock_timer = QTimer(self)
         self.wall_clock_timer.timeout.connect(self.update_angle) 
         self.wall_clock_timer.timeout.connect(self.update_timer)
@@ -62,19 +86,36 @@ class CurrentTask(GeneralTaskWindow):
         self.get_task_info()
         self.set_task_info()
 
-        # --- Time Limit Logic ---
-        self.time_limit_exist = False
-        if self.time_limit != "None":
-            self.time_limit_exist = True
-            minutes, seconds = self.time_limit.split("'")
-            self.limit_minutes, self.limit_seconds = int(minutes), int(seconds)
-            self.time_limit_in_seconds = (self.limit_minutes * 60) + self.limit_seconds
+        # --- Interval Timeline (countdown, send-offs, beeps, end) ---
+        self.timeline = TaskTimeline.compile(self.task_record)
+        # One precise timer armed for the next event at a time
+        self.timing_engine = TimingEngine(self.timeline, parent=self)
+        self.timing_engine.event_fired.connect(self.timeline_event)
+        # The wearable runs the same program on its own clock; None keeps the legacy pacer
+        self.program_id = bluetooth_connection.upload_program(self.timeline.program)
 
         # Build Interface
         self.add_lower_layout()
         self.update_ui()
         self.connecting_buttons()
         self.is_last_task()
+        # A resumed task does not replay the events it already went through
+        resumed_at = time.time() - self.start_time - self.total_paused_time
+        if resume_from is not None and self.program_id is None and resumed_at >= self.timeline.start_s:
+            # Past GO!, so the START event that arms the pacer is not replayed either
+            self.send_pacer()
+        self.timing_engine.start(resumed_at)
+        self.control_program(PROGRAM_START)
+
+    def restore_timing(self, state, last_record_at):
+        """Continues the journaled task clock; the time the app was down counts as a pause."""
+        self.start_time = state["start_time"]
+        self.total_paused_time = state["total_paused_time"]
+        now = time.time()
+        if state.get("is_paused"):
+            self.total_paused_time += (now - self.start_time) - state["pause_clicked_time"]
+        else:
+            self.total_paused_time += now - last_record_at
 
     def update_ui(self):
         """Applies styles to active workout control buttons."""
@@ -105,71 +146,81 @@ class CurrentTask(GeneralTaskWindow):
         """Toggles the execution state, managing timer suspension and duration offset."""
         if not self.is_paused:
             self.wall_clock_timer.stop()
+            self.timing_engine.pause()
+            self.control_program(PROGRAM_PAUSE)
             self.pause_clicked_time = time.time() - self.start_time
             self.is_paused = True
+            record_state(is_paused=True, pause_clicked_time=self.pause_clicked_time)
             self.pause_or_resume_button.setText("RESUME")
         else:
             self.wall_clock_timer.start()
-            resume_time = time.time() - self.start_time
-            self.total_paused_time += resume_time - self.pause_clicked_time
+            self.timing_engine.resume()
+            self.control_program(PROGRAM_RESUME)
+            # Journaled as wall time minus the task time the engine measured
+            self.total_paused_time = time.time() - self.start_time - self.timing_engine.now()
             self.is_paused = False
+            record_state(is_paused=False, total_paused_time=self.total_paused_time)
             self.pause_or_resume_button.setText("PAUSE")
 
+    def task_time(self):
+        """Seconds on the task clock: since the window opened, without the pauses (monotonic)."""
+        return self.timing_engine.now()
+
+    def timeline_event(self, event, lateness_s):
+        """Signals a timeline event fired by the timing engine on the buzzer and the wearable."""
+        if self.program_id is not None:
+            # The wearable plays every cue of its program on its own clock; a second
+            # beep from the base station, off by the link and clock skew, would only confuse
+            return
+        # Legacy wearables: trigger the BLE pacer command exactly at GO! (pacer preloaded with the task info)
+        if event.kind == START:
+            self.send_pacer()
+        # Beeps delayed by a stalled GUI thread would only confuse the swimmer
+        if lateness_s > STALE_BEEP_S:
+            return
+        if event.kind == COUNTDOWN:
+            buzzer_beep_short()
+        elif event.kind in (START, SENDOFF, END):
+            buzzer_beep_long()
+
     def update_timer(self):
         """
-        Core logic for the digital display and synchronized signaling.
-        Handles the 15s preparation countdown and recurring intervals.
+        Digital display: the 15s preparation countdown or the time since the
+        current send-off, looked up in the timeline.
         """
-        # --- Pre-start Phase (15s Countdown) ---
-        remaining_to_start = self.start_time + 15 + self.total_paused_time - time.time()
-        
-        if remaining_to_start >= 0 and self.first_15_seconds: 
-            secs = round(remaining_to_start) % 60
-            to_display = f"{secs}" if secs > 0 else "GO!"
-            self.clock_time = to_display
-
-            # Trigger BLE pacer command exactly at GO!
-            if to_display == "GO!":
-                try:
-                    with open(f"{self.current_training_directory}/Task {self.task_number}.json", "r") as file:
-                        task_data = json.load(file)
-                        p_min, p_sec = task_data.get("pacer", "0'00").split("'")
-                        interval = int(p_min) * 60 + int(p_sec)
-                        bluetooth_connection.send_timer_seconds(interval)
-                except Exception: pass
-
-            # Physical Buzzer Countdown (3, 2, 1, Long Beep at 0)
-            if secs in [3, 2, 1, 0] and self.last_beep_second != secs:
-                if secs == 0: buzzer_beep_long()
-                else: buzzer_beep_short()
-                self.last_beep_second = secs
+        now = self.task_time()
+        segment = self.timeline.segment_at(now)
+        if segment is None:
+            # Pre-start Phase (15s Countdown)
+            secs = round(self.timeline.start_s - now) % 60
+            self.clock_time = f"{secs}" if secs > 0 else "GO!"
             return
-
-        # --- Active Task Phase ---
-        elapsed = max(0, time.time() - (self.start_time + 14.5) - self.total_paused_time - self.limit_offset)
-        secs, mins = int(elapsed % 60), int(elapsed // 60)
-
-        # Handle recurring time limits (Interval-based countdowns)
-        if self.time_limit_exist:
-            remaining = self.time_limit_in_seconds - int(elapsed)
-            
-            # Local buzzer signaling for the end of an interval
-            if remaining in [3, 2, 1, 0] and self.last_beep_second != remaining:
-                if remaining == 0: buzzer_beep_long()
-                else: buzzer_beep_short()
-                self.last_beep_second = remaining
-            elif remaining > 3: self.last_beep_second = None
-
-            # Reset timer for the next interval in the set
-            if mins == self.limit_minutes and secs == self.limit_seconds:
-                self.limit_offset += self.time_limit_in_seconds
-
+        # Counts up from the last send-off (or from the end of the task)
+        mins, secs = divmod(int(now - segment.time_s), 60)
         to_display = f"{mins:02d}:{secs:02d}"
         self.clock_time = "GO!" if to_display == "00:00" else to_display
 
+    def send_pacer(self):
+        """Arms the wearable's pacer with the interval of the current task."""
+        if self.task_record.pacer_s is not None:
+            bluetooth_connection.send_timer_seconds(self.task_record.pacer_s)
+
+    def control_program(self, action):
+        """Mirrors a task clock transition on the wearable's program, stamped with its monotonic time."""
+        if self.program_id is not None:
+            bluetooth_connection.control_program(self.program_id, action, self.timing_engine.now(), at=time.monotonic())
+
+    def stop_wearable(self):
+        """Stops the wearable's program, or disables the legacy pacer."""
+        if self.program_id is not None:
+            self.control_program(PROGRAM_STOP)
+            self.program_id = None
+        else:
+            bluetooth_connection.send_timer_seconds(0)
+
     def update_angle(self):
         """Calculates clock arrow positions relative to the net workout duration."""
-        elapsed = time.time() - self.start_time - self.total_paused_time
+        elapsed = self.task_time()
         for i in range(4):
             # 6 degrees per second per arrow with 15s offsets
             angle_rad = math.radians(((elapsed + (i * 15)) * 6) % 360)
@@ -177,31 +228,45 @@ class CurrentTask(GeneralTaskWindow):
         self.update()
 
     def next_task_button_clicked(self):
-        """Gracefully closes the current set and disables the BLE pacer."""
-        bluetooth_connection.send_timer_seconds(0)
+        """Gracefully closes the current set and stops the wearable's program or pacer."""
+        self.stop_wearable()
         self.wall_clock_timer.stop()
+        self.timing_engine.stop()
+        record_state(phase="preview", task_number=self.task_number + 1)
         self.close()
 
     def finish_training(self):
         """
         Concludes the entire session. 
         Logs the end timestamp, moves the directory to archives, and cleans up UI.
+        Closing the log, the move, the binary conversion, the summary and the repository
+        update run on the I/O worker, in that order.
         """
         # Log session termination time
-        with open(f"{self.current_training_directory}/training_data.txt", "a") as file:
-            end_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            file.write(f"------------------------------\n")
-            file.write(f"SESSION END: {end_time}\n")
+        end_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        recorder = get_recorder(self.current_training_directory)
+        get_hub().detach_recorder(recorder)
+        recorder.write_lines(["------------------------------\n", f"SESSION END: {end_time}\n"])
+        # The log handle must be flushed and closed before its directory moves
+        io_worker = get_io_worker()
+        close_recorder(self.current_training_directory, io_worker=io_worker)
+        # The journal goes only once the log it protects is synced
+        close_journal(io_worker=io_worker)
 
         self.wall_clock_timer.stop()
-        bluetooth_connection.send_timer_seconds(0)
+        self.timing_engine.stop()
+        self.stop_wearable()
 
         # Directory relocation: Planned -> Finished
         src = self.current_training_directory
-        dst = os.path.join(PROJECT_PATH, "finished_trainings", src.split("/")[-1])
-        try:
-            shutil.move(src, dst)
-        except Exception as e: print(f"Move error: {e}")
+        dst = os.path.join(DATA_ROOT, "finished_trainings", src.split("/")[-1])
+        io_worker.move(src, dst, on_done=lambda _: print(f"Session archived: {dst}"))
+        # Columnar copy of the log for the history screens
+        io_worker.submit(convert_text_log, dst)
+        # Aggregates for the history screens, so they never rescan the samples
+        io_worker.submit(write_summary, dst)
+        # Moves the plan into history once its last samples are stored
+        io_worker.submit(get_repository().finish_session, self.training_name, dst, time.time())
 
         # Safety: Close all auxiliary windows and return to main dashboard
         for window in QApplication.topLevelWidgets():
@@ -210,7 +275,7 @@ class CurrentTask(GeneralTaskWindow):
 
     def is_last_task(self):
         """Dynamically reconfigures the 'Next' button if no more tasks remain."""
-        if len(os.listdir(self.current_training_directory)) - 1 == self.task_number:
+        if self.plan.is_last(self.task_number):
             self.next_task_button.setStyleSheet("background-color: #a3170d; color: white; "
                                                 "font: 650 24pt 'Segoe UI'; border-radius: 10px; padding: 10px;")
             self.next_task_button.setText("FINISH TRAINING")
@@ -220,5 +285,6 @@ class CurrentTask(GeneralTaskWindow):
             self.next_task_button.clicked.connect(self.finish_training)
 
     def closeEvent(self, event):
-        """Ensures polling threads are terminated to prevent memory leaks."""
-        self.parameters_timer.stop()
\ No newline at end of file
+        """Unsubscribes from telemetry and stops the timing engine to prevent leaks."""
+        self.timing_engine.stop()
+        self.stop_telemetry()
\ No newline at end of file
@@ -1,15 +1,17 @@
 """
 Confirmation dialog for deleting training records.
-Handles recursive directory removal from both planned and finished training repositories.
+Removes a training from the repository and its recorded data from both planned and finished folders.
 """
 
-from app_config import DELETE_BUTTON_STYLE, CANCEL_BUTTON_STYLE2, DELETE_LABEL_STYLE, PROJECT_PATH
+from app_config import DELETE_BUTTON_STYLE, CANCEL_BUTTON_STYLE2, DELETE_LABEL_STYLE, DATA_ROOT
 from PyQt5.QtWidgets import QDialog, QApplication, QPushButton, QHBoxLayout, QVBoxLayout, QLabel
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPainter, QBrush, QColor
 import os
 import shutil
 
+from training_repository import get_repository
+
 
 class DeleteWindow(QDialog):
     """
@@ -97,18 +99,19 @@ class DeleteWindow(QDialog):
         """
         Executes the file system cleanup.
         
-        Determines the path (planned vs finished) based on directory existence, 
-        removes the folder tree, and cleans up the UI element.
+        Deletes the training (tasks, sessions and samples) from the repository,
+        removes its data folder if one was recorded, and cleans up the UI element.
         """
         training_id = self.parent_button.text()
-        planned_path = f"{PROJECT_PATH}/planned_trainings/{training_id}"
-        finished_path = f"{PROJECT_PATH}/finished_trainings/{training_id}"
-
-        # File system operation: Recursive removal of the training folder
-        if os.path.exists(planned_path):
-            shutil.rmtree(planned_path)
-        else:
-            shutil.rmtree(finished_path)
+        planned_path = f"{DATA_ROOT}/planned_trainings/{training_id}"
+        finished_path = f"{DATA_ROOT}/finished_trainings/{training_id}"
+
+        get_repository().delete_plan(training_id)
+
+        # File system operation: Recursive removal of the recorded session data
+        for path in (planned_path, finished_path):
+            if os.path.exists(path):
+                shutil.rmtree(path)
 
         # UI operation: Safely remove the button from the parent layout
         self.parent_button.deleteLater()
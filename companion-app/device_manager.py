@@ -0,0 +1,663 @@
+"""
+Concurrent multi-wearable BLE acquisition.
+One background thread runs one asyncio loop that keeps a connection, a sample
+stream and a pacer command channel alive for every registered device.
+"""
+
+import asyncio
+import concurrent.futures
+import itertools
+import random
+import threading
+import time
+
+import telemetry_protocol
+from ble_transport import BleakTransport
+from clock_sync import ClockSync, SYNC_INTERVAL_S, SYNC_PROBES
+from command_channel import CommandChannel
+from sample_buffer import SampleRingBuffer
+from sequence_tracker import SequenceTracker
+
+# Link is reported down when neither a connection nor a sample happened within this window
+LINK_TIMEOUT_S = 10.0
+# ... or, for a batching device, within its sample period plus batch window and this margin
+LINK_TIMEOUT_MARGIN_S = 5.0
+
+# A clock sync probe without a reply within this time is discarded
+SYNC_TIMEOUT_S = 1.0
+
+FORMAT_NAMES = {
+    telemetry_protocol.FORMAT_CSV: "CSV",
+    telemetry_protocol.FORMAT_BINARY: "binary",
+    telemetry_protocol.FORMAT_SEQUENCED: "sequenced binary",
+    telemetry_protocol.FORMAT_BATCHED: "batched binary",
+}
+
+PROGRAM_STATE_NAMES = {
+    telemetry_protocol.PROGRAM_IDLE: "idle",
+    telemetry_protocol.PROGRAM_LOADED: "loaded",
+    telemetry_protocol.PROGRAM_RUNNING: "running",
+    telemetry_protocol.PROGRAM_PAUSED: "paused",
+    telemetry_protocol.PROGRAM_FINISHED: "finished",
+}
+
+# --- Event Kinds (passed to listeners together with the device ID) ---
+EVENT_SAMPLE = "sample"
+EVENT_CONNECTION = "connection"
+
+
+class ExponentialBackoff:
+    """
+    Retry delay policy: base * factor^attempt, capped at maximum, with jitter.
+    Jitter spreads retries so a flapping link doesn't hammer the adapter in lockstep.
+    """
+    def __init__(self, base=0.25, factor=2.0, maximum=15.0, jitter=0.5):
+        self.base = base
+        self.factor = factor
+        self.maximum = maximum
+        self.jitter = jitter
+        self.attempt = 0
+
+    def next_delay(self):
+        """Returns the delay before the next retry and advances the attempt counter."""
+        delay = min(self.maximum, self.base * (self.factor ** self.attempt))
+        self.attempt += 1
+        # Randomize within [delay * (1 - jitter), delay]
+        return delay * (1 - self.jitter * random.random())
+
+    def reset(self):
+        """Called after a successful connection."""
+        self.attempt = 0
+
+
+class DeviceSession:
+    """
+    Connection lifecycle and data of a single wearable.
+
+    Owns the device's sample stream, link state, cached BLEDevice and pacer
+    command channel. run() is the per-device coroutine executed by DeviceManager;
+    it sleeps on an asyncio.Event set by the disconnected_callback and reconnects
+    with a jittered exponential backoff.
+    """
+    def __init__(self, manager, device_id, address):
+        self.manager = manager
+        self.device_id = device_id
+        self.address = address
+        self.samples = SampleRingBuffer()
+        self.sequencer = SequenceTracker()
+
+        # --- Link State (written on the BLE thread) ---
+        self.client = None
+        self.device = None
+        self.connected = False
+        self.connected_at = 0.0
+        self.last_activity = 0.0
+        self.clock_offset = None # Host monotonic minus device time, from the newest live frame
+        self.clock = ClockSync()
+        self.time_sync_supported = False
+        self.program_supported = False
+        self.program_progress = None # Newest (program_id, state, kind, rep, program_s, host time) report
+        self._program_ids = itertools.cycle(range(1, 256)) # One byte on the wire
+        self._sync_waiters = {}
+        self._sync_tokens = itertools.count(random.getrandbits(16))
+        self.sample_rate = None # Requested (period_ms, batch_window_ms), re-applied on every connect
+        self.frame_format = telemetry_protocol.FORMAT_CSV
+        self.commands = None
+        self.recovery_times = []
+        self.malformed_frames = 0
+        self._wake = None
+        self._stopping = False
+
+    # --- Notification Path ---
+    def handle_notification(self, sender, data):
+        """
+        Asynchronous callback for processing incoming GATT notifications.
+        Accepts batched, sequenced and plain binary sample frames and the legacy
+        CSV string: 'BPM,SpO2,Battery,Voltage'.
+        """
+        now = time.monotonic()
+        self.last_activity = now
+        try:
+            if data and data[0] == telemetry_protocol.HEADER_TIME_SYNC_V2:
+                self.handle_time_sync(data, now)
+                return
+
+            if data and data[0] == telemetry_protocol.HEADER_PROGRAM_V2:
+                self.handle_program_progress(data, now)
+                return
+
+            if data and data[0] in (telemetry_protocol.HEADER_BATCH_V2, telemetry_protocol.HEADER_SAMPLE_V2):
+                if data[0] == telemetry_protocol.HEADER_BATCH_V2:
+                    records = telemetry_protocol.decode_batch_frame(data)
+                else:
+                    record = telemetry_protocol.decode_sequenced_frame(data)
+                    records = [record] if record is not None else None
+                if not records:
+                    self.malformed_frames += 1
+                    return
+                self.ingest_live(records, now)
+                return
+
+            values = telemetry_protocol.decode_frame(data)
+
+            if values is not None:
+                bpm, spo2, battery, voltage = values
+                self.samples.append(now, bpm, spo2, battery, voltage)
+                self.manager.notify(self.device_id, EVENT_SAMPLE)
+            else:
+                self.malformed_frames += 1
+        except Exception as e:
+            self.malformed_frames += 1
+            print(f"[BLE Handler Error] {self.device_id}: {e}")
+
+    def ingest_live(self, records, received_at):
+        """
+        Feeds live (seq, device_ms, ...) records of one notification through the sequencer.
+        Every record is stamped with its measurement time on the host clock.
+        """
+        self.clock_offset = received_at - records[-1][1] / 1000.0
+        released = []
+        for seq, device_ms, bpm, spo2, battery, voltage in records:
+            timestamp = self.host_time(device_ms)
+            ready, request = self.sequencer.on_live((seq, timestamp, bpm, spo2, battery, voltage))
+            if request is not None:
+                self.request_backfill(*request)
+            released.extend(ready)
+        self.publish(released)
+
+    def handle_backfill(self, sender, data):
+        """Notification callback of the backfill characteristic: replayed samples, then an end marker."""
+        self.last_activity = time.monotonic()
+        try:
+            end = telemetry_protocol.decode_backfill_end(data)
+            if end is not None:
+                first_seq, count = end
+                print(f"{self.device_id}: backfilled {count} samples from seq {first_seq}")
+                self.publish(self.sequencer.on_backfill_end())
+                return
+
+            values = telemetry_protocol.decode_sequenced_frame(data)
+            if values is None:
+                self.malformed_frames += 1
+                return
+            seq, device_ms, bpm, spo2, battery, voltage = values
+            self.publish(self.sequencer.on_backfill((seq, self.host_time(device_ms), bpm, spo2, battery, voltage)))
+        except Exception as e:
+            self.malformed_frames += 1
+            print(f"[BLE Backfill Error] {self.device_id}: {e}")
+
+    # --- Clock Synchronisation ---
+    def host_time(self, device_ms):
+        """
+        Converts a device timestamp to host monotonic time.
+        Uses the synced clock model when available; otherwise the newest live
+        frame, taken as sent on arrival, anchors the device clock.
+        """
+        if self.clock.is_synced():
+            return self.clock.to_host(device_ms / 1000.0)
+        return device_ms / 1000.0 + self.clock_offset
+
+    def handle_time_sync(self, data, received_at):
+        """Matches a sync reply to its pending probe."""
+        reply = telemetry_protocol.decode_time_sync(data)
+        if reply is None:
+            self.malformed_frames += 1
+            return
+        token, device_s = reply
+        waiter = self._sync_waiters.get(token)
+        if waiter is not None and not waiter.done():
+            waiter.set_result((device_s, received_at))
+
+    def device_time_ms(self, host_time):
+        """
+        Converts a host monotonic time to a device timestamp in ms (inverse of host_time).
+        Returns 0, which the device reads as "on receipt", while the clock is unknown.
+        """
+        if self.clock.is_synced():
+            return int(self.clock.to_device(host_time) * 1000)
+        if self.clock_offset is not None:
+            return int((host_time - self.clock_offset) * 1000)
+        return 0
+
+    async def sync_clock(self, client):
+        """
+        One sync round: SYNC_PROBES request/reply exchanges, the fastest one kept.
+        Writes bypass the command queue so queueing delay doesn't widen the round trip.
+        """
+        loop = asyncio.get_running_loop()
+        probes = []
+        for _ in range(SYNC_PROBES):
+            token = next(self._sync_tokens) & 0xFFFFFFFF
+            waiter = loop.create_future()
+            self._sync_waiters[token] = waiter
+            try:
+                sent_at = time.monotonic()
+                await client.write_gatt_char(telemetry_protocol.CHAR_UUID,
+                                             telemetry_protocol.encode_time_sync(token), response=False)
+                device_s, received_at = await asyncio.wait_for(waiter, SYNC_TIMEOUT_S)
+                probes.append((sent_at, device_s, received_at))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._sync_waiters.pop(token, None)
+
+        if self.clock.add_round(probes):
+            stats = self.clock.statistics()
+            print(f"{self.device_id}: clock sync error {stats['error_s'] * 1000:.1f} ms, "
+                  f"drift {stats['drift_ppm']:.1f} ppm")
+        else:
+            print(f"[BLE Sync Error] {self.device_id}: no sync replies")
+
+    async def clock_sync_loop(self, client):
+        """Syncs at connect and every SYNC_INTERVAL_S while the link is up."""
+        try:
+            while client.is_connected:
+                await self.sync_clock(client)
+                await asyncio.sleep(SYNC_INTERVAL_S)
+        except Exception as e:
+            print(f"[BLE Sync Error] {self.device_id}: {e}")
+
+    def publish(self, records):
+        """Appends sequenced records, already in order, to the sample stream."""
+        for seq, timestamp, bpm, spo2, battery, voltage in records:
+            self.samples.append(timestamp, bpm, spo2, battery, voltage, seq)
+        if records:
+            self.manager.notify(self.device_id, EVENT_SAMPLE)
+
+    def request_backfill(self, from_seq, count):
+        """Asks the device to replay samples missed while the link was down."""
+        print(f"{self.device_id}: gap of {count} samples, requesting backfill from seq {from_seq}")
+        self.commands.submit(telemetry_protocol.encode_backfill(from_seq, count), key="backfill")
+
+    async def negotiate_frame_format(self, client):
+        """
+        Connect-time handshake selecting the telemetry frame format.
+        Firmware advertising binary support is switched to the richest format both
+        sides know; anything else stays on CSV. Sequenced firmware also gets its
+        backfill characteristic subscribed.
+        """
+        self.frame_format = telemetry_protocol.FORMAT_CSV
+        self.time_sync_supported = False
+        self.program_supported = False
+        try:
+            info = await client.read_gatt_char(telemetry_protocol.CHAR_UUID)
+            frame_format = telemetry_protocol.best_format(info)
+            self.time_sync_supported = telemetry_protocol.supports_time_sync(info)
+            self.program_supported = telemetry_protocol.supports_program(info)
+            if frame_format >= telemetry_protocol.FORMAT_SEQUENCED:
+                await client.start_notify(telemetry_protocol.BACKFILL_CHAR_UUID, self.handle_backfill)
+            if frame_format != telemetry_protocol.FORMAT_CSV:
+                command = telemetry_protocol.encode_set_format(frame_format)
+                await client.write_gatt_char(telemetry_protocol.CHAR_UUID, command, response=True)
+                self.frame_format = frame_format
+        except Exception as e:
+            print(f"[BLE Negotiation Error] {self.device_id}: {e}")
+
+        print(f"{self.device_id}: telemetry format {FORMAT_NAMES[self.frame_format]}")
+
+        # The device forgets the rate when it restarts, so it is sent on every connect
+        if self.sample_rate is not None and self.frame_format == telemetry_protocol.FORMAT_BATCHED:
+            self.commands.submit(telemetry_protocol.encode_set_rate(*self.sample_rate), key="rate")
+
+    # --- Interval Programs ---
+    def handle_program_progress(self, data, received_at):
+        """Keeps the newest progress report of the program running on the device."""
+        report = telemetry_protocol.decode_program_progress(data)
+        if report is None:
+            self.malformed_frames += 1
+            return
+        program_id, state, kind, rep, program_s, device_ms = report
+        # Stamped on the host clock when the device clock is known, on arrival otherwise
+        known_clock = self.clock.is_synced() or self.clock_offset is not None
+        reported_at = self.host_time(device_ms) if known_clock else received_at
+        previous = self.program_progress
+        self.program_progress = (program_id, state, kind, rep, program_s, reported_at)
+        if previous is None or previous[:2] != (program_id, state):
+            print(f"{self.device_id}: program {program_id} {PROGRAM_STATE_NAMES.get(state, state)} at {program_s:.1f} s")
+
+    def load_program(self, prestart_s, interval_s, pacer_s, total_s, countdown_s):
+        """
+        Uploads an interval program replacing the one the device holds.
+
+        Returns:
+            tuple: (program id, concurrent.futures.Future of the write), or (None, None)
+            if the device is not connected or its firmware can't run programs.
+        """
+        if not self.connected or not self.program_supported:
+            return None, None
+        program_id = next(self._program_ids)
+        command = telemetry_protocol.encode_program_load(program_id, prestart_s, interval_s, pacer_s, total_s, countdown_s)
+        # A newer program supersedes one still queued
+        return program_id, self.send_command(command, key="program")
+
+    def control_program(self, program_id, action, program_s=0.0, host_time=None):
+        """
+        Starts, pauses, resumes or stops a loaded program.
+
+        Args:
+            program_id (int): Id returned by load_program().
+            action (int): telemetry_protocol.PROGRAM_START / PAUSE / RESUME / STOP.
+            program_s (float): Program time at the moment of the action.
+            host_time (float): Host monotonic time of the action; with a known device
+                clock the device applies it at that instant instead of on receipt.
+        """
+        at_device_ms = self.device_time_ms(host_time) if host_time is not None else 0
+        command = telemetry_protocol.encode_program_control(program_id, action, program_s, at_device_ms)
+        # Never coalesced: every transition is written, in order
+        return self.send_command(command)
+
+    # --- Connection Lifecycle ---
+    async def resolve_device(self):
+        """
+        Looks up the BLEDevice once and caches it.
+        Reconnects reuse the cached object and skip the scan.
+        """
+        if self.device is None:
+            print(f"Scanning for {self.address}...")
+            self.device = await self.manager.transport.resolve(self.address)
+        return self.device
+
+    def _set_connected(self, connected):
+        self.connected = connected
+        if connected:
+            self.connected_at = time.monotonic()
+        self.manager.notify(self.device_id, EVENT_CONNECTION)
+
+    async def _sleep_or_wake(self, delay):
+        """Backoff sleep that ends early when the session is asked to stop."""
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def request_stop(self):
+        """Loop-thread side of stop(): wakes whatever the session is waiting on."""
+        self._stopping = True
+        if self._wake is not None:
+            self._wake.set()
+
+    async def run(self):
+        """Maintains the connection until request_stop() is called."""
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self.commands = CommandChannel(loop, telemetry_protocol.CHAR_UUID)
+        backoff = ExponentialBackoff()
+        link_lost_at = None
+        failures = 0
+
+        while not self._stopping:
+            link_lost = asyncio.Event()
+            lost_at = []
+
+            def on_disconnect(client):
+                lost_at.append(time.monotonic())
+                self._set_connected(False)
+                link_lost.set()
+
+            writer = syncer = None
+            try:
+                device = await self.resolve_device()
+                if device is None:
+                    raise RuntimeError(f"{self.address} not found")
+
+                print(f"Connecting to {self.address}...")
+                client = self.manager.transport.create_client(device, on_disconnect)
+                await client.connect(timeout=10.0)
+
+                self.client = client
+                self._set_connected(True)
+                print(f"Connected to {self.address} ({self.device_id})")
+
+                # Agree on the frame format before the first notification arrives
+                await self.negotiate_frame_format(client)
+
+                # Subscribe to real-time telemetry updates
+                await client.start_notify(telemetry_protocol.CHAR_UUID, self.handle_notification)
+                # Outbound commands are written by this task, never by the GUI thread
+                writer = asyncio.ensure_future(self.commands.run(client))
+                if self.time_sync_supported:
+                    syncer = asyncio.ensure_future(self.clock_sync_loop(client))
+                backoff.reset()
+                failures = 0
+
+                if link_lost_at is not None:
+                    recovery = time.monotonic() - link_lost_at
+                    self.recovery_times.append(recovery)
+                    print(f"{self.device_id}: telemetry restored {recovery * 1000:.0f} ms after link loss.")
+                    link_lost_at = None
+
+                # Sleep until the link drops or the session is stopped
+                waiters = [asyncio.ensure_future(link_lost.wait()), asyncio.ensure_future(self._wake.wait())]
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in waiters:
+                    waiter.cancel()
+
+                if client.is_connected:
+                    await client.disconnect()
+                elif lost_at and not self._stopping:
+                    link_lost_at = lost_at[0]
+
+                self.client = None
+                if self.connected:
+                    self._set_connected(False)
+                print(f"{self.device_id}: BLE session closed.")
+
+            except Exception as e:
+                print(f"[BLE Error] {self.device_id}: {e}")
+                self.client = None
+                if self.connected:
+                    self._set_connected(False)
+                if link_lost_at is None and lost_at:
+                    link_lost_at = lost_at[0]
+
+                # A stale cached device can keep failing; rescan after a few attempts
+                failures += 1
+                if failures >= 3:
+                    self.device = None
+                    failures = 0
+                await self._sleep_or_wake(backoff.next_delay())
+
+            finally:
+                for task in (writer, syncer):
+                    if task is not None:
+                        task.cancel()
+                self.publish(self.sequencer.on_disconnect())
+                self.commands.fail_pending(ConnectionError("BLE link closed"))
+
+    # --- Thread-safe Accessors ---
+    def is_connected(self):
+        """
+        Link status check, safe from any thread.
+        The link counts as up only while telemetry keeps arriving, so a stalled
+        connection is reported even before the stack notices the loss.
+        """
+        if not self.connected:
+            return False
+        last_activity = max(self.connected_at, self.last_activity)
+        return time.monotonic() - last_activity < self.link_timeout_s()
+
+    def link_timeout_s(self):
+        """
+        Telemetry silence after which the link counts as lost, safe from any thread.
+        A batching device notifies only once per batch window, so the timeout
+        grows with the requested period and window (as clamped by the firmware).
+        """
+        if self.sample_rate is None:
+            return LINK_TIMEOUT_S
+        period_ms, window_ms = self.sample_rate
+        period_ms = max(telemetry_protocol.MIN_SAMPLE_PERIOD_MS, min(telemetry_protocol.MAX_SAMPLE_PERIOD_MS, period_ms))
+        window_ms = max(0, min(telemetry_protocol.MAX_BATCH_WINDOW_MS, window_ms))
+        return max(LINK_TIMEOUT_S, (period_ms + window_ms) / 1000.0 + LINK_TIMEOUT_MARGIN_S)
+
+    def send_command(self, payload, key=None, response=True):
+        """Queues a GATT write on this device's command channel (see CommandChannel.submit)."""
+        if not self.connected or self.commands is None:
+            future = concurrent.futures.Future()
+            future.set_exception(ConnectionError(f"{self.device_id} is not connected"))
+            return future
+        return self.commands.submit(payload, key=key, response=response)
+
+    def set_sample_rate(self, rate_hz, batch_window_s=0.0):
+        """
+        Requests a new acquisition rate and batching window from the device.
+        The setting is kept and re-sent after every reconnect; firmware without
+        batched frames does not understand the command and keeps its 1 Hz rate.
+
+        Returns:
+            concurrent.futures.Future: the pending write, or an already resolved
+            future (None) if the device is not connected or too old right now.
+        """
+        self.sample_rate = (round(1000.0 / rate_hz), round(batch_window_s * 1000.0))
+        if not self.connected or self.frame_format != telemetry_protocol.FORMAT_BATCHED:
+            future = concurrent.futures.Future()
+            future.set_result(None)
+            return future
+        return self.send_command(telemetry_protocol.encode_set_rate(*self.sample_rate), key="rate")
+
+    def clock_statistics(self):
+        """Clock sync diagnostic of this device (see ClockSync.statistics)."""
+        return self.clock.statistics()
+
+    def link_statistics(self):
+        """
+        Reports recovery times measured from link loss to re-subscribed notifications.
+
+        Returns:
+            dict: reconnect count, malformed frame count, sequence statistics
+            (gaps, backfilled, lost, duplicates) and last/mean/max recovery time
+            in seconds (None if no reconnects yet).
+        """
+        times = list(self.recovery_times)
+        statistics = {"reconnects": len(times), "malformed": self.malformed_frames,
+                      **self.sequencer.statistics()}
+        if not times:
+            return {**statistics, "last_s": None, "mean_s": None, "max_s": None}
+        return {**statistics, "last_s": times[-1], "mean_s": sum(times) / len(times), "max_s": max(times)}
+
+
+class DeviceManager:
+    """
+    Runs any number of DeviceSessions concurrently in one asyncio loop.
+
+    The loop lives on a single daemon thread started by start(). Devices can be
+    added or removed while it runs; every public method is keyed by device ID
+    and safe to call from the GUI thread.
+    """
+    def __init__(self, transport=None):
+        """
+        Args:
+            transport (Transport): Reaches the wearables; BleakTransport when omitted,
+                SimulatedTransport for radio-less testing.
+        """
+        self.transport = transport if transport is not None else BleakTransport()
+        self.sessions = {}
+        self.listeners = []
+        self.loop = None
+        self.thread = None
+        self._tasks = {}
+        self._ready = threading.Event()
+
+    # --- Event Listeners ---
+    def add_listener(self, callback):
+        """
+        Registers a callable invoked with (device_id, event).
+        Callbacks run on the BLE thread, so they must only hand the event over (e.g. emit a Qt signal).
+        """
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Unregisters a callable previously passed to add_listener()."""
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    def notify(self, device_id, event):
+        for callback in list(self.listeners):
+            try:
+                callback(device_id, event)
+            except Exception as e:
+                print(f"[BLE Listener Error] {e}")
+
+    # --- Device Registry ---
+    def add_device(self, device_id, address):
+        """Registers a wearable; it is connected right away if the loop is running."""
+        session = self.sessions.get(device_id)
+        if session is None:
+            session = DeviceSession(self, device_id, address)
+            self.sessions[device_id] = session
+        if self.is_running():
+            self.loop.call_soon_threadsafe(self._start_session, session)
+        return session
+
+    def remove_device(self, device_id):
+        """Disconnects and forgets a wearable."""
+        session = self.sessions.pop(device_id, None)
+        if session is not None and self.is_running():
+            self.loop.call_soon_threadsafe(session.request_stop)
+
+    def session(self, device_id):
+        """Returns the DeviceSession registered under device_id (KeyError if unknown)."""
+        return self.sessions[device_id]
+
+    def device_ids(self):
+        return list(self.sessions)
+
+    # --- Loop Lifecycle ---
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive() and self._ready.is_set()
+
+    def _start_session(self, session):
+        task = self._tasks.get(session.device_id)
+        if task is None or task.done():
+            self._tasks[session.device_id] = self.loop.create_task(session.run())
+
+    async def _main(self):
+        self._stop = asyncio.Event()
+        for session in list(self.sessions.values()):
+            self._start_session(session)
+        self._ready.set()
+
+        await self._stop.wait()
+
+        for session in list(self.sessions.values()):
+            session.request_stop()
+        if self._tasks:
+            await asyncio.wait(list(self._tasks.values()), timeout=3)
+        self._tasks.clear()
+
+    def start(self):
+        """Spawns the background thread running every registered session."""
+        if self.thread and self.thread.is_alive():
+            return
+
+        self._ready.clear()
+
+        def runner():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.loop.run_until_complete(self._main())
+            finally:
+                self.loop.close()
+                self._ready.clear()
+
+        self.thread = threading.Thread(target=runner, daemon=True)
+        self.thread.start()
+        self._ready.wait(timeout=3)
+        print("BLE service thread started.")
+
+    def stop(self):
+        """Disconnects every device and terminates the background thread."""
+        if self.is_running():
+            self.loop.call_soon_threadsafe(self._stop.set)
+
+        if self.thread and self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=5)
+            if self.thread.is_alive():
+                print("[BLE Disconnect Error] BLE thread did not stop in time")
+
+        for session in self.sessions.values():
+            if session.connected:
+                session.client = None
+                session._set_connected(False)
@@ -12,6 +12,7 @@ from PyQt5.QtCore import Qt, QSize, QTimer
 from datetime import datetime
 from app_config import RETURN_BUTTON_STYLE, PROJECT_PATH
 
+import numpy as np
 import pyqtgraph as pg
 
 class HearRateChart(QWidget):
@@ -21,13 +22,14 @@ class HearRateChart(QWidget):
     Translates raw logged data points into a time-domain plot, 
     applying dynamic scaling and hardware-accelerated rendering.
     """
-    def __init__(self, directory, hr_list):
+    def __init__(self, directory, hr_list, time_list=None):
         """
         Initializes the chart with session data.
         
         Args:
             directory (str): Path to the current training data.
             hr_list (list): List of recorded heart rate values (BPM).
+            time_list (array): Host-aligned sample times in seconds, one per value (None if unknown).
         """
         super().__init__()
 
@@ -42,12 +44,16 @@ class HearRateChart(QWidget):
         self.x_axis = []
 
         # --- Timeline Logic ---
-        # Converts sequential data points into a minute-based time scale
-        minute = 0
-        for value in self.y_axis:
-            if len(self.x_axis) % 12 == 0: # Assuming 12 samples per minute logic
-                minute += 1
-            self.x_axis.append(minute)
+        if time_list is not None and 0 < len(time_list) == len(self.y_axis):
+            # Timestamped samples: minutes elapsed since the first one
+            self.x_axis = (np.asarray(time_list) - time_list[0]) / 60.0
+        else:
+            # Legacy logs without timestamps: converts sequential data points into a minute-based time scale
+            minute = 0
+            for value in self.y_axis:
+                if len(self.x_axis) % 12 == 0: # Assuming 12 samples per minute logic
+                    minute += 1
+                self.x_axis.append(minute)
 
         # --- UI Styling ---
         self.setStyleSheet("background-color: #121212;")
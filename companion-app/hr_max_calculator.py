@@ -5,7 +5,7 @@ and persists results for session planning.
 """
 
 import app_config
-from app_config import (PROJECT_PATH, BACKGROUND, HR_MAX_LABEL_STYLE, SAVE_BUTTON_STYLE, GET_HR_MAX_STYLE, MSG_STYLE,
+from app_config import (PROJECT_PATH, DATA_ROOT, BACKGROUND, HR_MAX_LABEL_STYLE, SAVE_BUTTON_STYLE, GET_HR_MAX_STYLE, MSG_STYLE,
                         RETURN_BUTTON_STYLE, RECOVERY_LAVBEL_STYLE, AEROBIC_CAPACITY_STYLE, AEROBIC_ENDURANCE_STYLE, 
                         ANAEROBIC_STYLE, VO2_MAX_STYLE, TRAINING_NAME_STYLE)
 from PyQt5.QtWidgets import (QWidget, QApplication, QPushButton, QVBoxLayout, QHBoxLayout, QLabel,
@@ -217,7 +217,7 @@ class CalculateHrMax(QWidget):
             "Threshold:": self.anaerobic,
             "VO2 Max:": self.vo2_max
         }
-        with open(f"{PROJECT_PATH}/hr_zones.json", "w") as f:
+        with open(f"{DATA_ROOT}/hr_zones.json", "w") as f:
             json.dump(data, f, indent=4)
 
         # Clear UI to provide "Saved" confirmation feedback
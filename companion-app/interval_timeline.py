@@ -0,0 +1,265 @@
+"""
+Compiled timeline of a swimming task.
+A task (reps, time limit, pacer, block repeats) is expanded once into a sorted
+list of timed events - countdown beeps, the start, per-rep send-offs, pacer
+beeps and the task end - on the task clock, which starts when the task window
+opens and stops while the task is paused. The clock looks events up by bisection
+and a cursor fires everything that became due since the previous frame, so a
+stalled frame delays a boundary but can never skip it.
+The same task is also described as a compact IntervalProgram, uploaded once to
+the wearable, which expands it identically and runs it on its own clock.
+"""
+
+import heapq
+import time
+from bisect import bisect_right
+
+# --- Event Kinds ---
+COUNTDOWN = "countdown"  # Short beep in the last seconds before a send-off or the end
+START = "start"          # "GO!": first send-off, long beep, pacer armed
+SENDOFF = "sendoff"      # Send-off of a following rep, long beep
+PACER = "pacer"          # Pacer interval inside a rep (the wearable beeps it)
+END = "end"              # Last rep finished, long beep
+
+PRESTART_S = 15.0   # Countdown before the first send-off
+COUNTDOWN_S = 3     # Short beeps this many seconds before each boundary
+
+# Events that start a new segment of the clock display
+SEGMENT_KINDS = (START, SENDOFF, END)
+
+# Wire code of each kind in the wearable's program progress reports (index = code)
+EVENT_KINDS = (COUNTDOWN, START, SENDOFF, PACER, END)
+
+
+class TimelineEvent:
+    """One timed action; rep and block are 1-based (0 before the start)."""
+    __slots__ = ("time_s", "kind", "rep", "block")
+
+    def __init__(self, time_s, kind, rep=0, block=0):
+        self.time_s = time_s
+        self.kind = kind
+        self.rep = rep
+        self.block = block
+
+    def __repr__(self):
+        return f"TimelineEvent({self.time_s:.1f}, {self.kind!r}, rep={self.rep}, block={self.block})"
+
+
+class IntervalProgram:
+    """
+    Periodic description of a task: prestart, send-off interval, pacer period,
+    countdown cues and rep count. It is what the wearable receives (a few bytes
+    instead of one command per event) and events() is the reference expansion
+    the firmware mirrors (interval_program.c), so both sides fire the same events.
+    """
+    __slots__ = ("prestart_s", "interval_s", "pacer_s", "reps", "countdown_s")
+
+    def __init__(self, prestart_s, interval_s, pacer_s, reps, countdown_s):
+        """
+        Args:
+            prestart_s (float): Countdown before the first send-off.
+            interval_s (float): Send-off interval, 0 for a task without a time limit.
+            pacer_s (float): Pacer period inside a rep, 0 for none.
+            reps (int): Reps over all blocks (0 without a time limit).
+            countdown_s (int): Short beeps before each boundary.
+        """
+        self.prestart_s = prestart_s
+        self.interval_s = interval_s
+        self.pacer_s = pacer_s
+        self.reps = reps
+        self.countdown_s = countdown_s
+
+    @classmethod
+    def from_task(cls, task, prestart_s=PRESTART_S, countdown_s=COUNTDOWN_S):
+        """Program of a parsed task (TaskRecord); reps default to 1 when not given."""
+        interval = task.time_limit_s or 0
+        reps = (task.reps or 1) * task.block_reps if interval else 0
+        return cls(prestart_s, interval, task.pacer_s or 0, reps, countdown_s)
+
+    @property
+    def total_s(self):
+        """Task clock time of the end, or None for a task without a time limit."""
+        return self.prestart_s + self.reps * self.interval_s if self.interval_s else None
+
+    def events(self):
+        """
+        Expands the program in time order; at equal times a pacer beep comes
+        before a countdown beep.
+
+        Without a time limit the expansion ends with the start; the wearable
+        then keeps beeping the pacer until the program is stopped.
+
+        Yields:
+            tuple: (task clock time, kind, 1-based rep or 0 before the start).
+        """
+        prestart, interval = self.prestart_s, self.interval_s
+        for second in range(self.countdown_s, 0, -1):
+            if prestart - second >= 0:
+                yield prestart - second, COUNTDOWN, 0
+        yield prestart, START, 1
+        if not interval:
+            return
+
+        for index in range(self.reps):
+            rep = index + 1
+            sendoff = prestart + index * interval
+            boundary = sendoff + interval
+            if index > 0:
+                yield sendoff, SENDOFF, rep
+            pacers = []
+            if self.pacer_s:
+                # Multiplied, not accumulated, so rounding can't add a beep at the boundary
+                beat = 1
+                while sendoff + beat * self.pacer_s < boundary:
+                    pacers.append((sendoff + beat * self.pacer_s, PACER, rep))
+                    beat += 1
+            # Countdown beeps stay inside the rep they end
+            countdowns = [(boundary - second, COUNTDOWN, rep)
+                          for second in range(self.countdown_s, 0, -1) if boundary - second > sendoff]
+            yield from heapq.merge(pacers, countdowns, key=lambda event: event[0])
+        yield self.total_s, END, self.reps
+
+
+class TaskTimeline:
+    """
+    Immutable, time-sorted events of one task.
+
+    A task without a time limit has no rep boundaries: its timeline ends with
+    the start and the clock counts up from it (the wearable's pacer, if armed,
+    keeps its own intervals).
+    """
+    def __init__(self, events, program=None):
+        """
+        Args:
+            events (list): TimelineEvent objects (sorted here, stable for equal times).
+            program (IntervalProgram): Program the events were expanded from, if any.
+        """
+        self.events = sorted(events, key=lambda event: event.time_s)
+        self.times = [event.time_s for event in self.events]
+        self.segments = [event for event in self.events if event.kind in SEGMENT_KINDS]
+        self.segment_times = [event.time_s for event in self.segments]
+        self.program = program
+
+    @classmethod
+    def compile(cls, task, prestart_s=PRESTART_S, countdown_s=COUNTDOWN_S):
+        """
+        Expands a task into its timeline.
+
+        Args:
+            task (TaskRecord): Parsed task; reps default to 1 when not given.
+            prestart_s (float): Countdown before the first send-off.
+            countdown_s (int): Short beeps before each boundary.
+
+        Returns:
+            TaskTimeline: Compiled timeline.
+        """
+        program = IntervalProgram.from_task(task, prestart_s, countdown_s)
+        reps_per_block = task.reps or 1
+        events = [TimelineEvent(time_s, kind, rep, (rep - 1) // reps_per_block + 1 if rep else 0)
+                  for time_s, kind, rep in program.events()]
+        return cls(events, program)
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def start_s(self):
+        return self.segment_times[0]
+
+    @property
+    def end_s(self):
+        """Task clock time of the end, or None for a task without a time limit."""
+        return self.segments[-1].time_s if self.segments[-1].kind == END else None
+
+    def index_at(self, time_s):
+        """Index of the last event at or before time_s, -1 before the first one (O(log n))."""
+        return bisect_right(self.times, time_s) - 1
+
+    def segment_at(self, time_s):
+        """Start, send-off or end event the clock is counting from at time_s; None during the prestart."""
+        index = bisect_right(self.segment_times, time_s) - 1
+        return self.segments[index] if index >= 0 else None
+
+
+class TaskClock:
+    """
+    The task clock on time.monotonic_ns(): immune to wall clock jumps (NTP) and
+    exact across pauses, which are measured on the same clock.
+    """
+    def __init__(self, time_s=0.0, clock=time.monotonic_ns):
+        """
+        Args:
+            time_s (float): Task time to start at (e.g. a resumed task).
+            clock (callable): Monotonic nanosecond counter.
+        """
+        self.clock = clock
+        self.origin_ns = clock() - int(time_s * 1e9) # Monotonic time of task time 0
+        self.paused_at_ns = None
+        self.paused_ns = 0
+
+    @property
+    def paused(self):
+        return self.paused_at_ns is not None
+
+    def now(self):
+        """Current task time in seconds (frozen while paused)."""
+        current = self.paused_at_ns if self.paused else self.clock()
+        return (current - self.origin_ns - self.paused_ns) / 1e9
+
+    def pause(self):
+        if not self.paused:
+            self.paused_at_ns = self.clock()
+
+    def resume(self):
+        if self.paused:
+            self.paused_ns += self.clock() - self.paused_at_ns
+            self.paused_at_ns = None
+
+    def until(self, time_s):
+        """Seconds from now until task time time_s (negative if it has passed)."""
+        return time_s - self.now()
+
+
+class TimelineCursor:
+    """Position of a running task in its timeline."""
+    def __init__(self, timeline, time_s=None):
+        """
+        Args:
+            timeline (TaskTimeline): Compiled timeline.
+            time_s (float): Task clock time to start from (e.g. a resumed task); events
+                before it are considered fired. None starts before the first event.
+        """
+        self.timeline = timeline
+        self.index = 0
+        if time_s is not None:
+            self.seek(time_s)
+
+    def seek(self, time_s):
+        """Skips every event at or before time_s without firing it."""
+        self.index = self.timeline.index_at(time_s) + 1
+
+    def advance(self, time_s):
+        """
+        Returns the events due since the previous call, oldest first.
+
+        Args:
+            time_s (float): Current task clock time.
+
+        Returns:
+            list: TimelineEvent objects with time <= time_s not returned before.
+        """
+        stop = self.timeline.index_at(time_s) + 1
+        if stop <= self.index:
+            return []
+        due = self.timeline.events[self.index:stop]
+        self.index = stop
+        return due
+
+    @property
+    def next_event(self):
+        """The next event to fire, or None once the timeline has run out."""
+        return self.timeline.events[self.index] if self.index < len(self.timeline.events) else None
+
+    @property
+    def finished(self):
+        return self.index >= len(self.timeline.events)
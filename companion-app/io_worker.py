@@ -0,0 +1,95 @@
+"""
+Background file I/O for the training session.
+A single worker thread executes queued disk jobs (closing the session log,
+directory moves, archiving) so the Qt thread - and the pace clock it animates - never
+waits on the SD card. Completion is reported back through Qt signals.
+"""
+
+import itertools
+import queue
+import shutil
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+# Jobs waiting for the worker; a full queue makes submit() wait (backpressure)
+IO_QUEUE_SIZE = 64
+
+
+class IOWorker(QObject):
+    """
+    Bounded FIFO of disk jobs executed in order by one daemon thread.
+
+    submit() returns a job ID right away. When the job ends, job_finished(id, result)
+    or job_failed(id, message) is emitted; both are delivered on the GUI thread,
+    where the optional per-job callbacks run as well.
+    """
+    job_finished = pyqtSignal(int, object)
+    job_failed = pyqtSignal(int, str)
+
+    # Emitted from the worker thread, delivered through a queued connection
+    _job_done = pyqtSignal(int, object, object)
+
+    def __init__(self, queue_size=IO_QUEUE_SIZE):
+        super().__init__()
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.callbacks = {}
+        self.job_ids = itertools.count(1)
+        self._job_done.connect(self._dispatch)
+
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, function, *args, on_done=None, on_error=None):
+        """
+        Queues function(*args) for the worker thread.
+
+        Args:
+            function (callable): Disk operation to run.
+            on_done (callable): Called on the GUI thread with the return value.
+            on_error (callable): Called on the GUI thread with the exception.
+
+        Returns:
+            int: Job ID matching the job_finished / job_failed signals.
+        """
+        job_id = next(self.job_ids)
+        if on_done is not None or on_error is not None:
+            self.callbacks[job_id] = (on_done, on_error)
+        self.jobs.put((job_id, function, args))
+        return job_id
+
+    # --- Common Session Jobs ---
+    def move(self, src, dst, **callbacks):
+        """Moves a file or directory tree (e.g. a finished session into the archive)."""
+        return self.submit(shutil.move, src, dst, **callbacks)
+
+    def _run(self):
+        while True:
+            job_id, function, args = self.jobs.get()
+            try:
+                result = function(*args)
+                self._job_done.emit(job_id, result, None)
+            except Exception as e:
+                self._job_done.emit(job_id, None, e)
+
+    def _dispatch(self, job_id, result, error):
+        on_done, on_error = self.callbacks.pop(job_id, (None, None))
+        if error is None:
+            self.job_finished.emit(job_id, result)
+            if on_done is not None:
+                on_done(result)
+        else:
+            print(f"[IO Error] job {job_id}: {error}")
+            self.job_failed.emit(job_id, str(error))
+            if on_error is not None:
+                on_error(error)
+
+
+_worker = None
+
+def get_io_worker():
+    """Returns the application-wide IOWorker, starting it on first use (GUI thread only)."""
+    global _worker
+    if _worker is None:
+        _worker = IOWorker()
+    return _worker
@@ -1,12 +1,16 @@
 import sys
 import sys
 import os
-from PyQt5.QtWidgets import QWidget, QMainWindow, QSplashScreen, QApplication, QPushButton, QHBoxLayout, QVBoxLayout, QLabel, QSizePolicy, QGridLayout
+from PyQt5.QtWidgets import QWidget, QMainWindow, QSplashScreen, QApplication, QPushButton, QHBoxLayout, QVBoxLayout, QLabel, QSizePolicy, QGridLayout, QMessageBox
 from PyQt5.QtGui import QPainter, QLinearGradient, QColor, QIcon, QPixmap
 from PyQt5.QtCore import Qt, QSize, QTimer
 from datetime import datetime
 import main_window
-from app_config import PROJECT_PATH
+from app_config import PROJECT_PATH, DATA_ROOT
+from session_journal import find_unfinished_session, journal_path
+from session_archive import archive_old_sessions
+from runtime_storage import reconcile_runtime
+from io_worker import get_io_worker
 
 
 class LoadingScreen(QWidget):
@@ -29,7 +33,13 @@ class LoadingScreen(QWidget):
         self.main_layout = QVBoxLayout()
         self.init_ui()
         self.create_layout()
-        QTimer.singleShot(5000, self.show_main)
+
+        # Session data a crash left in RAM goes to the SD card before the journal is compared with it
+        for directory in reconcile_runtime():
+            print(f"Reconciled unflushed session data: {directory}")
+        # A journal left behind means the app died mid-session: skip the splash delay and offer to resume
+        self.unfinished_session = find_unfinished_session()
+        QTimer.singleShot(0 if self.unfinished_session else 5000, self.show_main)
 
     def show_main(self):
         self.close()
@@ -37,6 +47,24 @@ class LoadingScreen(QWidget):
         self.main_window.showFullScreen()
         QTimer.singleShot(50, lambda: self.main_window.setCursor(Qt.BlankCursor))
         QTimer.singleShot(500, self.close_splash_screen)
+        if self.unfinished_session:
+            self.offer_resume()
+        # Compress old finished trainings in the background
+        get_io_worker().submit(archive_old_sessions, os.path.join(DATA_ROOT, "finished_trainings"))
+
+    def offer_resume(self):
+        """Asks whether to continue the interrupted session; declining keeps its data as it is."""
+        state = self.unfinished_session[0]
+        task = f"Task {state['task_number']}" + (" (running)" if state.get("phase") == "task" else "")
+        answer = QMessageBox.question(self.main_window, "Unfinished training",
+                                      f"Training '{state['training']}' was interrupted at {task}.\nResume it?",
+                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.Yes)
+        if answer == QMessageBox.Yes:
+            import task_preview_window
+            self.resumed_window = task_preview_window.resume_session(self.unfinished_session)
+        else:
+            os.remove(journal_path())
+        self.unfinished_session = None
 
 
     def paintEvent(self, event):
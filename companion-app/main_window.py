@@ -13,6 +13,7 @@ from PyQt5.QtGui import QPainter, QIcon, QPixmap
 from PyQt5.QtCore import Qt, QSize, QTimer
 from datetime import datetime
 import bluetooth_connection
+from telemetry_hub import get_hub
 import os
 
 # Sub-module imports for window transitions
@@ -111,10 +112,7 @@ class MainWindow(QWidget):
         # BLE Connection Indicator Management
         self.connect_to_sensor_button.setFixedSize(80, 80)
         self.connect_to_sensor_button.setStyleSheet(SENSOR_BUTTON_STYLE)
-        if bluetooth_connection.is_connected():
-            self.connect_to_sensor_button.setIcon(QIcon(f"{PROJECT_PATH}/icons/sensor_connected.png"))
-        else:
-            self.connect_to_sensor_button.setIcon(QIcon(f"{PROJECT_PATH}/icons/sensor_disconnected.png"))
+        self.update_sensor_icon(bluetooth_connection.is_connected())
         self.connect_to_sensor_button.setIconSize(QSize(80, 80))
         self.connect_to_sensor_button.move((self.available_width // 2) - 40, 0)  
 
@@ -125,6 +123,13 @@ class MainWindow(QWidget):
         self.pace_clock_button.setIconSize(QSize(100, 100))
         self.pace_clock_button.move((self.available_width // 2) - 50, (self.available_height // 2) - 50)
 
+    def update_sensor_icon(self, connected):
+        """Reflects the BLE link state in the status bar icon."""
+        if connected:
+            self.connect_to_sensor_button.setIcon(QIcon(f"{PROJECT_PATH}/icons/sensor_connected.png"))
+        else:
+            self.connect_to_sensor_button.setIcon(QIcon(f"{PROJECT_PATH}/icons/sensor_disconnected.png"))
+
     def layout_settings(self):
         """Builds the vertical and horizontal layout hierarchy."""
         self.time_date_layout.addWidget(self.time_label)
@@ -205,6 +210,9 @@ class MainWindow(QWidget):
         self.info_button.clicked.connect(lambda: self.show_window(info_window.InfoDialog))
         self.power_off_button.clicked.connect(lambda: self.show_window(system_shutdown_window.PowerOff))
 
+        # Live BLE indicator driven by the telemetry hub
+        get_hub().connection_changed.connect(self.update_sensor_icon)
+
     def closeEvent(self, event):
         """Safe shutdown sequence: disconnects BLE and restores OS cursor."""
         bluetooth_connection.disconnect_ble()
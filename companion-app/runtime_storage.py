@@ -0,0 +1,139 @@
+"""
+RAM-backed working copy of the running session.
+The recorder writes the session log into RUNTIME_ROOT (a tmpfs), which mirrors
+the layout of DATA_ROOT on the SD card. A SessionMirror copies what is new to
+the persistent session directory on a timer, at task boundaries and when the
+session closes, so the hot path never waits on the card and a power loss costs
+at most one persist interval (the crash journal covers the rest).
+Anything left in RUNTIME_ROOT by a crash is reconciled at startup.
+"""
+
+import os
+import shutil
+
+from session_format import TEXT_LOG
+
+# --- Persist Policy ---
+PERSIST_INTERVAL_S = 30.0  # Longest time recorded data stays in RAM only
+
+
+def _roots():
+    from app_config import DATA_ROOT, RUNTIME_ROOT
+    return DATA_ROOT, RUNTIME_ROOT
+
+
+def runtime_directory(directory):
+    """
+    Returns the working directory of a persistent session directory, or None if
+    no RUNTIME_ROOT is configured (or the session lives outside DATA_ROOT).
+    """
+    data_root, runtime_root = _roots()
+    if not runtime_root:
+        return None
+    relative = os.path.relpath(os.path.abspath(directory), os.path.abspath(data_root))
+    if relative.startswith(os.pardir):
+        return None
+    return os.path.join(runtime_root, relative)
+
+
+class SessionMirror:
+    """
+    Copies a runtime session directory to its persistent directory.
+
+    The log is append-only, so flush() appends the bytes the persistent copy is
+    missing, measured by its size; the operation is idempotent and also
+    reconciles a copy left behind by a crash. Other files (the task index) are
+    small and replaced atomically when they change.
+    """
+    def __init__(self, runtime_dir, persistent_dir):
+        """
+        Args:
+            runtime_dir (str): Working directory in RAM.
+            persistent_dir (str): Session directory on the SD card.
+        """
+        self.runtime_dir = runtime_dir
+        self.persistent_dir = persistent_dir
+        self.copied = {} # File name -> mtime_ns of the last copy
+
+        # --- Statistics ---
+        self.persists = 0
+        self.bytes_persisted = 0
+
+    def stage(self):
+        """Seeds the runtime directory with the persistent log (e.g. a resumed session)."""
+        os.makedirs(self.runtime_dir, exist_ok=True)
+        source = os.path.join(self.persistent_dir, TEXT_LOG)
+        target = os.path.join(self.runtime_dir, TEXT_LOG)
+        if os.path.exists(source) and (not os.path.exists(target)
+                                       or os.path.getsize(target) < os.path.getsize(source)):
+            shutil.copyfile(source, target)
+
+    def _append_log(self, source, target):
+        done = os.path.getsize(target) if os.path.exists(target) else 0
+        with open(source, "rb") as file:
+            file.seek(done)
+            tail = file.read()
+        if tail:
+            with open(target, "ab") as file:
+                file.write(tail)
+                file.flush()
+                os.fsync(file.fileno())
+        return len(tail)
+
+    def _replace_file(self, name, source, target):
+        mtime_ns = os.stat(source).st_mtime_ns
+        if self.copied.get(name) == mtime_ns:
+            return 0
+        temporary = f"{target}.tmp"
+        shutil.copyfile(source, temporary)
+        os.replace(temporary, target)
+        self.copied[name] = mtime_ns
+        return os.path.getsize(target)
+
+    def flush(self):
+        """Makes the persistent directory match the runtime one. Returns the bytes written."""
+        if not os.path.isdir(self.runtime_dir):
+            return 0
+        os.makedirs(self.persistent_dir, exist_ok=True)
+        written = 0
+        for name in os.listdir(self.runtime_dir):
+            source = os.path.join(self.runtime_dir, name)
+            target = os.path.join(self.persistent_dir, name)
+            if name.endswith(".tmp") or not os.path.isfile(source):
+                continue
+            if name == TEXT_LOG:
+                written += self._append_log(source, target)
+            else:
+                written += self._replace_file(name, source, target)
+        self.persists += 1
+        self.bytes_persisted += written
+        return written
+
+    def discard(self):
+        """Removes the runtime directory (after a final flush)."""
+        shutil.rmtree(self.runtime_dir, ignore_errors=True)
+
+
+def reconcile_runtime():
+    """
+    Persists the sessions a crash left in RUNTIME_ROOT and clears them (startup, before
+    the crash journal is read, so recovery compares it with the complete log).
+
+    Returns:
+        list: Persistent directories that were brought up to date.
+    """
+    data_root, runtime_root = _roots()
+    if not runtime_root or not os.path.isdir(runtime_root):
+        return []
+    reconciled = []
+    for path, folders, files in os.walk(runtime_root, topdown=False):
+        if TEXT_LOG in files:
+            mirror = SessionMirror(path, os.path.join(data_root, os.path.relpath(path, runtime_root)))
+            try:
+                mirror.flush()
+            except OSError as e:
+                print(f"[Storage Error] {path}: {e}")
+                continue
+            mirror.discard()
+            reconciled.append(mirror.persistent_dir)
+    return reconciled
@@ -0,0 +1,98 @@
+"""
+Fixed-capacity telemetry ring buffer shared between the BLE thread and the GUI.
+A single writer publishes samples without allocating; any number of readers
+drain them through their own cursors.
+"""
+
+from array import array
+from collections import namedtuple
+
+# Immutable view of one stored sample (timestamp is time.monotonic() seconds,
+# seq the device sequence number or NO_SEQ for firmware without sequenced frames)
+Sample = namedtuple("Sample", ["timestamp", "bpm", "spo2", "battery", "voltage", "seq"])
+NO_SEQ = -1
+
+
+class SampleRingBuffer:
+    """
+    Preallocated, array-backed ring of monotonic-timestamped samples.
+
+    The BLE thread is the only writer: it fills every column of a slot first and
+    publishes it last by bumping the write counter, so readers never see a torn
+    sample. Readers keep a cursor (the write counter they have seen) and call
+    read_since() to receive every sample exactly once, as long as they keep up
+    with the buffer capacity.
+    """
+    def __init__(self, capacity=4096):
+        """
+        Args:
+            capacity (int): Number of samples retained before the oldest are overwritten.
+        """
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._bpm = array("H", bytes(2 * capacity))
+        self._spo2 = array("B", bytes(capacity))
+        self._battery = array("B", bytes(capacity))
+        self._voltage = array("d", bytes(8 * capacity))
+        self._seq = array("q", bytes(8 * capacity))
+        self._write_count = 0
+        self.dropped = 0 # Samples overwritten before a reader could drain them
+
+    def append(self, timestamp, bpm, spo2, battery, voltage, seq=NO_SEQ):
+        """Writer side: stores one sample into the next slot and publishes it."""
+        slot = self._write_count % self.capacity
+        self._timestamps[slot] = timestamp
+        self._bpm[slot] = bpm
+        self._spo2[slot] = spo2
+        self._battery[slot] = battery
+        self._voltage[slot] = voltage
+        self._seq[slot] = seq
+        # Publishing step: the sample becomes visible to readers only now
+        self._write_count += 1
+
+    def cursor(self):
+        """Returns a cursor positioned after the newest sample (skips history)."""
+        return self._write_count
+
+    def _sample_at(self, index):
+        slot = index % self.capacity
+        return Sample(self._timestamps[slot], self._bpm[slot], self._spo2[slot],
+                      self._battery[slot], self._voltage[slot], self._seq[slot])
+
+    def read_since(self, cursor):
+        """
+        Returns all samples published after the given cursor.
+
+        Args:
+            cursor (int): Value returned by cursor() or by a previous read_since() call.
+
+        Returns:
+            tuple: (list of Sample, new cursor)
+        """
+        end = self._write_count
+        start = max(cursor, end - self.capacity)
+        if start > cursor:
+            self.dropped += start - cursor
+
+        samples = [self._sample_at(index) for index in range(start, end)]
+
+        # The writer may have lapped the oldest copied slots while we were reading
+        overwritten = self._write_count - self.capacity - start
+        if overwritten > 0:
+            self.dropped += overwritten
+            samples = samples[overwritten:]
+        return samples, end
+
+    def latest(self):
+        """Returns the newest sample, or None if nothing has been written yet."""
+        while True:
+            count = self._write_count
+            if count == 0:
+                return None
+            sample = self._sample_at(count - 1)
+            # Retry in the (practically impossible) case the slot was reused meanwhile
+            if self._write_count - count < self.capacity:
+                return sample
+
+    def __len__(self):
+        return min(self._write_count, self.capacity)
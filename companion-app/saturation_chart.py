@@ -12,6 +12,7 @@ from PyQt5.QtCore import Qt, QSize, QTimer
 from datetime import datetime
 from app_config import RETURN_BUTTON_STYLE, PROJECT_PATH
 
+import numpy as np
 import pyqtgraph as pg
 
 class SPO2Chart(QWidget):
@@ -21,13 +22,14 @@ class SPO2Chart(QWidget):
     Translates raw data from the ESP32 sensor into a visual timeline, 
     optimized for high-contrast viewing on embedded displays.
     """
-    def __init__(self, directory, spo2_list):
+    def __init__(self, directory, spo2_list, time_list=None):
         """
         Initializes the saturation chart.
         
         Args:
             directory (str): Session data directory path.
             spo2_list (list): Historical SpO2 percentage values.
+            time_list (array): Host-aligned sample times in seconds, one per value (None if unknown).
         """
         super().__init__()
 
@@ -43,12 +45,16 @@ class SPO2Chart(QWidget):
         self.x_axis = []
 
         # --- Time Domain Calculation ---
-        # Maps raw sensor samples to a continuous minute-based scale
-        minute = 0
-        for value in self.y_axis:
-            if len(self.x_axis) % 12 == 0: # Correlation logic: 12 samples = 1 minute
-                minute += 1
-            self.x_axis.append(minute)
+        if time_list is not None and 0 < len(time_list) == len(self.y_axis):
+            # Timestamped samples: minutes elapsed since the first one
+            self.x_axis = (np.asarray(time_list) - time_list[0]) / 60.0
+        else:
+            # Legacy logs: maps raw sensor samples to a continuous minute-based scale
+            minute = 0
+            for value in self.y_axis:
+                if len(self.x_axis) % 12 == 0: # Correlation logic: 12 samples = 1 minute
+                    minute += 1
+                self.x_axis.append(minute)
 
         # Basic Widget Styling
         self.setStyleSheet("background-color: #121212;")
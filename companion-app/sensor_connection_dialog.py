@@ -3,9 +3,10 @@ Bluetooth sensor management interface for the swimming assistant sensor.
 """
 
 from PyQt5.QtWidgets import QDialog, QApplication, QPushButton, QVBoxLayout, QHBoxLayout, QLabel
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QPainter, QBrush, QColor
 import bluetooth_connection
+from telemetry_hub import get_hub
 from app_config import BATTERY_STYLE
 
 class SensorWindow(QDialog):
@@ -18,7 +19,7 @@ class SensorWindow(QDialog):
     """
 
     def __init__(self):
-        """Initializes the sensor manager, UI widgets, and background refresh timers."""
+        """Initializes the sensor manager, UI widgets, and telemetry subscriptions."""
         super().__init__()
 
         self.setWindowTitle("Sensor")
@@ -45,14 +46,17 @@ class SensorWindow(QDialog):
         # --- BLE States Logic ---
         self.connected = False
         self.connecting = False
-        self.update_ble_state()
+        self.update_ble_state(bluetooth_connection.is_connected())
+
+        latest = bluetooth_connection.reading_parameters()
+        if latest is not None:
+            self.display_battery_condition(latest.battery, latest.voltage)
  
-        # --- Background Telemetry Refresh ---
-        # Polling timer to synchronize UI with asynchronous BLE thread state
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_ble_state)
-        self.timer.timeout.connect(self.display_battery_condition)
-        self.timer.start(1000) # 1Hz refresh rate for connection and battery status
+        # --- Push-based Telemetry Refresh ---
+        # The hub delivers link and battery changes as they happen, no polling needed
+        self.telemetry_hub = get_hub()
+        self.telemetry_hub.connection_changed.connect(self.update_ble_state)
+        self.telemetry_hub.battery_changed.connect(self.display_battery_condition)
 
         self.update_ui_state()
 
@@ -165,9 +169,9 @@ class SensorWindow(QDialog):
             self.connecting = False
             self.update_ui_state()
 
-    def update_ble_state(self):
+    def update_ble_state(self, connected):
         """Synchronizes internal flags with the real-time status of the BLE hardware link."""
-        if bluetooth_connection.is_connected(): 
+        if connected:
             self.connected = True
             self.connecting = False
         else:
@@ -184,8 +188,15 @@ class SensorWindow(QDialog):
         painter.setPen(QColor(255, 255, 255))
         painter.drawRoundedRect(self.rect(), 25, 25)
 
-    def display_battery_condition(self):
-        """Fetches and displays the latest power metrics from the wearable peripheral."""
-        latest = getattr(bluetooth_connection, "latest_values", {})
-
-        battery_percentage
\ No newline at end of file
+    def display_battery_condition(self, percentage, voltage):
+        """Displays the latest power metrics from the wearable peripheral."""
+        self.battery_percentage_label.setText(f"{percentage}%")
+        self.battery_voltage_label.setText(f"{voltage:.2f}V")
+
+    def closeEvent(self, event):
+        """Drops telemetry subscriptions so the closed dialog stops receiving updates."""
+        try:
+            self.telemetry_hub.connection_changed.disconnect(self.update_ble_state)
+            self.telemetry_hub.battery_changed.disconnect(self.display_battery_condition)
+        except TypeError: pass
+        super().closeEvent(event)
@@ -0,0 +1,114 @@
+"""
+Gap detection and in-order merging of sequenced telemetry.
+Decides when to ask the wearable for a backfill and releases live and
+backfilled samples in sequence order, so the session log never interleaves them.
+"""
+
+import time
+
+import telemetry_protocol
+
+# Live samples are held back at most this long while a backfill is outstanding
+BACKFILL_TIMEOUT_S = 5.0
+
+
+class SequenceTracker:
+    """
+    Per-device sequence bookkeeping, used on the BLE thread only.
+
+    Records are (seq, timestamp, bpm, spo2, battery, voltage) tuples.
+    on_live() and on_backfill() return the records that may be published now,
+    already in sequence order. When a live record skips sequence numbers, it
+    returns a (from_seq, count) backfill request instead and holds live records
+    back until on_backfill_end() or the timeout releases them.
+    """
+    def __init__(self, device_capacity=telemetry_protocol.DEVICE_RING_CAPACITY, timeout=BACKFILL_TIMEOUT_S):
+        """
+        Args:
+            device_capacity (int): Samples the device retains; older gaps are lost for good.
+            timeout (float): Seconds to wait for the backfill end marker.
+        """
+        self.device_capacity = device_capacity
+        self.timeout = timeout
+        self.last_seq = None
+        self.held = []
+        self.backfill = None # (from_seq, end_seq) of the outstanding request
+        self.backfill_deadline = 0.0
+
+        # --- Statistics ---
+        self.gaps = 0
+        self.backfilled = 0
+        self.lost = 0
+        self.duplicates = 0
+
+    def _release(self, record, released):
+        seq = record[0]
+        if self.last_seq is not None:
+            if seq <= self.last_seq:
+                self.duplicates += 1
+                return
+            self.lost += seq - self.last_seq - 1
+        self.last_seq = seq
+        released.append(record)
+
+    def _flush_held(self):
+        released = []
+        for record in sorted(self.held):
+            self._release(record, released)
+        self.held = []
+        self.backfill = None
+        return released
+
+    def on_live(self, record):
+        """
+        Handles a sample received on the live characteristic.
+
+        Returns:
+            tuple: (records to publish, backfill request (from_seq, count) or None)
+        """
+        seq = record[0]
+        released = []
+
+        if self.backfill is not None:
+            if time.monotonic() < self.backfill_deadline:
+                self.held.append(record)
+                return released, None
+            print(f"[BLE Backfill] no end marker after {self.timeout:.0f} s, releasing held samples")
+            released = self._flush_held()
+
+        # Live notifications arrive in order, so a sequence number that doesn't move
+        # forward means the device restarted and counts from zero again: a new stream
+        if self.last_seq is not None and seq <= self.last_seq:
+            self.last_seq = None
+
+        if self.last_seq is not None and seq > self.last_seq + 1:
+            self.gaps += 1
+            from_seq = max(self.last_seq + 1, seq - self.device_capacity)
+            self.backfill = (from_seq, seq)
+            self.backfill_deadline = time.monotonic() + self.timeout
+            self.held.append(record)
+            return released, (from_seq, seq - from_seq)
+
+        self._release(record, released)
+        return released, None
+
+    def on_backfill(self, record):
+        """Handles a sample replayed on the backfill characteristic; returns the records to publish."""
+        released = []
+        if self.backfill is not None and self.backfill[0] <= record[0] < self.backfill[1]:
+            self._release(record, released)
+            self.backfilled += len(released)
+        return released
+
+    def on_backfill_end(self):
+        """Backfill finished: releases the live records held back meanwhile."""
+        return self._flush_held()
+
+    def on_disconnect(self):
+        """Releases held records so nothing stays stuck while the link is down."""
+        return self._flush_held()
+
+    def statistics(self):
+        """Returns gap, backfill, loss and duplicate counters since the session started."""
+        return {"gaps": self.gaps, "backfilled": self.backfilled,
+                "lost": self.lost, "duplicates": self.duplicates}
@@ -0,0 +1,123 @@
+"""
+Cold storage tier for finished trainings.
+Sessions older than a configurable age are replaced by a compressed
+training_data.cold file (see session_format); open_session() decodes them
+transparently, so the overview and the charts do not change. Each archived
+session is verified before its uncompressed files are removed, and a report
+lists the compression ratio and the decompression time.
+
+Usage: python session_archive.py [--age DAYS] [--codec zlib|lzma] [--report-only] [ROOT]
+"""
+
+import argparse
+import os
+import time
+
+from session_format import (COLD_FILE, SESSION_FILE, TASK_INDEX_FILE, TEXT_LOG, compress_session,
+                            decompress_session, open_session, session_file)
+from session_summary import write_summary
+
+COLD_STORAGE_AGE_DAYS = 30  # Finished trainings older than this are compressed
+COLD_CODEC = "lzma"         # Best ratio; "zlib" compresses several times faster
+
+
+def archive_session(directory, codec=COLD_CODEC):
+    """
+    Compresses one session and removes its text log and binary file.
+
+    Returns:
+        dict: archive_report() entry of the session.
+    """
+    session_path = open_session(directory).path # Brings the binary file up to date with the log
+    cold_path = os.path.join(directory, COLD_FILE)
+    before = sum(os.path.getsize(os.path.join(directory, name)) for name in (TEXT_LOG, SESSION_FILE)
+                 if os.path.exists(os.path.join(directory, name)))
+
+    compress_session(session_path, cold_path, codec)
+    with open(session_path, "rb") as file:
+        if decompress_session(cold_path) != file.read():
+            os.remove(cold_path)
+            raise ValueError(f"{directory}: cold copy does not match the session, kept uncompressed")
+
+    for name in (TEXT_LOG, SESSION_FILE, TASK_INDEX_FILE):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+    # The summary now describes the cold file
+    write_summary(directory)
+
+    report = archive_report(directory)
+    report["before_bytes"] = before
+    report["ratio"] = before / report["cold_bytes"]
+    return report
+
+
+def archive_report(directory):
+    """Measures the cold file of an archived session: size and time to decode it."""
+    cold_path = os.path.join(directory, COLD_FILE)
+    started = time.perf_counter()
+    raw = decompress_session(cold_path)
+    decompress_s = time.perf_counter() - started
+    cold_bytes = os.path.getsize(cold_path)
+    return {"directory": directory, "before_bytes": len(raw), "cold_bytes": cold_bytes,
+            "ratio": len(raw) / cold_bytes, "decompress_ms": 1000 * decompress_s}
+
+
+def archive_old_sessions(root, max_age_days=COLD_STORAGE_AGE_DAYS, codec=COLD_CODEC, now=None):
+    """
+    Moves every finished training older than max_age_days into cold storage.
+    Meant to run on the I/O worker; failures are reported and the session is left as it was.
+
+    Returns:
+        list: archive_session() reports of the sessions archived by this call.
+    """
+    now = time.time() if now is None else now
+    reports = []
+    for name in sorted(os.listdir(root)):
+        directory = os.path.join(root, name)
+        path = session_file(directory) or os.path.join(directory, TEXT_LOG)
+        if (not os.path.isdir(directory) or path.endswith(COLD_FILE) or not os.path.exists(path)
+                or now - os.path.getmtime(path) < max_age_days * 86400):
+            continue
+        try:
+            reports.append(archive_session(directory, codec))
+        except (OSError, ValueError) as e:
+            print(f"[Archive Error] {directory}: {e}")
+    return reports
+
+
+def print_report(reports):
+    print(f"{'session':<32} {'before KiB':>10} {'cold KiB':>9} {'ratio':>7} {'decode ms':>9}")
+    for report in reports:
+        print(f"{os.path.basename(report['directory'])[:32]:<32} {report['before_bytes'] / 1024:>10.1f} "
+              f"{report['cold_bytes'] / 1024:>9.1f} {report['ratio']:>7.1f} {report['decompress_ms']:>9.2f}")
+    if reports:
+        before = sum(report["before_bytes"] for report in reports)
+        cold = sum(report["cold_bytes"] for report in reports)
+        print(f"{'total':<32} {before / 1024:>10.1f} {cold / 1024:>9.1f} {before / cold:>7.1f} "
+              f"{max(report['decompress_ms'] for report in reports):>9.2f} (max)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", nargs="?", help="finished trainings folder (default: the app's)")
+    parser.add_argument("--age", type=float, default=COLD_STORAGE_AGE_DAYS, help="minimum age in days")
+    parser.add_argument("--codec", choices=("zlib", "lzma"), default=COLD_CODEC)
+    parser.add_argument("--report-only", action="store_true", help="only measure sessions already archived")
+    args = parser.parse_args()
+
+    root = args.root
+    if root is None:
+        from app_config import DATA_ROOT
+        root = os.path.join(DATA_ROOT, "finished_trainings")
+
+    if args.report_only:
+        reports = [archive_report(os.path.join(root, name)) for name in sorted(os.listdir(root))
+                   if os.path.exists(os.path.join(root, name, COLD_FILE))]
+    else:
+        reports = archive_old_sessions(root, args.age, args.codec)
+    print_report(reports)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,534 @@
+"""
+Columnar binary storage of finished training sessions.
+A training_data.bin file holds a small header, a per-task offset table and one
+fixed-width typed column per field (timestamp, bpm, spo2, task). Readers map
+the columns with numpy.memmap, so opening a session only reads the header and
+the data is paged in on first access. Legacy training_data.txt logs are
+converted on demand or in bulk from the command line.
+
+Archived sessions can be kept as a compressed training_data.cold file instead
+(delta-encoded, byte-shuffled columns, zlib or lzma), read back into memory by
+the same SessionData class.
+
+Text logs get a task_index.json sidecar (task number, first sample, byte
+offset of the task marker), written by the recorder as it goes or rebuilt
+from the log, so one task can be read without scanning the whole file.
+
+Usage: python session_format.py [SESSION_DIR ...]   (default: every finished training)
+"""
+
+import json
+import lzma
+import math
+import os
+import struct
+import sys
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+TEXT_LOG = "training_data.txt"
+SESSION_FILE = "training_data.bin"
+TASK_INDEX_FILE = "task_index.json"
+COLD_FILE = "training_data.cold"
+
+# --- File Layout ---
+MAGIC = b"SWIM"
+FORMAT_VERSION = 1
+# magic, version, reserved, sample count, task count, session start/end (Unix seconds, NaN if unknown)
+HEADER = struct.Struct("<4sHHIIdd")
+# task number, index of its first sample
+TASK_ENTRY = struct.Struct("<II")
+# Column order on disk; each column starts on an 8-byte boundary
+COLUMNS = (
+    ("timestamp", np.dtype("<f8")), # Wall clock (Unix) seconds, NaN for lines logged without one
+    ("bpm", np.dtype("<u2")),
+    ("spo2", np.dtype("<u1")),
+    ("task", np.dtype("<u2")),       # 0 for samples logged before the first task marker
+)
+COLUMN_ALIGNMENT = 8
+
+MARKER_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# --- Cold Storage Layout ---
+COLD_MAGIC = b"SWMZ"
+COLD_VERSION = 1
+# magic, version, codec, reserved, size of the decoded session file
+COLD_HEADER = struct.Struct("<4sBBHI")
+CODECS = {1: ("zlib", zlib.compress, zlib.decompress),
+          2: ("lzma", lzma.compress, lzma.decompress)}
+CODEC_IDS = {name: codec_id for codec_id, (name, _, _) in CODECS.items()}
+
+
+def _aligned(offset):
+    return -(-offset // COLUMN_ALIGNMENT) * COLUMN_ALIGNMENT
+
+
+def column_offsets(sample_count, task_count):
+    """Returns {column name: byte offset} for a file with the given counts."""
+    offset = HEADER.size + task_count * TASK_ENTRY.size
+    offsets = {}
+    for name, dtype in COLUMNS:
+        offset = _aligned(offset)
+        offsets[name] = offset
+        offset += sample_count * dtype.itemsize
+    return offsets
+
+
+class SessionData:
+    """
+    Read-only, memory-mapped view of a training_data.bin file.
+
+    The constructor reads only the header and the task table; each column is
+    mapped the first time it is accessed and shared by later accesses. Columns
+    are numpy arrays, so aggregates and slices never build Python lists.
+    A session decoded from cold storage is served from memory the same way.
+    """
+    def __init__(self, path, buffer=None):
+        """
+        Args:
+            path (str): training_data.bin file (or the cold file the buffer came from).
+            buffer (bytes): Contents of a session file, used instead of mapping `path`.
+
+        Raises:
+            ValueError: If the file is not a session file of a supported version.
+        """
+        self.path = path
+        self.buffer = buffer
+        if buffer is None:
+            with open(path, "rb") as file:
+                header = file.read(HEADER.size)
+                table = file.read(self._parse_header(header) * TASK_ENTRY.size)
+        else:
+            task_count = self._parse_header(buffer[:HEADER.size])
+            table = buffer[HEADER.size:HEADER.size + task_count * TASK_ENTRY.size]
+        task_count = len(table) // TASK_ENTRY.size
+
+        # (task number, first sample index), in recording order
+        self.tasks = [TASK_ENTRY.unpack_from(table, index * TASK_ENTRY.size) for index in range(task_count)]
+        # task number -> [start, stop) sample range
+        self.task_ranges = {}
+        for index, (number, start) in enumerate(self.tasks):
+            stop = self.tasks[index + 1][1] if index + 1 < len(self.tasks) else self.sample_count
+            self.task_ranges[number] = (start, stop)
+        self.offsets = column_offsets(self.sample_count, task_count)
+        self._columns = {}
+
+    def _parse_header(self, header):
+        """Reads the fixed header and returns the task count."""
+        if len(header) < HEADER.size:
+            raise ValueError(f"{self.path}: truncated session header")
+        magic, version, _, self.sample_count, task_count, self.started_at, self.ended_at = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: not a session file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: unsupported session format version {version}")
+        return task_count
+
+    def __len__(self):
+        return self.sample_count
+
+    def column(self, name):
+        """Returns a column as a read-only numpy array, mapping it on first use."""
+        array = self._columns.get(name)
+        if array is None:
+            dtype = dict(COLUMNS)[name]
+            if self.sample_count == 0:
+                array = np.empty(0, dtype=dtype) # numpy cannot map an empty region
+            elif self.buffer is not None:
+                array = np.frombuffer(self.buffer, dtype=dtype, count=self.sample_count, offset=self.offsets[name])
+            else:
+                array = np.memmap(self.path, dtype=dtype, mode="r", offset=self.offsets[name],
+                                  shape=(self.sample_count,))
+            self._columns[name] = array
+        return array
+
+    @property
+    def timestamps(self):
+        return self.column("timestamp")
+
+    @property
+    def bpm(self):
+        return self.column("bpm")
+
+    @property
+    def spo2(self):
+        return self.column("spo2")
+
+    @property
+    def task_numbers(self):
+        return self.column("task")
+
+    def has_timestamps(self):
+        """True if every sample carries a host timestamp (logs recorded before that feature do not)."""
+        return self.sample_count > 0 and not np.isnan(self.timestamps).any()
+
+    def task_bounds(self, number):
+        """
+        Returns the [start, stop) sample range of a task from the offset table.
+
+        Raises:
+            KeyError: If the session has no such task.
+        """
+        try:
+            return self.task_ranges[number]
+        except KeyError:
+            raise KeyError(f"{self.path}: no task {number}") from None
+
+    def task(self, number):
+        """Returns the samples of one task as a zero-copy SessionSlice (O(1), nothing is read)."""
+        start, stop = self.task_bounds(number)
+        return SessionSlice(self, number, start, stop)
+
+    def duration_s(self):
+        """Wall clock length of the session from its markers, or None if one is missing."""
+        if math.isnan(self.started_at) or math.isnan(self.ended_at):
+            return None
+        return self.ended_at - self.started_at
+
+
+class SessionSlice:
+    """
+    Contiguous run of samples of a SessionData, typically one task.
+
+    Columns are views into the parent's memory maps, so only the pages of the
+    slice are ever read and statistics cost proportional to its length.
+    """
+    def __init__(self, session, number, start, stop):
+        self.session = session
+        self.number = number
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def column(self, name):
+        return self.session.column(name)[self.start:self.stop]
+
+    @property
+    def timestamps(self):
+        return self.column("timestamp")
+
+    @property
+    def bpm(self):
+        return self.column("bpm")
+
+    @property
+    def spo2(self):
+        return self.column("spo2")
+
+    def has_timestamps(self):
+        return len(self) > 0 and not np.isnan(self.timestamps).any()
+
+
+def write_session(path, timestamps, bpm, spo2, task, tasks=(), started_at=math.nan, ended_at=math.nan):
+    """
+    Writes a session file atomically (temporary file, then rename).
+
+    Args:
+        path (str): Destination training_data.bin.
+        timestamps, bpm, spo2, task (sequence): Equally long sample columns.
+        tasks (iterable): (task number, first sample index) pairs.
+        started_at, ended_at (float): Session start and end as Unix seconds.
+    """
+    columns = {"timestamp": timestamps, "bpm": bpm, "spo2": spo2, "task": task}
+    sample_count = len(timestamps)
+    if any(len(values) != sample_count for values in columns.values()):
+        raise ValueError("session columns differ in length")
+    tasks = list(tasks)
+    offsets = column_offsets(sample_count, len(tasks))
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, sample_count, len(tasks), started_at, ended_at))
+        for number, start in tasks:
+            file.write(TASK_ENTRY.pack(number, start))
+        for name, dtype in COLUMNS:
+            file.write(bytes(offsets[name] - file.tell())) # Alignment padding
+            file.write(np.asarray(columns[name], dtype=dtype).tobytes())
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+# --- Legacy Text Logs ---
+def _marker_time(line, marker):
+    try:
+        return datetime.strptime(line.split(marker, 1)[1].strip(), MARKER_TIME_FORMAT).timestamp()
+    except ValueError:
+        return math.nan
+
+
+def _parse_sample_line(line):
+    """
+    Parses a 'bpm,spo2' or 'bpm,spo2,timestamp' line.
+
+    Returns:
+        tuple: (bpm, spo2, timestamp or NaN), or None for any other line, including
+        a torn one (cut off before its newline, or joined with the next line).
+    """
+    if "," not in line or not line.endswith("\n"):
+        return None
+    fields = line.split(",")
+    if len(fields) > 3:
+        return None
+    try:
+        bpm, spo2 = int(fields[0]), int(fields[1])
+        timestamp = float(fields[2]) if len(fields) > 2 else math.nan
+    except ValueError:
+        return None
+    if not (0 <= bpm <= 0xFFFF and 0 <= spo2 <= 0xFF):
+        return None
+    return bpm, spo2, timestamp
+
+
+def read_text_log(path):
+    """
+    Parses a training_data.txt log.
+
+    Sample lines are 'bpm,spo2' or 'bpm,spo2,timestamp'; '-----TASKn-----' lines
+    start task n and the SESSION START / SESSION END lines give the wall clock span.
+
+    Returns:
+        dict: write_session() keyword arguments.
+    """
+    timestamps, bpm, spo2, task = [], [], [], []
+    tasks = []
+    started_at = ended_at = math.nan
+    current_task = 0
+
+    with open(path, "r") as file:
+        for line in file:
+            if "," in line:
+                values = _parse_sample_line(line)
+                if values is None:
+                    continue # Torn line from an interrupted write
+                bpm.append(values[0])
+                spo2.append(values[1])
+                timestamps.append(values[2])
+                task.append(current_task)
+            elif line.startswith("-----TASK"):
+                current_task = int(line.strip("-\n\r TASK"))
+                tasks.append((current_task, len(bpm)))
+            elif line.startswith("SESSION START:"):
+                started_at = _marker_time(line, "SESSION START:")
+            elif line.startswith("SESSION END:"):
+                ended_at = _marker_time(line, "SESSION END:")
+
+    return {"timestamps": timestamps, "bpm": bpm, "spo2": spo2, "task": task, "tasks": tasks,
+            "started_at": started_at, "ended_at": ended_at}
+
+
+def build_task_index(path):
+    """
+    Rebuilds the task index of a text log with one scan.
+    Samples are counted like read_text_log() parses them, so indices agree.
+
+    Returns:
+        tuple: ([task number, first sample index, byte offset of the marker] entries, sample count).
+    """
+    entries = []
+    samples = offset = 0
+    with open(path, "rb") as file:
+        for line in file:
+            if b"," in line:
+                if _parse_sample_line(line.decode("ascii", errors="replace")) is not None:
+                    samples += 1
+            elif line.startswith(b"-----TASK"):
+                entries.append([int(line.strip(b"-\n\r TASK")), samples, offset])
+            offset += len(line)
+    return entries, samples
+
+
+def write_task_index(directory, entries):
+    """Atomically stores task index entries next to the text log."""
+    path = os.path.join(directory, TASK_INDEX_FILE)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump({"tasks": entries}, file)
+    os.replace(temporary, path)
+
+
+def read_task_index(directory):
+    """Returns the task index entries of a text log, rebuilding (and storing) them if the sidecar is missing."""
+    try:
+        with open(os.path.join(directory, TASK_INDEX_FILE), "r") as file:
+            return json.load(file)["tasks"]
+    except (FileNotFoundError, ValueError, KeyError):
+        entries, _ = build_task_index(os.path.join(directory, TEXT_LOG))
+        try:
+            write_task_index(directory, entries)
+        except OSError:
+            pass
+        return entries
+
+
+def read_text_task(directory, number):
+    """
+    Reads one task straight from a text log by seeking to its marker.
+
+    Returns:
+        dict: timestamps, bpm and spo2 numpy columns of the task.
+
+    Raises:
+        KeyError: If the log has no such task.
+    """
+    offsets = {entry[0]: entry[2] for entry in read_task_index(directory)}
+    if number not in offsets:
+        raise KeyError(f"{directory}: no task {number}")
+
+    timestamps, bpm, spo2 = [], [], []
+    with open(os.path.join(directory, TEXT_LOG), "r") as file:
+        file.seek(offsets[number])
+        file.readline() # The task's own marker
+        for line in file:
+            if line.startswith("-----TASK") or line.startswith("SESSION END:"):
+                break
+            if "," in line:
+                values = _parse_sample_line(line)
+                if values is None:
+                    continue # Torn line from an interrupted write
+                bpm.append(values[0])
+                spo2.append(values[1])
+                timestamps.append(values[2])
+    return {"timestamps": np.array(timestamps, dtype=np.float64),
+            "bpm": np.array(bpm, dtype=np.uint16), "spo2": np.array(spo2, dtype=np.uint8)}
+
+
+def convert_text_log(directory):
+    """Writes the binary file of a session directory from its text log and returns its path."""
+    path = os.path.join(directory, SESSION_FILE)
+    write_session(path, **read_text_log(os.path.join(directory, TEXT_LOG)))
+    return path
+
+
+# --- Cold Storage ---
+def _shuffle(data, itemsize):
+    """Groups the n-th bytes of all values together, so slowly changing values compress well."""
+    return np.frombuffer(data, dtype=np.uint8).reshape(-1, itemsize).T.tobytes()
+
+
+def _unshuffle(data, itemsize):
+    return np.frombuffer(data, dtype=np.uint8).reshape(itemsize, -1).T.tobytes()
+
+
+def _encode_column(values):
+    if values.dtype.kind == "f":
+        # Lossless: XOR with the previous value leaves mostly zero high bytes
+        bits = values.view(np.uint64)
+        encoded = np.concatenate((bits[:1], bits[1:] ^ bits[:-1]))
+    else:
+        # Wrapping differences, undone by a wrapping cumulative sum
+        encoded = np.concatenate((values[:1], np.diff(values)))
+    return _shuffle(encoded.astype(encoded.dtype.newbyteorder("<"), copy=False).tobytes(), values.dtype.itemsize)
+
+
+def _decode_column(data, dtype):
+    if dtype.kind == "f":
+        bits = np.frombuffer(_unshuffle(data, dtype.itemsize), dtype="<u8")
+        return np.bitwise_xor.accumulate(bits).view(dtype)
+    deltas = np.frombuffer(_unshuffle(data, dtype.itemsize), dtype=dtype)
+    return np.cumsum(deltas, dtype=dtype)
+
+
+def compress_session(session_path, cold_path, codec="lzma"):
+    """
+    Writes the cold copy of a session file atomically.
+
+    Args:
+        session_path (str): training_data.bin to archive.
+        cold_path (str): Destination training_data.cold.
+        codec (str): "zlib" (faster) or "lzma" (smaller).
+    """
+    with open(session_path, "rb") as file:
+        raw = file.read()
+    session = SessionData(session_path, buffer=raw)
+    first_column = min(session.offsets.values())
+    parts = [raw[:first_column]] # Header and task table, stored as they are
+    for name, _ in COLUMNS:
+        parts.append(_encode_column(np.asarray(session.column(name))))
+
+    codec_id = CODEC_IDS[codec]
+    temporary = f"{cold_path}.tmp"
+    with open(temporary, "wb") as file:
+        file.write(COLD_HEADER.pack(COLD_MAGIC, COLD_VERSION, codec_id, 0, len(raw)))
+        file.write(CODECS[codec_id][1](b"".join(parts)))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, cold_path)
+
+
+def decompress_session(cold_path):
+    """Decodes a cold file back into the exact bytes of the archived session file."""
+    with open(cold_path, "rb") as file:
+        data = file.read()
+    magic, version, codec_id, _, raw_size = COLD_HEADER.unpack_from(data)
+    if magic != COLD_MAGIC or version != COLD_VERSION or codec_id not in CODECS:
+        raise ValueError(f"{cold_path}: not a supported cold session file")
+    payload = CODECS[codec_id][2](data[COLD_HEADER.size:])
+
+    # The payload starts with the original header and task table
+    header = SessionData(cold_path, buffer=payload)
+    first_column = min(header.offsets.values())
+    raw = bytearray(raw_size)
+    raw[:first_column] = payload[:first_column]
+    position = first_column
+    for name, dtype in COLUMNS:
+        size = header.sample_count * dtype.itemsize
+        start = header.offsets[name]
+        raw[start:start + size] = _decode_column(payload[position:position + size], dtype).tobytes()
+        position += size
+    return bytes(raw)
+
+
+def session_file(directory):
+    """Returns the file holding a session's samples: the binary file, else its cold copy, else None."""
+    for name in (SESSION_FILE, COLD_FILE):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def open_session(directory):
+    """
+    Opens a session directory, converting its text log first if the binary file
+    is missing or older than the log. Archived sessions are decompressed into memory.
+
+    Returns:
+        SessionData: Memory-mapped (or in-memory) session.
+    """
+    path = os.path.join(directory, SESSION_FILE)
+    text_path = os.path.join(directory, TEXT_LOG)
+    cold_path = os.path.join(directory, COLD_FILE)
+    if not os.path.exists(text_path) and not os.path.exists(path) and os.path.exists(cold_path):
+        return SessionData(cold_path, buffer=decompress_session(cold_path))
+    if not os.path.exists(path) or (os.path.exists(text_path)
+                                    and os.path.getmtime(text_path) > os.path.getmtime(path)):
+        convert_text_log(directory)
+    return SessionData(path)
+
+
+def main():
+    directories = sys.argv[1:]
+    if not directories:
+        from app_config import DATA_ROOT
+        root = os.path.join(DATA_ROOT, "finished_trainings")
+        directories = [os.path.join(root, name) for name in sorted(os.listdir(root))]
+
+    for directory in directories:
+        if not os.path.exists(os.path.join(directory, TEXT_LOG)):
+            continue
+        try:
+            path = convert_text_log(directory)
+        except (OSError, ValueError) as e:
+            print(f"[Convert Error] {directory}: {e}")
+            continue
+        text_size = os.path.getsize(os.path.join(directory, TEXT_LOG))
+        print(f"{directory}: {len(SessionData(path))} samples, {text_size} -> {os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
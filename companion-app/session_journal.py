@@ -0,0 +1,284 @@
+"""
+Crash-safe journal of the running training session.
+The timing state of the active task and every recorded sample are appended to
+a small JSON-lines file that is synced to the SD card every second and
+compacted into a state snapshot at bounded intervals. After a crash or power
+loss the journal tells the loading screen where the session stopped and
+holds the samples the session log had not stored yet.
+"""
+
+import json
+import os
+import threading
+import time
+
+from session_format import TEXT_LOG, read_text_log
+
+JOURNAL_FILE = "session.journal"
+
+# --- Checkpoint Policy ---
+JOURNAL_SYNC_S = 1.0          # Longest time a sample or state change stays in memory only
+CHECKPOINT_INTERVAL_S = 30.0  # Sync the session log and shrink the journal to a snapshot this often
+
+
+class SessionJournal:
+    """
+    Append-only, periodically checkpointed record of one session.
+
+    update() and record_samples() only append to memory; a daemon thread writes
+    and fsyncs the pending records every sync_interval_s. A checkpoint syncs the
+    session log through the recorder, after which journaled samples are
+    redundant, and atomically rewrites the journal as a single state snapshot,
+    so the file never holds more than checkpoint_interval_s of samples.
+
+    The recorder must queue samples before journaling them (SessionRecorder
+    does), so a sample dropped by a checkpoint is always in the synced log.
+    Records are serialized on the journal thread, where sample indices relative
+    to the reopened log are made session-wide (SessionRecorder.load_index()).
+    """
+    def __init__(self, path, recorder, state, sync_interval_s=JOURNAL_SYNC_S,
+                 checkpoint_interval_s=CHECKPOINT_INTERVAL_S):
+        """
+        Args:
+            path (str): Journal file (replaced if it exists).
+            recorder (SessionRecorder): Recorder of the session log, synced at checkpoints.
+            state (dict): Initial session state (training, directory, session ID, ...).
+            sync_interval_s (float): Time between journal fsyncs.
+            checkpoint_interval_s (float): Time between checkpoints.
+        """
+        self.path = path
+        self.recorder = recorder
+        self.sync_interval_s = sync_interval_s
+        self.checkpoint_interval_s = checkpoint_interval_s
+
+        # --- Shared State (guarded by lock) ---
+        self.lock = threading.Lock()
+        self.state = dict(state)
+        self.pending = []
+        self.closed = False
+
+        self.file = None
+        self.last_checkpoint = time.monotonic()
+        self._write_snapshot(self.state)
+
+        self.wakeup = threading.Event()
+        self.writer = threading.Thread(target=self._sync_loop, daemon=True)
+        self.writer.start()
+
+    def _append(self, record):
+        record["at"] = time.time()
+        with self.lock:
+            self.pending.append(record)
+
+    def update(self, **changes):
+        """Records a state transition (e.g. task_number, start_time, total_paused_time)."""
+        with self.lock:
+            self.state.update(changes)
+        self._append({"state": changes})
+
+    def record_samples(self, rows, first):
+        """
+        Records samples as (timestamp, bpm, spo2, task) tuples.
+
+        Args:
+            rows (list): Samples, in recording order.
+            first (int): SessionRecorder index of the first row, counted from the samples
+                its log held when it was opened.
+        """
+        self._append({"samples": rows, "first": first})
+
+    def _write_snapshot(self, state):
+        """Atomically replaces the journal with a single state record."""
+        if self.file is not None:
+            self.file.close()
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as file:
+            file.write(json.dumps({"state": state, "at": time.time()}, separators=(",", ":")) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+        self.file = open(self.path, "a")
+
+    def sync(self):
+        """Writes and fsyncs the pending records (journal thread)."""
+        with self.lock:
+            records, self.pending = self.pending, []
+        if records:
+            samples_before = self.recorder.load_index()
+            lines = []
+            for record in records:
+                if "first" in record:
+                    # Session-wide index: the sample's place in the session log
+                    record["first"] += samples_before
+                lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+            self.file.writelines(lines)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def checkpoint(self):
+        """Makes the session log durable and compacts the journal (journal thread)."""
+        with self.lock:
+            # The snapshot covers every state change so far, and every sample
+            # journaled so far is already queued in the recorder
+            state = dict(self.state)
+            self.pending = []
+        self.recorder.sync()
+        self._write_snapshot(state)
+        self.last_checkpoint = time.monotonic()
+
+    def _sync_loop(self):
+        while not self.closed:
+            self.wakeup.wait(timeout=self.sync_interval_s)
+            if self.closed:
+                break
+            try:
+                if time.monotonic() - self.last_checkpoint >= self.checkpoint_interval_s:
+                    self.checkpoint()
+                self.sync()
+            except Exception as e:
+                print(f"[Journal Error] {self.path}: {e}")
+
+    def close(self, remove=True):
+        """Stops the journal; a finished session removes its file, an abandoned one keeps it."""
+        if self.closed:
+            return
+        self.closed = True
+        self.wakeup.set()
+        self.writer.join(timeout=5)
+        if remove:
+            self.file.close()
+            os.remove(self.path)
+        else:
+            self.sync()
+            self.file.close()
+
+
+# --- Recovery ---
+def read_journal(path):
+    """
+    Replays a journal file.
+
+    Returns:
+        tuple: (state dict, list of (index, timestamp, bpm, spo2, task) samples, wall time
+        of the last record), or None if there is no readable journal.
+    """
+    state, samples, last_at = {}, [], None
+    try:
+        with open(path, "r") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break # Torn last record from the crash
+                state.update(record.get("state", {}))
+                first = record.get("first", 0)
+                samples.extend((first + i, *row) for i, row in enumerate(record.get("samples", ())))
+                last_at = record["at"]
+    except FileNotFoundError:
+        return None
+    if not state:
+        return None
+    return state, samples, last_at
+
+
+def _drop_torn_line(path):
+    """Cuts off a last line the crash left without its newline, so appended lines start clean."""
+    with open(path, "rb+") as file:
+        size = file.seek(0, os.SEEK_END)
+        start = max(0, size - 4096) # Log lines are far shorter
+        file.seek(start)
+        tail = file.read()
+        if tail and not tail.endswith(b"\n"):
+            end = tail.rfind(b"\n")
+            if end >= 0 or start == 0:
+                file.truncate(start + end + 1)
+                file.flush()
+                os.fsync(file.fileno())
+
+
+def recover_session_log(state, samples):
+    """
+    Appends the journaled samples that never reached the session log.
+
+    Samples are matched by their session-wide index, not by time: the samples
+    past the ones the log holds are written with the task markers it is missing.
+    A torn last line is dropped first; its sample is journaled and recovered too.
+
+    Args:
+        state (dict): Journaled session state.
+        samples (list): (index, timestamp, bpm, spo2, task) samples from read_journal().
+
+    Returns:
+        list: Recovered (timestamp, bpm, spo2, task) rows, e.g. for the repository.
+    """
+    log_path = os.path.join(state["directory"], TEXT_LOG)
+    if os.path.exists(log_path):
+        _drop_torn_line(log_path)
+    log = read_text_log(log_path) if os.path.exists(log_path) else None
+    logged = len(log["bpm"]) if log else 0
+    task = log["tasks"][-1][0] if log and log["tasks"] else 0
+
+    recovered = [row[1:] for row in sorted(samples) if row[0] >= logged]
+    lines = []
+    for timestamp, bpm, spo2, row_task in recovered:
+        if row_task != task:
+            task = row_task
+            lines.append(f"-----TASK{task}-----\n")
+        lines.append(f"{bpm},{spo2},{timestamp:.3f}\n")
+    if lines:
+        os.makedirs(state["directory"], exist_ok=True)
+        with open(log_path, "a") as file:
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+    return recovered
+
+
+_journal = None
+
+def journal_path():
+    from app_config import DATA_ROOT
+    return os.path.join(DATA_ROOT, JOURNAL_FILE)
+
+
+def open_journal(recorder, **state):
+    """Starts journaling the session of `recorder` (GUI thread only)."""
+    global _journal
+    if _journal is not None:
+        _journal.close(remove=False)
+    _journal = SessionJournal(journal_path(), recorder, state)
+    recorder.journal = _journal
+    return _journal
+
+
+def record_state(**changes):
+    """Journals a state transition of the running session, if one is journaled (GUI thread only)."""
+    if _journal is not None:
+        _journal.update(**changes)
+
+
+def close_journal(io_worker=None):
+    """
+    Ends journaling of a finished session and deletes its journal.
+
+    Args:
+        io_worker (IOWorker): If given, the close is queued there, so it runs after
+            the session log close queued before it and the journal outlives unsynced samples.
+    """
+    global _journal
+    journal, _journal = _journal, None
+    if journal is None:
+        return
+    journal.recorder.journal = None
+    if io_worker is None:
+        journal.close()
+    else:
+        io_worker.submit(journal.close)
+
+
+def find_unfinished_session():
+    """Returns read_journal() of an interrupted session, or None (one stat on a clean start)."""
+    path = journal_path()
+    if not os.path.exists(path):
+        return None
+    return read_journal(path)
@@ -0,0 +1,327 @@
+"""
+Buffered session logging.
+Keeps one open handle per training session and moves every disk write off the
+GUI thread: lines are collected in memory and flushed by a background thread
+according to a size, time and fsync policy. With a RAM working root configured
+(see runtime_storage) the log is written to tmpfs and persisted periodically.
+"""
+
+import os
+import threading
+import time
+
+from runtime_storage import PERSIST_INTERVAL_S, SessionMirror, runtime_directory
+from session_format import TEXT_LOG, build_task_index, write_task_index
+
+# --- Default Flush Policy ---
+FLUSH_BYTES = 4096          # Flush as soon as this much text is buffered
+FLUSH_INTERVAL_S = 5.0      # ... or when the oldest buffered line is this old
+FSYNC = False               # Force data onto the SD card after every flush
+
+# --- Plausibility Range of Logged Samples ---
+BPM_RANGE = (30, 220)
+SPO2_RANGE = (50, 100)
+
+
+def is_valid_sample(sample):
+    """Range validation for clinical/athletic plausibility."""
+    return BPM_RANGE[0] <= sample.bpm <= BPM_RANGE[1] and SPO2_RANGE[0] <= sample.spo2 <= SPO2_RANGE[1]
+
+
+class SessionRecorder:
+    """
+    Append-only writer of a session's training_data.txt.
+
+    write_lines() and record_samples() only touch memory and return
+    immediately; a daemon thread opens the file and performs the flushes. Line
+    order is preserved across markers and samples. close() flushes everything,
+    syncs and closes the handle, and must run before the session directory is moved.
+
+    Reopening an existing log continues its task index; the index is rebuilt
+    from the log by load_index() on the flusher thread, before the first flush.
+    Sample indices counted on the GUI thread (samples_recorded) are relative to
+    the samples the log held when it was reopened (samples_before).
+
+    A recorder following a sample stream (see follow()) is the only place
+    samples get logged, however many windows show them.
+
+    With a mirror, the log is a working copy: persist() copies it to persistent
+    storage every persist_interval_s, at each task marker, on sync() and on
+    close(), and only then hands the samples to the sample sink, so the
+    repository never gets ahead of the persistent log.
+    """
+    def __init__(self, path, flush_bytes=FLUSH_BYTES, flush_interval_s=FLUSH_INTERVAL_S, fsync=FSYNC, opener=open,
+                 sample_sink=None, mirror=None, persist_interval_s=PERSIST_INTERVAL_S):
+        """
+        Args:
+            path (str): Log file, opened once in append mode on the first flush
+                (its directory is created if needed).
+            flush_bytes (int): Buffered text size triggering a flush.
+            flush_interval_s (float): Maximum time a line stays in memory.
+            fsync (bool): Call os.fsync() after each flush (durable, slower).
+            opener (callable): Opens the file like the builtin open().
+            sample_sink (callable): Receives each flushed batch of samples as a list of
+                (timestamp, bpm, spo2, task) tuples, e.g. TrainingRepository.add_samples.
+            mirror (SessionMirror): Copies the log directory to persistent storage, if the log is in RAM.
+            persist_interval_s (float): Maximum time flushed data waits for the mirror.
+        """
+        self.path = path
+        self.flush_bytes = flush_bytes
+        self.flush_interval_s = flush_interval_s
+        self.fsync = fsync
+        self.opener = opener
+        self.sample_sink = sample_sink
+        self.journal = None # SessionJournal, set while the session is journaled
+        self.file = None
+
+        # --- Persistence of a RAM Working Copy (flusher thread) ---
+        self.mirror = mirror
+        self.persist_interval_s = persist_interval_s
+        self.persist_due = False
+        self.last_persist = time.monotonic()
+        self.unpersisted_samples = [] # Flushed rows waiting for the sink until persisted
+
+        # --- Shared State (guarded by lock, held only for list operations) ---
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock() # Serializes flushes so chunks land in order
+        self.pending = []
+        self.pending_bytes = 0
+        self.pending_samples = []
+        self.pending_tasks = [] # [task number, first sample, position in the pending text]
+        self.samples_recorded = 0 # Since the log was opened
+        self.closed = False
+
+        # --- Task Index (flusher thread) ---
+        # [task number, first sample index, byte offset of its marker], saved next to the log
+        self.task_index = []
+        self.samples_before = None # Samples in the log when it was opened, known once loaded
+        self.log_bytes = None # Size of the log file, known once it is open
+
+        # --- Telemetry Source (GUI thread) ---
+        self.stream = None
+        self.sample_cursor = 0
+        self.task_number = 0 # Task of the recorded samples, set by begin_task() (or a resumed session)
+
+        # --- Statistics ---
+        self.flushes = 0
+        self.bytes_written = 0
+
+        self.wakeup = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self.flusher.start()
+
+    def write_lines(self, lines, samples=(), task=None):
+        """
+        Queues complete text lines (each ending with a newline) for writing.
+
+        Args:
+            lines (list): Text lines.
+            samples (list): (timestamp, bpm, spo2, task) rows the lines log, for the sample sink.
+            task (int): Task whose marker starts the lines, for the task index.
+
+        Returns:
+            int: Index of the first of `samples`, counted from samples_before.
+        """
+        with self.lock:
+            if self.closed:
+                raise ValueError(f"SessionRecorder for {self.path} is closed")
+            if task is not None:
+                self.pending_tasks.append([task, self.samples_recorded, self.pending_bytes])
+            for line in lines:
+                self.pending.append(line)
+                self.pending_bytes += len(line)
+            first_sample = self.samples_recorded
+            self.samples_recorded += len(samples)
+            if self.sample_sink is not None:
+                self.pending_samples.extend(samples)
+            full = self.pending_bytes >= self.flush_bytes
+        if full:
+            self.wakeup.set()
+        return first_sample
+
+    def record_samples(self, samples):
+        """
+        Queues telemetry Samples as 'bpm,spo2,wall clock time' lines.
+        Sample times are host monotonic, which restarts on every boot, so they are
+        stored as Unix time to stay ordered across a reboot and a resumed session.
+        """
+        to_wall_clock = time.time() - time.monotonic()
+        rows = [(s.timestamp + to_wall_clock, s.bpm, s.spo2, self.task_number) for s in samples]
+        first = self.write_lines([f"{bpm},{spo2},{timestamp:.3f}\n" for timestamp, bpm, spo2, _ in rows], samples=rows)
+        # Journaled only once queued here, so a journal checkpoint never drops an unlogged sample
+        if self.journal is not None:
+            self.journal.record_samples(rows, first)
+
+    def begin_task(self, number):
+        """Writes the separator of task `number` and indexes it; the samples that follow belong to it."""
+        self.task_number = number
+        self.write_lines([f"-----TASK{number}-----\n"], task=number)
+        # Task boundaries are persisted right away
+        self.persist_due = True
+        self.wakeup.set()
+
+    def follow(self, stream):
+        """Starts logging samples published to a SampleRingBuffer from now on."""
+        if self.stream is not stream:
+            self.stream = stream
+            self.sample_cursor = stream.cursor()
+
+    def drain(self):
+        """Queues every valid sample published since the previous call."""
+        if self.stream is None or self.closed:
+            return
+        new_samples, self.sample_cursor = self.stream.read_since(self.sample_cursor)
+        valid = [sample for sample in new_samples if is_valid_sample(sample)]
+        if valid:
+            self.record_samples(valid)
+
+    def load_index(self):
+        """
+        Continues the task index of a reopened log (runs on the calling thread, once).
+        With a mirror, the persistent log is first staged as the working copy.
+
+        Returns:
+            int: Samples the log held when it was opened (samples_before).
+        """
+        with self.io_lock:
+            if self.samples_before is None:
+                if self.mirror is not None:
+                    self.mirror.stage()
+                if os.path.exists(self.path):
+                    # Reopened session (e.g. resumed after a crash, with recovered lines)
+                    self.task_index, self.samples_before = build_task_index(self.path)
+                    write_task_index(os.path.dirname(self.path) or ".", self.task_index)
+                else:
+                    self.samples_before = 0
+            return self.samples_before
+
+    def flush(self):
+        """Writes everything buffered so far (runs on the calling thread)."""
+        self.load_index()
+        with self.io_lock:
+            with self.lock:
+                chunk = "".join(self.pending)
+                self.pending = []
+                self.pending_bytes = 0
+                rows, self.pending_samples = self.pending_samples, []
+                tasks, self.pending_tasks = self.pending_tasks, []
+            if not chunk:
+                return
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self.file = self.opener(self.path, "a")
+                self.log_bytes = self.file.tell()
+            # Writers keep appending to the fresh list while the disk is busy
+            self.file.write(chunk)
+            self.file.flush()
+            if self.fsync:
+                os.fsync(self.file.fileno())
+            self.flushes += 1
+            self.bytes_written += len(chunk)
+
+            if tasks:
+                # Lines are ASCII, so text positions are byte positions
+                self.task_index.extend([number, self.samples_before + first, self.log_bytes + position]
+                                       for number, first, position in tasks)
+                write_task_index(os.path.dirname(self.path) or ".", self.task_index)
+            self.log_bytes += len(chunk)
+            # The text log is written first, so a failing sink cannot cost log lines
+            if rows:
+                if self.mirror is None:
+                    self.sample_sink(rows)
+                else:
+                    self.unpersisted_samples.extend(rows)
+
+    def persist(self):
+        """Copies the flushed log to persistent storage, then stores its samples through the sink."""
+        if self.mirror is None:
+            return
+        with self.io_lock:
+            self.mirror.flush()
+            rows, self.unpersisted_samples = self.unpersisted_samples, []
+            self.persist_due = False
+            self.last_persist = time.monotonic()
+            if rows:
+                self.sample_sink(rows)
+
+    def sync(self):
+        """Flushes, fsyncs and persists the log, so everything queued so far survives a power loss."""
+        self.flush()
+        with self.io_lock:
+            if self.file is not None:
+                os.fsync(self.file.fileno())
+        self.persist()
+
+    def _flush_loop(self):
+        """Flusher thread: loads the task index, then wakes on a full buffer or after flush_interval_s."""
+        try:
+            self.load_index()
+        except Exception as e:
+            print(f"[Recorder Error] {self.path}: {e}")
+        while not self.closed:
+            self.wakeup.wait(timeout=self.flush_interval_s)
+            self.wakeup.clear()
+            try:
+                self.flush()
+                if self.mirror is not None and (self.persist_due or
+                                                time.monotonic() - self.last_persist >= self.persist_interval_s):
+                    self.persist()
+            except Exception as e:
+                print(f"[Recorder Error] {self.path}: {e}")
+
+    def close(self):
+        """Flushes, syncs, persists and closes the log. Safe to call more than once."""
+        if self.closed:
+            return
+        self.closed = True
+        self.wakeup.set()
+        self.flusher.join(timeout=5)
+        self.flush()
+        with self.io_lock:
+            if self.file is not None:
+                os.fsync(self.file.fileno())
+                self.file.close()
+                self.file = None
+        if self.mirror is not None:
+            # A failed persist leaves the working copy for the startup reconciliation
+            self.persist()
+            self.mirror.discard()
+
+
+_recorders = {}
+
+def get_recorder(directory, sample_sink=None):
+    """
+    Returns the recorder of a session directory, opening it on first use (GUI thread only).
+    sample_sink is only used when the recorder is created.
+    """
+    recorder = _recorders.get(directory)
+    if recorder is None or recorder.closed:
+        runtime = runtime_directory(directory)
+        if runtime is None:
+            recorder = SessionRecorder(os.path.join(directory, TEXT_LOG), sample_sink=sample_sink)
+        else:
+            # Log in RAM, persisted to the session directory
+            # Staged by the recorder's flusher thread
+            mirror = SessionMirror(runtime, directory)
+            recorder = SessionRecorder(os.path.join(runtime, TEXT_LOG), sample_sink=sample_sink, mirror=mirror)
+        _recorders[directory] = recorder
+    return recorder
+
+
+def close_recorder(directory, io_worker=None):
+    """
+    Closes and forgets the recorder of a session directory, if one is open.
+
+    Args:
+        directory (str): Session directory.
+        io_worker (IOWorker): If given, the close (final flush and fsync) is queued
+            there instead of blocking the caller; later jobs on it see the closed file.
+    """
+    recorder = _recorders.pop(directory, None)
+    if recorder is None:
+        return
+    if io_worker is None:
+        recorder.close()
+    else:
+        io_worker.submit(recorder.close)
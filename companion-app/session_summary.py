@@ -0,0 +1,164 @@
+"""
+Precomputed statistics of finished training sessions.
+A summary.json sidecar next to the session file holds the per-session and
+per-task heart rate and SpO2 aggregates, the duration, the sample count and
+the time spent in each heart rate zone. It is written when a session is
+archived, so the history screens read a few hundred bytes instead of scanning
+the samples; a missing or stale sidecar is recomputed.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from session_format import TEXT_LOG, open_session, session_file
+
+SUMMARY_FILE = "summary.json"
+SUMMARY_VERSION = 1
+
+# --- Sample Duration Model ---
+LEGACY_SAMPLE_PERIOD_S = 5.0  # Logs without timestamps: 12 samples per minute
+MAX_SAMPLE_GAP_S = 10.0       # Longer gaps (pauses, link losses) are not credited to any zone
+
+
+def load_zones(path=None):
+    """
+    Reads the heart rate zones saved by the HR max calculator.
+
+    Returns:
+        list: [name, low bpm, high bpm] entries, empty if no zones were saved.
+    """
+    if path is None:
+        from app_config import DATA_ROOT
+        path = os.path.join(DATA_ROOT, "hr_zones.json")
+    try:
+        with open(path, "r") as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return []
+    zones = []
+    for name, range_text in data.items():
+        low, high = range_text.replace("bpm", "").split("-")
+        zones.append([name.rstrip(":"), int(low), int(high)])
+    return zones
+
+
+def sample_durations(session):
+    """Seconds credited to each sample: the gap to the next one, capped at MAX_SAMPLE_GAP_S."""
+    count = len(session)
+    if not session.has_timestamps():
+        return np.full(count, LEGACY_SAMPLE_PERIOD_S)
+    gaps = np.diff(session.timestamps)
+    typical = float(np.median(gaps)) if count > 1 else LEGACY_SAMPLE_PERIOD_S
+    durations = np.append(gaps, typical)
+    return np.where((durations >= 0) & (durations <= MAX_SAMPLE_GAP_S), durations, 0.0)
+
+
+def _aggregate(values):
+    if len(values) == 0:
+        return {"avg": None, "min": None, "max": None}
+    return {"avg": float(values.mean()), "min": int(values.min()), "max": int(values.max())}
+
+
+def _time_in_zones(bpm, durations, zones):
+    seconds = {}
+    for index, (name, low, high) in enumerate(zones):
+        # Zones share their bounds; the top zone includes its maximum
+        inside = (bpm >= low) & ((bpm < high) if index < len(zones) - 1 else (bpm <= high))
+        seconds[name] = float(durations[inside].sum())
+    return seconds
+
+
+def compute_summary(session, zones):
+    """
+    Aggregates a SessionData.
+
+    Args:
+        session (SessionData): Memory-mapped session.
+        zones (list): load_zones() entries.
+
+    Returns:
+        dict: JSON-serializable summary.
+    """
+    bpm, spo2 = session.bpm, session.spo2
+    durations = sample_durations(session)
+    stat = os.stat(session.path)
+
+    tasks = []
+    for number, _ in session.tasks:
+        task = session.task(number)
+        task_durations = durations[task.start:task.stop]
+        tasks.append({
+            "number": number,
+            "samples": len(task),
+            "duration_s": float(task_durations.sum()),
+            "hr": _aggregate(task.bpm),
+            "spo2": _aggregate(task.spo2),
+            "zones_s": _time_in_zones(task.bpm, task_durations, zones),
+        })
+
+    return {
+        "version": SUMMARY_VERSION,
+        "source": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns},
+        "zones": zones,
+        "samples": len(session),
+        "duration_s": session.duration_s(),
+        "recorded_s": float(durations.sum()),
+        "hr": _aggregate(bpm),
+        "spo2": _aggregate(spo2),
+        "zones_s": _time_in_zones(bpm, durations, zones),
+        "tasks": tasks,
+    }
+
+
+def write_summary(directory, zones=None):
+    """Computes the summary of a session directory and writes its sidecar atomically."""
+    summary = compute_summary(open_session(directory), load_zones() if zones is None else zones)
+    path = os.path.join(directory, SUMMARY_FILE)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(summary, file)
+    os.replace(temporary, path)
+    return summary
+
+
+def is_stale(summary, directory, zones):
+    """True if the sidecar no longer describes the session file or the current zones."""
+    session_path = session_file(directory) # Binary or cold file
+    text_path = os.path.join(directory, TEXT_LOG)
+    if session_path is None:
+        return True
+    try:
+        stat = os.stat(session_path)
+    except FileNotFoundError:
+        return True
+    if os.path.exists(text_path) and os.path.getmtime(text_path) > stat.st_mtime:
+        return True # The session file is about to be regenerated from a newer log
+    return (summary.get("version") != SUMMARY_VERSION
+            or summary.get("source") != {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            or summary.get("zones") != zones)
+
+
+def load_summary(directory):
+    """
+    Returns the summary of a session directory, recomputing it only when needed.
+
+    Returns:
+        tuple: (summary dict, "sidecar" if it was read as stored or "recomputed").
+    """
+    zones = load_zones()
+    try:
+        with open(os.path.join(directory, SUMMARY_FILE), "r") as file:
+            summary = json.load(file)
+        if not is_stale(summary, directory, zones):
+            return summary, "sidecar"
+    except (FileNotFoundError, ValueError):
+        pass
+
+    try:
+        summary = write_summary(directory, zones)
+    except OSError:
+        # Read-only archive: use the fresh numbers without storing them
+        summary = compute_summary(open_session(directory), zones)
+    return summary, "recomputed"
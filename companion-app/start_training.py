@@ -4,21 +4,22 @@ Implements a scrollable list of planned sessions with dual-action buttons
 (Short press: Start, Long press: Delete).
 """
 
-from app_config import (PROJECT_PATH, BACKGROUND, MAIN_BUTTON_STYLE, RETURN_BUTTON_STYLE, SCROLL_AREA_STYLE)
+from app_config import (PROJECT_PATH, DATA_ROOT, BACKGROUND, MAIN_BUTTON_STYLE, RETURN_BUTTON_STYLE, SCROLL_AREA_STYLE)
 from PyQt5.QtWidgets import QWidget, QApplication, QPushButton, QHBoxLayout, QVBoxLayout, QScrollArea, QSizePolicy, QLabel
 from PyQt5.QtGui import QPainter, QIcon, QPixmap
 from PyQt5.QtCore import Qt, QSize, QElapsedTimer
-import os
 
 # Internal dialog and state management modules
 import base_training_window, delete_window
 import next_task
+from training_repository import get_repository
+from training_plan import TrainingPlan
 
 class ChooseTraining(QWidget):
     """
     Interface for browsing and managing planned swimming sessions.
     
-    Dynamically generates buttons based on the file system structure and 
+    Dynamically generates buttons based on the training repository and 
     handles workout lifecycle transitions.
     """
     def __init__(self):
@@ -36,8 +37,8 @@ class ChooseTraining(QWidget):
         self.return_button.clicked.connect(self.close)
 
         # --- Dynamic Training Repository Scan ---
-        # Fetch directories representing individual training plans
-        self.planned_trainings = os.listdir(f"{PROJECT_PATH}/planned_trainings")
+        # Fetch the names of the training plans not done yet
+        self.planned_trainings = get_repository().list_plans()
         self.buttons = []
         self.timer_pressed_time = 0
 
@@ -126,11 +127,12 @@ class ChooseTraining(QWidget):
             self.timer_pressed_time = 0
         else:
             # --- Activation Workflow ---
-            self.training_window = next_task.NextTask(directory)
+            # The plan is parsed once here and shared by the windows of the session
+            self.training_window = next_task.NextTask(directory, plan=TrainingPlan.load(directory))
             self.training_window.showFullScreen()
 
     def connect_buttons(self):
         """Maps directory paths to button click events using lambda closures."""
         for button in self.buttons:
-            training_path = f"{PROJECT_PATH}/planned_trainings/{button.text()}" 
+            training_path = f"{DATA_ROOT}/planned_trainings/{button.text()}" 
             button.clicked.connect(lambda checked=False, d=training_path, b=button: self.button_clicked(d, b))
\ No newline at end of file
@@ -4,6 +4,7 @@ Inherits from GeneralTaskWindow to display parameters before workout activation
 and handles the initial session logging.
 """
 
+import functools
 import json
 import sys
 from app_config import PROJECT_PATH, RETURN_BUTTON_STYLE, PARAMETERS_STYLE, LABELS_STYLE, TEXT_EDIT_STYLE, START_BUTTON_STYLE, END_BUTTON_STYLE
@@ -13,6 +14,10 @@ from PyQt5.QtGui import QPainter, QLinearGradient, QColor, QIcon, QPixmap, QPen,
 from PyQt5.QtCore import Qt, QSize, QTimer, QRect
 import current_active_task
 from base_training_window import GeneralTaskWindow
+from session_recorder import get_recorder
+from telemetry_hub import get_hub
+from training_repository import get_repository
+from session_journal import open_journal, recover_session_log
 import bluetooth_connection
 import os
 from datetime import datetime
@@ -23,10 +28,10 @@ class NextTask(GeneralTaskWindow):
     UI controller for the 'Pre-task' state. 
 
     """
-    def __init__(self, training_directory):
+    def __init__(self, training_directory, plan=None):
         """Initializes the window with workout context and navigation controls."""
-        # Initialize base class (GeneralTaskWindow) with current workout path
-        super().__init__(training_directory=training_directory)
+        # Initialize base class (GeneralTaskWindow) with current workout path and its plan
+        super().__init__(training_directory=training_directory, plan=plan)
 
         # --- Button and Label Declarations ---
         self.start_button = QPushButton(self, text="START")
@@ -75,23 +80,36 @@ class NextTask(GeneralTaskWindow):
         Handles the critical 'First Task' logic: logs the session start time 
         before starting telemetry acquisition.
         """
-        log_path = f"{self.current_training_directory}/training_data.txt"
-        
-        with open(log_path, "a") as file:
-            # Session Initialization: Capture timestamp only on Task 1
-            if self.task_number == 1:
-                # Capture current system time (Raspberry Pi local clock)
-                start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                file.write(f"SESSION START: {start_time}\n")
-                file.write("------------------------------\n")
-            
-            # Record task-specific separator in the telemetry file
-            file.write(f"-----TASK{self.task_number}-----\n")
+        # Markers go through the session recorder so they stay in order with the samples
+        markers = []
+        sample_sink = None
+        # Session Initialization: Capture timestamp only on Task 1
+        if self.task_number == 1:
+            # Capture current system time (Raspberry Pi local clock)
+            start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            markers.append(f"SESSION START: {start_time}\n")
+            markers.append("------------------------------\n")
+            # The recorder also bulk-inserts every flushed batch of samples into the repository
+            repository = get_repository()
+            session_id = repository.start_session(self.training_name, self.current_training_directory)
+            sample_sink = functools.partial(repository.add_samples, session_id)
+
+        recorder = get_recorder(self.current_training_directory, sample_sink=sample_sink)
+        recorder.write_lines(markers)
+        # Record task-specific separator in the telemetry file
+        recorder.begin_task(self.task_number)
+        # Session-scoped sample logging, independent of which windows are open
+        get_hub().attach_recorder(recorder)
+        if self.task_number == 1:
+            # Crash-safe record of the session state (updated by CurrentTask)
+            open_journal(recorder, training=self.training_name, directory=self.current_training_directory,
+                         session_id=session_id, phase="preview", task_number=1)
 
         # Instantiate the active task execution window (CurrentTask)
         self.training_window = current_active_task.CurrentTask(
             current_directory=self.current_training_directory, 
-            task_number=self.task_number
+            task_number=self.task_number,
+            plan=self.plan
         )
         self.training_window.showFullScreen()
 
@@ -100,11 +118,11 @@ class NextTask(GeneralTaskWindow):
 
     def load_next_task(self):
         """
-        Increments task index and pre-loads next task metadata from JSON.
+        Increments task index and shows the next task of the preloaded plan.
         Ensures continuous workout flow without UI interruption.
         """
-        # Directory check logic to confirm more tasks are available
-        if (len(os.listdir(self.current_training_directory)) - 1 > self.task_number):
+        # Plan check to confirm more tasks are available
+        if self.plan.task_count > self.task_number:
             self.task_number += 1
             
             # Inherited methods from base class to refresh UI content
@@ -116,5 +134,49 @@ class NextTask(GeneralTaskWindow):
         self.start_button.clicked.connect(self.start_button_clicked)
 
     def closeEvent(self, event):
-        """Stops the telemetry polling timer to prevent background resource leaks."""
-        self.parameters_timer.stop()
\ No newline at end of file
+        """Unsubscribes from telemetry to prevent background resource leaks."""
+        self.stop_telemetry()
+
+
+def resume_session(journal):
+    """
+    Reopens a session interrupted by a crash, at the journaled task and elapsed time.
+
+    Args:
+        journal (tuple): session_journal.find_unfinished_session() result.
+
+    Returns:
+        NextTask: Preview window of the session (with the running task on top, if any).
+    """
+    state, samples, last_record_at = journal
+    directory = state["directory"]
+    task_number = state["task_number"]
+    running = state.get("phase") == "task"
+
+    # Samples the log had not stored before the crash
+    repository = get_repository()
+    recover_session_log(state, samples)
+    # ... and those the repository is missing, also the ones reconciled from RAM into the log
+    stored = repository.sample_count(state["session_id"])
+    missing = [row[1:] for row in sorted(samples) if row[0] >= stored]
+    if missing:
+        repository.add_samples(state["session_id"], missing)
+
+    recorder = get_recorder(directory, sample_sink=functools.partial(repository.add_samples, state["session_id"]))
+    recorder.task_number = task_number if running else task_number - 1
+    get_hub().attach_recorder(recorder)
+    open_journal(recorder, **state)
+
+    preview = NextTask(directory)
+    preview.task_number = task_number
+    preview.get_task_info()
+    preview.set_task_info()
+    preview.showFullScreen()
+
+    if running:
+        preview.training_window = current_active_task.CurrentTask(
+            current_directory=directory, task_number=task_number, resume_from=(state, last_record_at),
+            plan=preview.plan)
+        preview.training_window.showFullScreen()
+        preview.load_next_task()
+    return preview
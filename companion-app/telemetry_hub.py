@@ -0,0 +1,107 @@
+"""
+GUI-side telemetry dispatcher.
+Turns BLE thread events into Qt signals so windows subscribe to fresh data
+instead of polling the BLE manager on their own timers.
+"""
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+import bluetooth_connection
+
+# Minimum spacing between two UI updates (one display frame at 60 Hz)
+FRAME_INTERVAL_MS = 16
+
+
+class TelemetryHub(QObject):
+    """
+    GUI-thread fan-out point for the BLE telemetry of one wearable.
+
+    The BLE thread only emits a private signal; the queued connection moves it
+    onto the GUI thread, where bursts are coalesced into at most one update per
+    frame. Each update drains the sample buffer for the attached session
+    recorders and emits:
+    - sample_received(Sample): newest sample of the frame,
+    - connection_changed(bool): when the link state flips,
+    - battery_changed(int, float): when battery percentage or voltage differ.
+    """
+    sample_received = pyqtSignal(object)
+    connection_changed = pyqtSignal(bool)
+    battery_changed = pyqtSignal(int, float)
+
+    # Emitted from the BLE thread, delivered through a queued connection
+    _ble_event = pyqtSignal(str, str)
+
+    def __init__(self, device_id=bluetooth_connection.DEFAULT_DEVICE_ID):
+        super().__init__()
+        self.device_id = device_id
+        self.samples = bluetooth_connection.sample_stream(device_id)
+        self.sample_cursor = self.samples.cursor()
+        self.connected = bluetooth_connection.is_connected(device_id)
+        self.battery = None
+        self.recorders = []
+
+        # Coalescing timer: the first event of a burst arms it, the rest ride along
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.setInterval(FRAME_INTERVAL_MS)
+        self.frame_timer.timeout.connect(self.dispatch)
+
+        # Fires only if telemetry goes silent, so a stalled link is still reported
+        # (re-armed with the device's timeout, which follows its batch window)
+        self.link_watchdog = QTimer(self)
+        self.link_watchdog.setSingleShot(True)
+        self.link_watchdog.timeout.connect(self.dispatch)
+
+        self._ble_event.connect(self.schedule_dispatch, Qt.QueuedConnection)
+        bluetooth_connection.add_listener(self._ble_event.emit)
+
+    def attach_recorder(self, recorder):
+        """Makes a SessionRecorder log this wearable's samples until detached (idempotent)."""
+        if recorder not in self.recorders:
+            recorder.follow(self.samples)
+            self.recorders.append(recorder)
+
+    def detach_recorder(self, recorder):
+        """Logs the samples still pending and stops feeding the recorder."""
+        if recorder in self.recorders:
+            recorder.drain()
+            self.recorders.remove(recorder)
+
+    def schedule_dispatch(self, device_id, event):
+        """Arms the frame timer unless an update is already pending."""
+        if device_id == self.device_id and not self.frame_timer.isActive():
+            self.frame_timer.start()
+
+    def dispatch(self):
+        """Publishes everything that changed since the previous frame."""
+        connected = bluetooth_connection.is_connected(self.device_id)
+        if connected != self.connected:
+            self.connected = connected
+            self.connection_changed.emit(connected)
+
+        for recorder in self.recorders:
+            recorder.drain()
+
+        new_samples, self.sample_cursor = self.samples.read_since(self.sample_cursor)
+        if new_samples:
+            latest = new_samples[-1]
+            self.sample_received.emit(latest)
+
+            battery = (latest.battery, round(latest.voltage, 2))
+            if battery != self.battery:
+                self.battery = battery
+                self.battery_changed.emit(*battery)
+
+        if self.connected:
+            self.link_watchdog.start(int(bluetooth_connection.link_timeout_s(self.device_id) * 1000))
+        else:
+            self.link_watchdog.stop()
+
+
+_hubs = {}
+
+def get_hub(device_id=bluetooth_connection.DEFAULT_DEVICE_ID):
+    """Returns the TelemetryHub of a wearable, creating it on first use (GUI thread only)."""
+    if device_id not in _hubs:
+        _hubs[device_id] = TelemetryHub(device_id)
+    return _hubs[device_id]
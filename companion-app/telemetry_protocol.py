@@ -0,0 +1,288 @@
+"""
+Wire format shared with the ESP32 wearable firmware.
+Defines the versioned binary telemetry frames, the legacy CSV fallback
+and the control commands written to the GATT characteristic, including the
+interval programs the wearable executes on its own clock.
+"""
+
+import struct
+
+# --- GATT Layout ---
+CHAR_UUID = "0000ff01-0000-1000-8000-00805f9b34fb"
+BACKFILL_CHAR_UUID = "0000ff02-0000-1000-8000-00805f9b34fb"
+
+# Samples the firmware keeps in RAM for backfill (SAMPLE_RING_CAPACITY in ble_app.h)
+DEVICE_RING_CAPACITY = 256
+
+# --- Frame Header Layout ---
+# Bit 7 marks a binary frame (never set in ASCII, so CSV can't be mistaken for it),
+# bits 4-6 carry the frame type and bits 0-3 the layout version.
+FRAME_BINARY_FLAG = 0x80
+FRAME_TYPE_SAMPLE = 0x0
+FRAME_TYPE_BACKFILL_END = 0x1
+FRAME_TYPE_BATCH = 0x2
+FRAME_TYPE_TIME_SYNC = 0x3
+FRAME_TYPE_PROGRAM = 0x4
+FRAME_TYPE_INFO = 0x7
+
+PROTOCOL_VERSION = 1
+
+def frame_header(frame_type: int, version: int = PROTOCOL_VERSION) -> int:
+    """Builds the header byte for a given frame type and layout version."""
+    return FRAME_BINARY_FLAG | (frame_type << 4) | version
+
+HEADER_SAMPLE_V1 = frame_header(FRAME_TYPE_SAMPLE)
+HEADER_INFO_V1 = frame_header(FRAME_TYPE_INFO)
+HEADER_SAMPLE_V2 = frame_header(FRAME_TYPE_SAMPLE, 2)
+HEADER_BACKFILL_END_V2 = frame_header(FRAME_TYPE_BACKFILL_END, 2)
+HEADER_BATCH_V2 = frame_header(FRAME_TYPE_BATCH, 2)
+HEADER_TIME_SYNC_V2 = frame_header(FRAME_TYPE_TIME_SYNC, 2)
+HEADER_PROGRAM_V2 = frame_header(FRAME_TYPE_PROGRAM, 2)
+
+# Sample frame v1: header, BPM, SpO2, battery %, battery voltage in mV (7 bytes)
+SAMPLE_FRAME_V1 = struct.Struct("<BHBBH")
+
+# Sample frame v2: header, sequence number, device time in ms, then the v1 fields (15 bytes)
+SAMPLE_FRAME_V2 = struct.Struct("<BIIHBBH")
+
+# End of a backfill response: header, first sequence number sent, samples sent (7 bytes)
+BACKFILL_END_FRAME = struct.Struct("<BIH")
+
+# Batch frame: header, first sequence number, first device time in ms, entry count (10 bytes),
+# followed by entries of: offset from first device time in ms, BPM, SpO2, battery %, mV (8 bytes)
+BATCH_HEADER = struct.Struct("<BIIB")
+BATCH_ENTRY = struct.Struct("<HHBBH")
+
+# Clock sync reply: header, echoed token, device esp_timer time in microseconds (13 bytes)
+TIME_SYNC_FRAME = struct.Struct("<BIQ")
+
+# Program progress: header, program id, state, event kind (PROGRAM_NO_EVENT for a state change),
+# rep, program time of the event in ms, device time in ms (14 bytes)
+PROGRAM_PROGRESS_FRAME = struct.Struct("<BBBBHII")
+
+# --- Frame Formats ---
+FORMAT_CSV = 0
+FORMAT_BINARY = 1
+FORMAT_SEQUENCED = 2
+FORMAT_BATCHED = 3
+
+# --- Capability Feature Flags (third byte of the capability record) ---
+FEATURE_TIME_SYNC = 0x01
+FEATURE_PROGRAM = 0x02
+
+# --- Control Commands (Pi -> ESP32) ---
+# Legacy firmware parses writes with atoi(), so binary commands start with a byte >= 0x80.
+CMD_SET_FORMAT = 0xC1
+SET_FORMAT_COMMAND = struct.Struct("<BB")
+CMD_BACKFILL = 0xC2
+BACKFILL_COMMAND = struct.Struct("<BIH")
+CMD_SET_RATE = 0xC3
+SET_RATE_COMMAND = struct.Struct("<BHH")
+CMD_TIME_SYNC = 0xC4
+TIME_SYNC_COMMAND = struct.Struct("<BI")
+# Program: id, prestart, send-off interval (0: no time limit), pacer period (0: none),
+# total duration (0: open-ended), all in ms, and countdown cues (19 bytes, fits a default MTU write)
+CMD_PROGRAM_LOAD = 0xC5
+PROGRAM_LOAD_COMMAND = struct.Struct("<BBIIIIB")
+# Program id, action, program time in ms and the device time in ms it applies at (0: on receipt)
+CMD_PROGRAM_CONTROL = 0xC6
+PROGRAM_CONTROL_COMMAND = struct.Struct("<BBBII")
+
+# --- Program Actions and States (mirrors interval_program.h) ---
+PROGRAM_STOP = 0
+PROGRAM_START = 1
+PROGRAM_PAUSE = 2
+PROGRAM_RESUME = 3
+
+PROGRAM_IDLE = 0
+PROGRAM_LOADED = 1
+PROGRAM_RUNNING = 2
+PROGRAM_PAUSED = 3
+PROGRAM_FINISHED = 4
+
+PROGRAM_NO_EVENT = 0xFF
+
+# --- Acquisition Rate Limits (mirrors ble_app.h) ---
+MIN_SAMPLE_PERIOD_MS = 100
+MAX_SAMPLE_PERIOD_MS = 5000
+MAX_BATCH_WINDOW_MS = 10000
+
+
+def decode_sample_frame(data):
+    """
+    Decodes a fixed-layout binary sample frame.
+
+    Args:
+        data (bytes): Raw notification payload.
+
+    Returns:
+        tuple: (bpm, spo2, battery, voltage) or None if the frame is not a v1 sample.
+    """
+    if len(data) != SAMPLE_FRAME_V1.size or data[0] != HEADER_SAMPLE_V1:
+        return None
+    _, bpm, spo2, battery, millivolts = SAMPLE_FRAME_V1.unpack(data)
+    return bpm, spo2, battery, millivolts / 1000.0
+
+
+def decode_sequenced_frame(data):
+    """
+    Decodes a v2 sample frame carrying a sequence number and device timestamp.
+
+    Returns:
+        tuple: (seq, device_ms, bpm, spo2, battery, voltage) or None if the frame is not a v2 sample.
+    """
+    if len(data) != SAMPLE_FRAME_V2.size or data[0] != HEADER_SAMPLE_V2:
+        return None
+    _, seq, device_ms, bpm, spo2, battery, millivolts = SAMPLE_FRAME_V2.unpack(data)
+    return seq, device_ms, bpm, spo2, battery, millivolts / 1000.0
+
+
+def decode_batch_frame(data):
+    """
+    Decodes a batched notification into its samples.
+
+    Returns:
+        list: (seq, device_ms, bpm, spo2, battery, voltage) tuples in sequence order,
+        or None if the frame is not a well-formed batch.
+    """
+    if len(data) < BATCH_HEADER.size or data[0] != HEADER_BATCH_V2:
+        return None
+    _, first_seq, first_ms, count = BATCH_HEADER.unpack_from(data)
+    if len(data) != BATCH_HEADER.size + count * BATCH_ENTRY.size:
+        return None
+    entries = BATCH_ENTRY.iter_unpack(memoryview(data)[BATCH_HEADER.size:])
+    return [(first_seq + index, first_ms + offset_ms, bpm, spo2, battery, millivolts / 1000.0)
+            for index, (offset_ms, bpm, spo2, battery, millivolts) in enumerate(entries)]
+
+
+def decode_time_sync(data):
+    """
+    Decodes a clock sync reply.
+
+    Returns:
+        tuple: (token, device time in seconds) or None if the frame is not a sync reply.
+    """
+    if len(data) != TIME_SYNC_FRAME.size or data[0] != HEADER_TIME_SYNC_V2:
+        return None
+    _, token, device_us = TIME_SYNC_FRAME.unpack(data)
+    return token, device_us / 1e6
+
+
+def decode_program_progress(data):
+    """
+    Decodes a program progress report.
+
+    Returns:
+        tuple: (program_id, state, event kind code or None, rep, program time in seconds,
+        device time in ms) or None if the frame is not a progress report.
+    """
+    if len(data) != PROGRAM_PROGRESS_FRAME.size or data[0] != HEADER_PROGRAM_V2:
+        return None
+    _, program_id, state, kind, rep, program_ms, device_ms = PROGRAM_PROGRESS_FRAME.unpack(data)
+    return program_id, state, None if kind == PROGRAM_NO_EVENT else kind, rep, program_ms / 1000.0, device_ms
+
+
+def decode_backfill_end(data):
+    """
+    Decodes the frame closing a backfill response.
+
+    Returns:
+        tuple: (first_seq, count) or None if the frame is not a backfill end marker.
+    """
+    if len(data) != BACKFILL_END_FRAME.size or data[0] != HEADER_BACKFILL_END_V2:
+        return None
+    _, first_seq, count = BACKFILL_END_FRAME.unpack(data)
+    return first_seq, count
+
+
+def decode_csv_frame(data):
+    """
+    Decodes the legacy text frame: 'BPM,SpO2,Battery,Voltage'.
+
+    Returns:
+        tuple: (bpm, spo2, battery, voltage) or None if the frame is incomplete.
+    """
+    parts = data.decode("utf-8").strip().split(",")
+    if len(parts) < 4:
+        return None
+    return int(parts[0]), int(parts[1]), int(parts[2]), float(parts[3])
+
+
+def decode_frame(data):
+    """
+    Decodes a telemetry notification in either format.
+    Dispatches on the header bit, so a CSV frame sent just before the format switch still parses.
+    """
+    if data and data[0] & FRAME_BINARY_FLAG:
+        return decode_sample_frame(data)
+    return decode_csv_frame(data)
+
+
+def supports_binary(info):
+    """
+    Checks the capability record read from the characteristic at connect time.
+    Legacy firmware answers the read with an empty value.
+    """
+    return len(info) >= 2 and info[0] == HEADER_INFO_V1 and info[1] >= FORMAT_BINARY
+
+
+def best_format(info):
+    """Returns the richest frame format both sides support, given the capability record."""
+    if not supports_binary(info):
+        return FORMAT_CSV
+    return min(info[1], FORMAT_BATCHED)
+
+
+def encode_set_format(frame_format: int) -> bytes:
+    """Builds the command switching the device to the given telemetry format."""
+    return SET_FORMAT_COMMAND.pack(CMD_SET_FORMAT, frame_format)
+
+
+def supports_time_sync(info):
+    """Checks the capability record for the clock sync command."""
+    return supports_binary(info) and len(info) >= 3 and bool(info[2] & FEATURE_TIME_SYNC)
+
+
+def encode_time_sync(token: int) -> bytes:
+    """Builds a clock sync request; the device echoes the token with its current time."""
+    return TIME_SYNC_COMMAND.pack(CMD_TIME_SYNC, token & 0xFFFFFFFF)
+
+
+def encode_set_rate(period_ms: int, batch_window_ms: int) -> bytes:
+    """
+    Builds the command setting the acquisition period and how long samples may
+    wait to be sent together in one batched notification (0 sends each at once).
+    """
+    period_ms = max(MIN_SAMPLE_PERIOD_MS, min(MAX_SAMPLE_PERIOD_MS, int(period_ms)))
+    batch_window_ms = max(0, min(MAX_BATCH_WINDOW_MS, int(batch_window_ms)))
+    return SET_RATE_COMMAND.pack(CMD_SET_RATE, period_ms, batch_window_ms)
+
+
+def encode_backfill(from_seq: int, count: int) -> bytes:
+    """Builds the command asking the device to replay `count` stored samples starting at `from_seq`."""
+    return BACKFILL_COMMAND.pack(CMD_BACKFILL, from_seq, count)
+
+
+def supports_program(info):
+    """Checks the capability record for interval program execution."""
+    return supports_binary(info) and len(info) >= 3 and bool(info[2] & FEATURE_PROGRAM)
+
+
+def encode_program_load(program_id: int, prestart_s: float, interval_s: float, pacer_s: float,
+                        total_s: float, countdown_s: int) -> bytes:
+    """
+    Builds the command uploading an interval program; it replaces any program
+    the device holds and waits for a start command.
+    """
+    durations_ms = [int(round((seconds or 0) * 1000)) for seconds in (prestart_s, interval_s, pacer_s, total_s)]
+    return PROGRAM_LOAD_COMMAND.pack(CMD_PROGRAM_LOAD, program_id & 0xFF, *durations_ms, countdown_s)
+
+
+def encode_program_control(program_id: int, action: int, program_s: float = 0.0, at_device_ms: int = 0) -> bytes:
+    """
+    Builds a start, pause, resume or stop command for the loaded program.
+    The program clock reads program_s at device time at_device_ms, so the radio
+    delay of the command does not shift the program (0 applies it on receipt).
+    """
+    return PROGRAM_CONTROL_COMMAND.pack(CMD_PROGRAM_CONTROL, program_id & 0xFF, action,
+                                        max(0, int(round(program_s * 1000))), at_device_ms & 0xFFFFFFFF)
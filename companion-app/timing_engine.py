@@ -0,0 +1,123 @@
+"""
+Deadline-driven execution of a task timeline.
+Instead of polling the clock every display frame, the engine arms one
+precise single-shot Qt timer for the next timeline event (beep, send-off,
+pacer sync) on the monotonic task clock, fires it, and arms the next one.
+Pausing cancels the pending deadline and resuming re-arms it, so pauses are
+exact. With SWIM_TIMING_TRACE set to a file path every firing is recorded
+with its error against the schedule and appended there as CSV when the task ends.
+"""
+
+import math
+import os
+
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+from interval_timeline import TaskClock, TimelineCursor
+
+# Instrumentation output (CSV), off unless the environment names a file
+TIMING_TRACE = os.environ.get("SWIM_TIMING_TRACE")
+
+
+class TimingEngine(QObject):
+    """
+    Runs a TaskTimeline on the GUI thread.
+
+    Emits event_fired(TimelineEvent, lateness_s) for every event, in order.
+    A timer that fires early re-arms for the remainder, and a late one fires
+    every event that became due, so no event is ever skipped.
+    """
+    event_fired = pyqtSignal(object, float)
+
+    def __init__(self, timeline, trace_path=TIMING_TRACE, parent=None):
+        """
+        Args:
+            timeline (TaskTimeline): Compiled timeline of the task.
+            trace_path (str): CSV file for the firing errors, None to disable the trace.
+            parent (QObject): Qt owner of the engine.
+        """
+        super().__init__(parent)
+        self.timeline = timeline
+        self.clock = None
+        self.cursor = None
+        self.trace_path = trace_path
+        self.trace = [] # (kind, rep, scheduled task time, actual task time)
+
+        self.deadline_timer = QTimer(self)
+        self.deadline_timer.setSingleShot(True)
+        self.deadline_timer.setTimerType(Qt.PreciseTimer)
+        self.deadline_timer.timeout.connect(self._fire_due)
+
+    def start(self, time_s=0.0):
+        """
+        Starts the task clock at task time time_s; events before it are not fired
+        (a resumed task), events at or after it are.
+        """
+        self.clock = TaskClock(time_s)
+        # A resumed task went through its earlier events before the crash
+        self.cursor = TimelineCursor(self.timeline, time_s if time_s > 0 else None)
+        self._fire_due()
+
+    def now(self):
+        """Current task time in seconds (0 before start())."""
+        return self.clock.now() if self.clock is not None else 0.0
+
+    @property
+    def paused(self):
+        return self.clock is not None and self.clock.paused
+
+    def pause(self):
+        self.deadline_timer.stop()
+        self.clock.pause()
+
+    def resume(self):
+        self.clock.resume()
+        self._fire_due()
+
+    def stop(self):
+        """Stops firing and writes the trace, if enabled."""
+        self.deadline_timer.stop()
+        self.cursor = None
+        if self.trace_path and self.trace:
+            print(f"[Timing] {self.error_stats()}")
+            write_trace(self.trace_path, self.trace)
+            self.trace = []
+
+    def _fire_due(self):
+        if self.cursor is None or self.clock.paused:
+            return
+        now = self.clock.now()
+        for event in self.cursor.advance(now):
+            if self.trace_path:
+                self.trace.append((event.kind, event.rep, event.time_s, now))
+            self.event_fired.emit(event, now - event.time_s)
+        self._arm()
+
+    def _arm(self):
+        upcoming = self.cursor.next_event if self.cursor is not None else None
+        if upcoming is None:
+            return
+        # Qt timers have millisecond resolution; rounding up never fires early by a whole ms
+        self.deadline_timer.start(max(0, math.ceil(self.clock.until(upcoming.time_s) * 1000)))
+
+    def error_stats(self):
+        """Firing error of the traced events so far: count, mean, p95 and max in milliseconds."""
+        return timing_error_stats(self.trace)
+
+
+def timing_error_stats(trace):
+    errors = sorted((actual - scheduled) * 1000 for _, _, scheduled, actual in trace)
+    if not errors:
+        return {"count": 0, "mean_ms": None, "p95_ms": None, "max_ms": None}
+    return {"count": len(errors), "mean_ms": sum(errors) / len(errors),
+            "p95_ms": errors[min(len(errors) - 1, int(0.95 * len(errors)))], "max_ms": errors[-1]}
+
+
+def write_trace(path, trace):
+    """Appends (kind, rep, scheduled_s, actual_s, error_ms) rows to a CSV file."""
+    new_file = not os.path.exists(path)
+    with open(path, "a") as file:
+        if new_file:
+            file.write("kind,rep,scheduled_s,actual_s,error_ms\n")
+        file.writelines(f"{kind},{rep},{scheduled:.6f},{actual:.6f},{(actual - scheduled) * 1000:.3f}\n"
+                        for kind, rep, scheduled, actual in trace)
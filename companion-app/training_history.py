@@ -4,15 +4,15 @@ Displays a dynamic list of completed training sessions and provides access
 to detailed performance analytics and data overview.
 """
 
-from app_config import (PROJECT_PATH, BACKGROUND, MAIN_BUTTON_STYLE, RETURN_BUTTON_STYLE, SCROLL_AREA_STYLE)
+from app_config import (PROJECT_PATH, DATA_ROOT, BACKGROUND, MAIN_BUTTON_STYLE, RETURN_BUTTON_STYLE, SCROLL_AREA_STYLE)
 from PyQt5.QtWidgets import (QWidget, QApplication, QPushButton, QHBoxLayout, QVBoxLayout,
                              QScrollArea, QSizePolicy)
 from PyQt5.QtGui import QPainter, QIcon, QPixmap
 from PyQt5.QtCore import Qt, QSize, QElapsedTimer
-import os
 
 # Sub-modules for historical data visualization and management
 import training_overwiev, delete_window
+from training_repository import get_repository
 
 
 class TrainingHistory(QWidget):
@@ -43,8 +43,8 @@ class TrainingHistory(QWidget):
         self.return_button.clicked.connect(self.close)
 
         # --- Dynamic History Population ---
-        # Fetch completed workout sessions from persistent storage
-        self.finished_trainings = os.listdir(f"{PROJECT_PATH}/finished_trainings")
+        # Fetch completed workout sessions from the repository, most recent first
+        self.finished_trainings = get_repository().list_sessions()
         self.timer_pressed_time = 0
         self.buttons = []
         
@@ -140,6 +140,6 @@ class TrainingHistory(QWidget):
     def connect_buttons(self):
         """Maps dynamic record buttons to their respective file system paths."""
         for button in self.buttons:
-            directory = f"{PROJECT_PATH}/finished_trainings/{button.text()}"
+            directory = f"{DATA_ROOT}/finished_trainings/{button.text()}"
             # Use default arguments in lambda to capture the current loop state
             button.clicked.connect(lambda checked=False, d=directory, b=button: self.button_clicked(d, b))
\ No newline at end of file
@@ -7,13 +7,15 @@ from datetime import datetime
 from app_config import RETURN_BUTTON_STYLE, PROJECT_PATH
 from heart_rate_chart import HearRateChart
 from saturation_chart import SPO2Chart
+from session_format import open_session
+from session_summary import load_summary
 
 class TrainingOverwiev(QWidget):
     def __init__(self, directory):
         super().__init__()
 
         self.background = QPixmap(f"{PROJECT_PATH}/icons/basen3.jpg")
-        self.trainig_name = directory.split("/")[6]
+        self.trainig_name = os.path.basename(os.path.normpath(directory))
 
         self.current_training_directory = directory
 
@@ -70,8 +72,8 @@ class TrainingOverwiev(QWidget):
         self.spo2_layout.setSpacing(10)
 
         
-        self.HR_list = []
-        self.Spo2_list = []
+        # Memory-mapped session columns (numpy arrays), opened for the first chart only
+        self.session = None
 
         # Calling necessary functions
 
@@ -93,73 +95,36 @@ class TrainingOverwiev(QWidget):
 
 
     def get_parametrs_values(self):
-
-        with open(f"{self.current_training_directory}/training_data.txt", "r") as file:
-            for line in file:
-                if "," not in line:
-                    continue
-
-                splitted = line.split(',')
-                hr = int(splitted[0])
-                spo2 = int(splitted[1])
-                self.HR_list.append(hr)
-                self.Spo2_list.append(spo2)
-
-        avg_hr = int(sum(self.HR_list)/len(self.HR_list))
-        min_hr = min(self.HR_list)
-        max_hr = max(self.HR_list)
-
-        avg_spo2 = int(sum(self.Spo2_list)/len(self.Spo2_list))
-        min_spo2 = min(self.Spo2_list)
-        max_spo2 = max(self.Spo2_list)
-
-
-        self.average_heart_rate = f"{str(avg_hr)} bpm"
-        self.max_heart_rate = f"{str(max_hr)} bpm"
-        self.min_heart_rate = f"{str(min_hr)} bpm"
-        self.average_spo2 = f"{str(avg_spo2)}%"
-        self.max_spo2 = f"{str(max_spo2)}%"
-        self.min_spo2 = f"{str(min_spo2)}%"
+        """Reads the session aggregates from the summary sidecar (recomputed only if missing or stale)."""
+        self.summary, self.summary_source = load_summary(self.current_training_directory)
+        print(f"[Overview] {self.trainig_name}: summary {self.summary_source}")
+
+        hr, spo2 = self.summary["hr"], self.summary["spo2"]
+        if hr["avg"] is None:
+            # No valid samples were recorded
+            return
+
+        self.average_heart_rate = f"{int(hr['avg'])} bpm"
+        self.max_heart_rate = f"{hr['max']} bpm"
+        self.min_heart_rate = f"{hr['min']} bpm"
+        self.average_spo2 = f"{int(spo2['avg'])}%"
+        self.max_spo2 = f"{spo2['max']}%"
+        self.min_spo2 = f"{spo2['min']}%"
 
     def calculate_training_duration(self):
             """
-            Calculates total training duration in minutes.
-            Simple and direct subtraction of session timestamps.
+            Formats the total training duration stored in the session summary.
             """
-            start_dt = end_dt = None
-            log_path = f"{self.current_training_directory}/training_data.txt"
-            
-            try:
-                if not os.path.exists(log_path):
-                    return "Duration: -- min"
-
-                with open(log_path, "r") as file:
-                    lines = file.readlines()
-                    for line in lines:
-                        if "SESSION START:" in line:
-                            start_str = line.split("SESSION START: ")[1].strip()
-                            start_dt = datetime.strptime(start_str, "%Y-%m-%d %H:%M:%S")
-                        if "SESSION END:" in line:
-                            end_str = line.split("SESSION END: ")[1].strip()
-                            end_dt = datetime.strptime(end_str, "%Y-%m-%d %H:%M:%S")
-
-                # Check if both timestamps were successfully parsed
-                if start_dt and end_dt:
-                    # .total_seconds() gives the full span, then we convert to whole minutes
-                    duration_seconds = (end_dt - start_dt).total_seconds()
-                    duration_minutes = int(duration_seconds // 60)
-                    return f"Duration: {duration_minutes} min"
-                
-            except Exception as e:
-                print(f"Error calculating duration: {e}")
-                return "Duration: -- min"
-
-            # Return this if file exists but timestamps are missing
-            return "Duration: -- min"
+            duration_seconds = self.summary["duration_s"]
+            if duration_seconds is None:
+                # Session markers are missing
+                return "Training Duration: --"
+            hours, minutes = divmod(int(duration_seconds // 60), 60)
+            return f"Training Duration: {hours}h {minutes}m"
     def set_labels_text(self):
 
         self.training_name_label.setText(self.trainig_name)
-        self.training_duration_label.setText("Training Duration: 1h 25m")
+        self.training_duration_label.setText(self.calculate_training_duration())
         self.average_heart_rate_label.setText("Average HR: " + str(self.average_heart_rate))
         self.max_heart_rate_label.setText("Max HR: " + str(self.max_heart_rate))
         self.min_heart_rate_label.setText("Min HR: " + str(self.min_heart_rate))
@@ -257,13 +222,29 @@ class TrainingOverwiev(QWidget):
 
         self.setLayout(self.main_layout)
 
+    def load_session(self):
+        """
+        Opens the session data on first use; the header only needs the summary.
+        Opening may convert a text log or decompress an archived session.
+        """
+        if self.session is None:
+            self.session = open_session(self.current_training_directory)
+            self.HR_list = self.session.bpm
+            self.Spo2_list = self.session.spo2
+            self.time_list = self.session.timestamps if self.session.has_timestamps() else None
+        return self.session
+
     def hear_rate_chart_clicked(self):
-        self.HR_chart_window = HearRateChart(directory=self.current_training_directory, hr_list=self.HR_list)
+        self.load_session()
+        self.HR_chart_window = HearRateChart(directory=self.current_training_directory, hr_list=self.HR_list,
+                                           time_list=self.time_list)
         self.HR_chart_window.showFullScreen()
 
     
     def spo2_chart_clicked(self):
-        self.SPO2_chart_window = SPO2Chart(directory=self.current_training_directory, spo2_list=self.Spo2_list)
+        self.load_session()
+        self.SPO2_chart_window = SPO2Chart(directory=self.current_training_directory, spo2_list=self.Spo2_list,
+                                           time_list=self.time_list)
         self.SPO2_chart_window.showFullScreen()
 
 
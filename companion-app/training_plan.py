@@ -0,0 +1,147 @@
+"""
+In-memory model of a training plan.
+A plan is read from the repository once, when it is chosen, and its tasks are
+parsed and validated into TaskRecord objects with numeric fields (seconds,
+bpm), so the task windows never touch the disk or parse text during a set.
+"""
+
+import os
+
+from training_repository import get_repository
+
+
+def parse_duration(text):
+    """
+    Converts an editor time ("1'30") to seconds.
+
+    Returns:
+        int: Seconds, or None for "None" or an empty field.
+    """
+    text = (text or "").strip()
+    if text in ("", "None"):
+        return None
+    minutes, seconds = text.split("'")
+    seconds = int(minutes) * 60 + int(seconds)
+    if seconds < 0:
+        raise ValueError(f"negative time {text!r}")
+    return seconds
+
+
+def parse_hr_range(text):
+    """
+    Converts an editor heart rate target ("Tempo: 133 - 152 bpm").
+
+    Returns:
+        tuple: (zone name, low bpm, high bpm), or None for "None".
+    """
+    text = (text or "").strip()
+    if text in ("", "None"):
+        return None
+    name, _, range_text = text.rpartition(":")
+    low, high = (int(value) for value in range_text.replace("bpm", "").split("-"))
+    if low > high:
+        raise ValueError(f"empty heart rate range {text!r}")
+    return name.strip(), low, high
+
+
+def _count(text, minimum=0):
+    """Optional whole number field of the editor (empty means not given)."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    value = int(text)
+    if value < minimum:
+        raise ValueError(f"{value} is below {minimum}")
+    return value
+
+
+def format_duration(seconds):
+    return f"{seconds // 60}'{seconds % 60:02d}"
+
+
+class TaskRecord:
+    """One parsed task of a plan; times are in seconds, None where the editor left "None"."""
+    __slots__ = ("number", "name", "reps", "meters", "description", "block_reps",
+                 "time_limit_s", "pacer_s", "hr_zone", "hr_low", "hr_high")
+
+    def __init__(self, number, name, reps, meters, description, block_reps, time_limit_s, pacer_s, hr_range):
+        self.number = number
+        self.name = name
+        self.reps = reps
+        self.meters = meters
+        self.description = description
+        self.block_reps = block_reps
+        self.time_limit_s = time_limit_s
+        self.pacer_s = pacer_s
+        self.hr_zone, self.hr_low, self.hr_high = hr_range if hr_range else (None, None, None)
+
+    @classmethod
+    def from_fields(cls, number, data):
+        """
+        Parses the editor fields of a task (see AddTask.save_button_clicked).
+
+        Raises:
+            ValueError: If a field cannot be parsed; the message names the task.
+        """
+        try:
+            return cls(
+                number=number,
+                name=data.get("task_name", f"Task {number}"),
+                reps=_count(data.get("ammount_reps")),
+                meters=_count(data.get("meters")),
+                description=data.get("detailed_description", ""),
+                block_reps=_count(data.get("block_reps"), minimum=1) or 1,
+                time_limit_s=parse_duration(data.get("time_limit")),
+                pacer_s=parse_duration(data.get("pacer")),
+                hr_range=parse_hr_range(data.get("target_heart_rate")),
+            )
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Task {number}: {e}") from None
+
+    @property
+    def time_limit_text(self):
+        return "None" if self.time_limit_s is None else format_duration(self.time_limit_s)
+
+    @property
+    def target_hr_text(self):
+        return "None" if self.hr_zone is None else f"{self.hr_low} - {self.hr_high} bpm"
+
+
+class TrainingPlan:
+    """The ordered, validated tasks of one training, with the session folder it records into."""
+    __slots__ = ("name", "directory", "tasks")
+
+    def __init__(self, name, directory, tasks):
+        """
+        Args:
+            name (str): Training name (repository key).
+            directory (str): Session folder of the training.
+            tasks (list): TaskRecord objects numbered 1..n.
+        """
+        self.name = name
+        self.directory = directory
+        self.tasks = tasks
+
+    @classmethod
+    def load(cls, directory, repository=None):
+        """Reads and parses every task of the training stored for a session folder (one query)."""
+        repository = get_repository() if repository is None else repository
+        name = os.path.basename(directory)
+        tasks = [TaskRecord.from_fields(number, data) for number, data in repository.tasks(name)]
+        for expected, task in enumerate(tasks, start=1):
+            if task.number != expected:
+                raise ValueError(f"{name}: task {expected} is missing")
+        return cls(name, directory, tasks)
+
+    @property
+    def task_count(self):
+        return len(self.tasks)
+
+    def task(self, number):
+        """Returns task `number` (1-based)."""
+        if not 1 <= number <= len(self.tasks):
+            raise KeyError(f"{self.name} has no task {number}")
+        return self.tasks[number - 1]
+
+    def is_last(self, number):
+        return number == len(self.tasks)
@@ -1,25 +1,25 @@
 """
 Training Planner Module.
-Handles the creation of new swimming workout routines by generating directory 
-structures and managing task sequences through a dynamic UI.
+Handles the creation of new swimming workout routines by registering them in the
+training repository and managing task sequences through a dynamic UI.
 """
 
 from app_config import (PROJECT_PATH, BACKGROUND, PLAN_WINDOW_PLUS_BUTTON_STYLE, SAVE_BUTTON_STYLE,
                         RETURN_BUTTON_STYLE, SCROLL_AREA_STYLE, TRAINING_NAME_STYLE, MSG_STYLE)
-import os
 from PyQt5.QtWidgets import (QWidget, QMessageBox, QApplication, QPushButton, QHBoxLayout, QVBoxLayout, QLabel,
     QSizePolicy, QLineEdit, QScrollArea)
 from PyQt5.QtGui import QPainter, QIcon, QPixmap
 from PyQt5.QtCore import Qt, QSize, QTimer
-import math, time, shutil
+import math, time
 
 # Internal components for input and task configuration
 import virtual_keyboard, add_task
+from training_repository import get_repository
 
 class PlanTraining(QWidget):
     """
     Interface for defining new training sessions.
-    Manages filesystem operations (mkdir) and coordinates the flow 
+    Manages the repository entry of the plan and coordinates the flow 
     between naming a session and adding individual tasks.
     """
     def __init__(self):
@@ -156,7 +156,7 @@ class PlanTraining(QWidget):
 
         # Verification: Prevent overwriting existing trainings
         if not self.is_training_created:
-            if training_name in os.listdir(f"{PROJECT_PATH}/planned_trainings"):
+            if get_repository().plan_exists(training_name):
                 self.msg.setText("Choose a different training name!")
                 self.msg.setWindowTitle("Training name already exists!")
                 self.msg.setStandardButtons(QMessageBox.Ok)
@@ -185,11 +185,9 @@ class PlanTraining(QWidget):
         
         self.save_button.show()
         
-        # Filesystem Operation: Create directory for the new training session
+        # Repository Operation: Register the new training plan (its data folder is created on start)
         if not self.is_training_created:
-            os.mkdir(f"{PROJECT_PATH}/planned_trainings/{training_name}")
-            with open(f"{PROJECT_PATH}/planned_trainings/{training_name}/training_data.txt", 'w') as file:
-                file.write(f"Training Name: {training_name}\n")
+            get_repository().create_plan(training_name)
 
         self.is_training_created = True
         self.task_counter += 1
@@ -211,7 +209,7 @@ class PlanTraining(QWidget):
     def return_button_clicked(self):
         """
         Abort logic. 
-        If a training was partially created on disk, it is removed recursively.
+        If a training was partially created, it is removed with its tasks.
         """
         training_name = self.training_name.text().strip()
         
@@ -219,9 +217,9 @@ class PlanTraining(QWidget):
             self.close()
             return
 
-        # Cleanup: Remove partially created directory if operation is cancelled
-        if os.path.exists(f"{PROJECT_PATH}/planned_trainings/{training_name}"):
-            shutil.rmtree(f"{PROJECT_PATH}/planned_trainings/{training_name}")
+        # Cleanup: Remove the partially created plan if operation is cancelled
+        if self.is_training_created:
+            get_repository().delete_plan(training_name)
         self.close()
 
     def connect_line_edit_to_keyboard(self):
@@ -0,0 +1,274 @@
+"""
+SQLite-backed storage of training plans, their tasks and recorded sessions.
+One database in WAL mode replaces scanning planned_trainings/ and
+finished_trainings/ with os.listdir and reading one JSON file per task; the
+session folders only keep the recorded logs. Legacy folders are imported by
+migrate_directories(), automatically when the database is first created or
+from the command line.
+
+Usage: python training_repository.py [DATA_ROOT]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import session_format
+
+DATABASE_FILE = "trainings.db"
+
+# Bumped together with a new entry in SCHEMA_MIGRATIONS
+SCHEMA_VERSION = 1
+SCHEMA_MIGRATIONS = {
+    1: """
+        CREATE TABLE plans (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            created_at REAL NOT NULL,
+            finished INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX plans_by_state ON plans (finished, name);
+
+        CREATE TABLE tasks (
+            plan_id INTEGER NOT NULL REFERENCES plans (id) ON DELETE CASCADE,
+            number INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (plan_id, number)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE sessions (
+            id INTEGER PRIMARY KEY,
+            plan_id INTEGER NOT NULL REFERENCES plans (id) ON DELETE CASCADE,
+            directory TEXT NOT NULL,
+            started_at REAL,
+            ended_at REAL
+        );
+        CREATE INDEX sessions_by_plan ON sessions (plan_id);
+        CREATE INDEX sessions_by_end ON sessions (ended_at);
+
+        CREATE TABLE samples (
+            session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+            timestamp REAL,
+            bpm INTEGER NOT NULL,
+            spo2 INTEGER NOT NULL,
+            task INTEGER NOT NULL
+        );
+        CREATE INDEX samples_by_session ON samples (session_id, task);
+    """,
+}
+
+
+class TrainingRepository:
+    """
+    Plans, tasks, sessions and samples in one SQLite database.
+
+    A plan is created in the planner, gets its tasks from the task editor and
+    turns into a finished training when its session ends. Every lookup is an
+    indexed query, so the screens stay fast with thousands of archived
+    sessions. One connection is shared by the GUI, the I/O worker and the
+    recorder's flusher thread; the lock serializes them and each call is one
+    transaction.
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Database file, created with the current schema if missing.
+        """
+        self.path = path
+        self.lock = threading.RLock()
+        self.created = not os.path.exists(path)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        # WAL lets readers run during sample inserts; NORMAL only syncs at checkpoints
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self._migrate_schema()
+
+    def _migrate_schema(self):
+        with self.lock, self.connection:
+            version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+            for target in range(version + 1, SCHEMA_VERSION + 1):
+                self.connection.executescript(f"BEGIN; {SCHEMA_MIGRATIONS[target]} PRAGMA user_version = {target}; COMMIT;")
+
+    def _query(self, sql, parameters=()):
+        with self.lock:
+            return self.connection.execute(sql, parameters).fetchall()
+
+    def _plan_id(self, name):
+        rows = self._query("SELECT id FROM plans WHERE name = ?", (name,))
+        if not rows:
+            raise KeyError(f"No training named {name!r}")
+        return rows[0]["id"]
+
+    # --- Plans ---
+    def list_plans(self):
+        """Names of the trainings that have not been done yet, alphabetically."""
+        return [row["name"] for row in self._query("SELECT name FROM plans WHERE finished = 0 ORDER BY name")]
+
+    def plan_exists(self, name):
+        """True if a planned or finished training already uses the name."""
+        return bool(self._query("SELECT 1 FROM plans WHERE name = ?", (name,)))
+
+    def create_plan(self, name):
+        with self.lock, self.connection:
+            return self.connection.execute("INSERT INTO plans (name, created_at) VALUES (?, ?)",
+                                           (name, time.time())).lastrowid
+
+    def delete_plan(self, name):
+        """Deletes a planned or finished training with its tasks, sessions and samples."""
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM plans WHERE name = ?", (name,))
+
+    # --- Tasks ---
+    def save_task(self, plan_name, number, data):
+        """Stores (or replaces) task number `number` of a plan as a dict of editor fields."""
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO tasks (plan_id, number, data) VALUES (?, ?, ?)",
+                                    (self._plan_id(plan_name), number, json.dumps(data)))
+
+    def task(self, plan_name, number):
+        """Returns the fields of one task, or None if it does not exist."""
+        rows = self._query("SELECT data FROM tasks JOIN plans ON plans.id = tasks.plan_id "
+                           "WHERE plans.name = ? AND tasks.number = ?", (plan_name, number))
+        return json.loads(rows[0]["data"]) if rows else None
+
+    def tasks(self, plan_name):
+        """Returns (number, fields) of every task of a plan, in order."""
+        rows = self._query("SELECT tasks.number, tasks.data FROM tasks JOIN plans ON plans.id = tasks.plan_id "
+                           "WHERE plans.name = ? ORDER BY tasks.number", (plan_name,))
+        return [(row["number"], json.loads(row["data"])) for row in rows]
+
+    def task_count(self, plan_name):
+        rows = self._query("SELECT count(*) FROM tasks JOIN plans ON plans.id = tasks.plan_id "
+                           "WHERE plans.name = ?", (plan_name,))
+        return rows[0][0]
+
+    # --- Sessions ---
+    def start_session(self, plan_name, directory, started_at=None):
+        """Opens a session of a plan and returns its ID (the key of its samples)."""
+        with self.lock, self.connection:
+            return self.connection.execute(
+                "INSERT INTO sessions (plan_id, directory, started_at) VALUES (?, ?, ?)",
+                (self._plan_id(plan_name), directory, time.time() if started_at is None else started_at)).lastrowid
+
+    def add_samples(self, session_id, rows):
+        """
+        Bulk-inserts samples in a single transaction.
+
+        Args:
+            session_id (int): Session returned by start_session().
+            rows (iterable): (timestamp, bpm, spo2, task) tuples.
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO samples (session_id, timestamp, bpm, spo2, task) VALUES (?, ?, ?, ?, ?)",
+                ((session_id, *row) for row in rows))
+
+    def sample_count(self, session_id):
+        """Number of stored samples of a session."""
+        return self._query("SELECT count(*) FROM samples WHERE session_id = ?", (session_id,))[0][0]
+
+    def finish_session(self, plan_name, directory, ended_at=None):
+        """Closes the open session of a plan, records where it was archived and moves the plan into history."""
+        with self.lock, self.connection:
+            plan_id = self._plan_id(plan_name)
+            self.connection.execute(
+                "UPDATE sessions SET ended_at = ?, directory = ? WHERE plan_id = ? AND ended_at IS NULL",
+                (time.time() if ended_at is None else ended_at, directory, plan_id))
+            self.connection.execute("UPDATE plans SET finished = 1 WHERE id = ?", (plan_id,))
+
+    def list_sessions(self):
+        """Names of the finished trainings, most recent first."""
+        return [row["name"] for row in self._query(
+            "SELECT plans.name FROM plans JOIN sessions ON sessions.plan_id = plans.id "
+            "WHERE plans.finished = 1 GROUP BY plans.id ORDER BY max(sessions.ended_at) DESC")]
+
+    def session_samples(self, plan_name, task=None):
+        """Returns (timestamp, bpm, spo2, task) rows of a training, optionally of one task only."""
+        sql = ("SELECT samples.timestamp, samples.bpm, samples.spo2, samples.task FROM samples "
+               "JOIN sessions ON sessions.id = samples.session_id JOIN plans ON plans.id = sessions.plan_id "
+               "WHERE plans.name = ?")
+        parameters = (plan_name,)
+        if task is not None:
+            sql += " AND samples.task = ?"
+            parameters += (task,)
+        return [tuple(row) for row in self._query(sql + " ORDER BY samples.rowid", parameters)]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# --- Import of the Directory-per-Plan Layout ---
+def _import_tasks(repository, name, directory):
+    for file_name in os.listdir(directory):
+        if file_name.startswith("Task ") and file_name.endswith(".json"):
+            with open(os.path.join(directory, file_name), "r") as file:
+                repository.save_task(name, int(file_name[5:-5]), json.load(file))
+
+
+def migrate_directories(repository, project_path):
+    """
+    Imports planned_trainings/ and finished_trainings/ into the repository.
+    Trainings already in the database are skipped, so it can be run again.
+
+    Returns:
+        tuple: (plans imported, finished sessions imported).
+    """
+    plans = sessions = 0
+    for finished, folder in ((False, "planned_trainings"), (True, "finished_trainings")):
+        root = os.path.join(project_path, folder)
+        if not os.path.isdir(root):
+            continue
+        for name in sorted(os.listdir(root)):
+            directory = os.path.join(root, name)
+            if not os.path.isdir(directory) or repository.plan_exists(name):
+                continue
+            repository.create_plan(name)
+            _import_tasks(repository, name, directory)
+
+            log_path = os.path.join(directory, session_format.TEXT_LOG)
+            if finished and os.path.exists(log_path):
+                log = session_format.read_text_log(log_path)
+                session_id = repository.start_session(name, directory, log["started_at"])
+                repository.add_samples(session_id, zip(log["timestamps"], log["bpm"], log["spo2"], log["task"]))
+                repository.finish_session(name, directory, log["ended_at"])
+                sessions += 1
+            else:
+                plans += 1
+    return plans, sessions
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+def get_repository():
+    """Returns the application-wide repository, importing the legacy folders when the database is new."""
+    global _repository
+    with _repository_lock:
+        if _repository is None:
+            from app_config import DATA_ROOT
+            _repository = TrainingRepository(os.path.join(DATA_ROOT, DATABASE_FILE))
+            if _repository.created:
+                migrate_directories(_repository, DATA_ROOT)
+    return _repository
+
+
+def main():
+    if len(sys.argv) > 1:
+        project_path = sys.argv[1]
+    else:
+        from app_config import DATA_ROOT as project_path
+    repository = TrainingRepository(os.path.join(project_path, DATABASE_FILE))
+    started = time.perf_counter()
+    plans, sessions = migrate_directories(repository, project_path)
+    print(f"Imported {plans} planned and {sessions} finished trainings in {time.perf_counter() - started:.2f} s")
+    repository.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@
  */
 
 #include "ble_app.h"
+#include "interval_program.h"
 #include "esp_log.h"
 #include "nvs_flash.h"
 #include "nimble/nimble_port.h"
@@ -12,11 +13,23 @@
 #include "host/ble_gap.h"
 #include "host/ble_gatt.h"
 #include "esp_nimble_hci.h"
+#include "esp_timer.h"
+#include "freertos/FreeRTOS.h"
+#include "freertos/semphr.h"
+#include "freertos/task.h"
 #include <string.h>
 #include <stdlib.h>
 
 #define TAG "BLE_APP"
 
+/* --- Backfill Pacing --- */
+#define NOTIFY_RETRY_DELAY_MS 10                /**< Wait for free mbufs when the stack is congested */
+#define NOTIFY_MAX_RETRIES    50
+
+/* --- Batching --- */
+#define MAX_BATCH_WINDOW_MS   10000             /**< Keeps entry offsets well inside 16 bits */
+#define ATT_NOTIFY_OVERHEAD   3                 /**< Opcode + attribute handle */
+
 /* Forward declaration for advertising function */
 static void ble_advertise(void);
 
@@ -24,30 +37,207 @@ static void ble_advertise(void);
 static uint8_t gatt_char_val[64];               /**< Buffer for characteristic value */
 static uint16_t gatt_char_handle;               /**< Handle for the GATTS characteristic */
 static uint16_t conn_handle = BLE_HS_CONN_HANDLE_NONE; /**< Active connection handle */
+static uint16_t backfill_char_handle;           /**< Handle for the backfill characteristic */
+static uint8_t frame_format = FORMAT_CSV;       /**< Telemetry format negotiated with the client */
+
+/* --- Sample History (written by the main task, read by the backfill task) --- */
+static seq_sample_frame_t sample_ring[SAMPLE_RING_CAPACITY];
+static uint32_t next_seq = 0;                   /**< Sequence number of the next recorded sample */
+static SemaphoreHandle_t ring_lock;
+
+/* --- Acquisition Rate and Pending Batch (batch touched by the main task only) --- */
+static volatile uint16_t sample_period_ms = DEFAULT_SAMPLE_PERIOD_MS;
+static volatile uint16_t batch_window_ms = DEFAULT_BATCH_WINDOW_MS;
+static batch_header_t batch_header;
+static batch_entry_t batch_entries[MAX_BATCH_SAMPLES];
+static volatile uint8_t batch_count = 0;
+
+/* --- Pending Backfill Request --- */
+static TaskHandle_t backfill_task_handle;
+static volatile uint32_t backfill_from;
+static volatile uint16_t backfill_count;
 
 /* --- External Linkage (Main Application Functions) --- */
 extern void ble_connection_status(bool connected);
 extern void start_pace_timer(int seconds);
 
 /**
- * @brief GATT access callback for write operations
- * Triggered when a client (e.g., Raspberry Pi) writes a value to the characteristic.
+ * @brief Sends one notification, waiting for the stack to free buffers if needed
+ * @param handle Characteristic value handle
+ * @param data Frame bytes
+ * @param len Frame length
+ * @return 0 on success, NimBLE error code otherwise
+ */
+static int notify_frame(uint16_t handle, const void *data, uint16_t len)
+{
+    for (int attempt = 0; attempt < NOTIFY_MAX_RETRIES; attempt++) {
+        if (conn_handle == BLE_HS_CONN_HANDLE_NONE) return BLE_HS_ENOTCONN;
+
+        struct os_mbuf *om = ble_hs_mbuf_from_flat(data, len);
+        int rc = om == NULL ? BLE_HS_ENOMEM : ble_gattc_notify_custom(conn_handle, handle, om);
+        if (rc != BLE_HS_ENOMEM) return rc;
+
+        vTaskDelay(pdMS_TO_TICKS(NOTIFY_RETRY_DELAY_MS));
+    }
+    return BLE_HS_ENOMEM;
+}
+
+/**
+ * @brief FreeRTOS task replaying stored samples on the backfill characteristic
+ * Woken by CMD_BACKFILL; sends the requested range still held in the ring,
+ * in sequence order, followed by a backfill_end_frame_t.
+ */
+static void backfill_task(void *param)
+{
+    while (1) {
+        ulTaskNotifyTake(pdTRUE, portMAX_DELAY);
+
+        uint32_t from = backfill_from;
+        uint32_t end = from + backfill_count;
+        uint32_t first_seq = from;
+        uint16_t sent = 0;
+
+        for (uint32_t seq = from; seq < end; seq++) {
+            seq_sample_frame_t record;
+            bool available;
+
+            xSemaphoreTake(ring_lock, portMAX_DELAY);
+            /* A sample is available if it was recorded and not yet overwritten */
+            available = seq < next_seq && next_seq - seq <= SAMPLE_RING_CAPACITY;
+            if (available) record = sample_ring[seq % SAMPLE_RING_CAPACITY];
+            xSemaphoreGive(ring_lock);
+
+            if (!available) {
+                if (seq >= next_seq) break; /* Never recorded: nothing newer either */
+                first_seq = seq + 1;        /* Already overwritten: skip ahead */
+                continue;
+            }
+            if (notify_frame(backfill_char_handle, &record, sizeof(record)) != 0) break;
+            sent++;
+        }
+
+        backfill_end_frame_t done = {
+            .header = FRAME_HEADER_V(FRAME_TYPE_BACKFILL_END, 2),
+            .first_seq = first_seq,
+            .count = sent,
+        };
+        notify_frame(backfill_char_handle, &done, sizeof(done));
+        ESP_LOGI(TAG, "Backfill of %u samples from seq %lu done", sent, first_seq);
+    }
+}
+
+/**
+ * @brief Handles a binary control command written by the client
+ * @param buffer Command bytes, first byte is the opcode
+ * @param len Number of valid bytes in the buffer
+ */
+static void handle_command(const uint8_t *buffer, uint16_t len)
+{
+    switch (buffer[0]) {
+    case CMD_SET_FORMAT:
+        if (len >= 2 && buffer[1] <= FORMAT_BATCHED) {
+            frame_format = buffer[1];
+            ESP_LOGI(TAG, "Telemetry format set to %u", frame_format);
+        }
+        break;
+
+    case CMD_BACKFILL:
+        if (len >= 7) {
+            uint32_t from;
+            uint16_t count;
+            memcpy(&from, &buffer[1], sizeof(from));
+            memcpy(&count, &buffer[5], sizeof(count));
+            backfill_from = from;
+            backfill_count = count;
+            xTaskNotifyGive(backfill_task_handle);
+        }
+        break;
+
+    case CMD_TIME_SYNC:
+        if (len >= 5) {
+            /* Stamp first: everything after this adds to the host's round trip, not to the error */
+            time_sync_frame_t reply = {
+                .header = FRAME_HEADER_V(FRAME_TYPE_TIME_SYNC, 2),
+                .device_us = (uint64_t)esp_timer_get_time(),
+            };
+            memcpy(&reply.token, &buffer[1], sizeof(reply.token));
+            struct os_mbuf *om = ble_hs_mbuf_from_flat(&reply, sizeof(reply));
+            if (om != NULL) ble_gattc_notify_custom(conn_handle, gatt_char_handle, om);
+        }
+        break;
+
+    case CMD_SET_RATE:
+        if (len >= 5) {
+            uint16_t period, window;
+            memcpy(&period, &buffer[1], sizeof(period));
+            memcpy(&window, &buffer[3], sizeof(window));
+            if (period < MIN_SAMPLE_PERIOD_MS) period = MIN_SAMPLE_PERIOD_MS;
+            if (period > MAX_SAMPLE_PERIOD_MS) period = MAX_SAMPLE_PERIOD_MS;
+            if (window > MAX_BATCH_WINDOW_MS) window = MAX_BATCH_WINDOW_MS;
+            sample_period_ms = period;
+            batch_window_ms = window;
+            ESP_LOGI(TAG, "Sample period %u ms, batch window %u ms", period, window);
+        }
+        break;
+
+    case CMD_PROGRAM_LOAD:
+        if (len >= sizeof(program_load_command_t)) {
+            program_load_command_t load;
+            memcpy(&load, buffer, sizeof(load));
+            interval_program_load(load.program_id, load.prestart_ms, load.interval_ms,
+                                  load.pacer_ms, load.total_ms, load.countdown);
+        }
+        break;
+
+    case CMD_PROGRAM_CONTROL:
+        if (len >= sizeof(program_control_command_t)) {
+            program_control_command_t control;
+            memcpy(&control, buffer, sizeof(control));
+            interval_program_control(control.program_id, control.action, control.program_ms, control.at_device_ms);
+        }
+        break;
+
+    default:
+        ESP_LOGW(TAG, "Unknown command 0x%02X", buffer[0]);
+        break;
+    }
+}
+
+/**
+ * @brief GATT access callback for read and write operations
+ * A read returns the capability record used for format negotiation.
+ * A write is either a binary command or the legacy pacer interval string.
  */
-static int gatt_write_cb(uint16_t conn_handle, uint16_t attr_handle,
-                         struct ble_gatt_access_ctxt *ctxt, void *arg)
+static int gatt_access_cb(uint16_t conn_handle, uint16_t attr_handle,
+                          struct ble_gatt_access_ctxt *ctxt, void *arg)
 {
-    char buffer[16];
-    uint16_t len = ctxt->om->om_len;
+    if (ctxt->op == BLE_GATT_ACCESS_OP_READ_CHR) {
+        /* Capability record: [INFO header, highest supported format, feature flags] */
+        const uint8_t info[3] = { FRAME_HEADER(FRAME_TYPE_INFO), FORMAT_BATCHED, FEATURE_TIME_SYNC | FEATURE_PROGRAM };
+        int rc = os_mbuf_append(ctxt->om, info, sizeof(info));
+        return rc == 0 ? 0 : BLE_ATT_ERR_INSUFFICIENT_RES;
+    }
+
+    /* Room for the longest command (program load) */
+    uint8_t buffer[32];
+    uint16_t len = OS_MBUF_PKTLEN(ctxt->om);
     
     /* Clamp length to prevent buffer overflow */
     if (len >= sizeof(buffer)) len = sizeof(buffer) - 1;
+    if (len == 0) return 0;
 
     /* Copy data from mbuf to flat buffer */
     ble_hs_mbuf_to_flat(ctxt->om, buffer, len, NULL);
     buffer[len] = '\0';
 
+    /* Binary commands never start with an ASCII character */
+    if (buffer[0] & FRAME_BINARY_FLAG) {
+        handle_command(buffer, len);
+        return 0;
+    }
+
     /* Convert received string to integer */
-    int seconds = atoi(buffer);
+    int seconds = atoi((char *)buffer);
     ESP_LOGI(TAG, "Timer value received: %d s", seconds);
 
     /* Update the system pace timer */
@@ -56,6 +246,15 @@ static int gatt_write_cb(uint16_t conn_handle, uint16_t attr_handle,
     return 0;
 }
 
+/**
+ * @brief Access callback of the notify-only backfill characteristic
+ */
+static int backfill_access_cb(uint16_t conn_handle, uint16_t attr_handle,
+                              struct ble_gatt_access_ctxt *ctxt, void *arg)
+{
+    return BLE_ATT_ERR_READ_NOT_PERMITTED;
+}
+
 /* --- GATT Service Definition --- */
 static const struct ble_gatt_svc_def gatt_svcs[] = {
     {
@@ -64,10 +263,16 @@ static const struct ble_gatt_svc_def gatt_svcs[] = {
         .characteristics = (struct ble_gatt_chr_def[]) {
             {
                 .uuid = BLE_UUID16_DECLARE(GATTS_CHAR_UUID),
-                .access_cb = gatt_write_cb,
-                .flags = BLE_GATT_CHR_F_READ | BLE_GATT_CHR_F_WRITE | BLE_GATT_CHR_F_NOTIFY,
+                .access_cb = gatt_access_cb,
+                .flags = BLE_GATT_CHR_F_READ | BLE_GATT_CHR_F_WRITE | BLE_GATT_CHR_F_WRITE_NO_RSP | BLE_GATT_CHR_F_NOTIFY,
                 .val_handle = &gatt_char_handle,
             },
+            {
+                .uuid = BLE_UUID16_DECLARE(GATTS_BACKFILL_UUID),
+                .access_cb = backfill_access_cb,
+                .flags = BLE_GATT_CHR_F_NOTIFY,
+                .val_handle = &backfill_char_handle,
+            },
             {0} /* Mark end of characteristics */
         }
     },
@@ -95,6 +300,8 @@ static int ble_gap_event_cb(struct ble_gap_event *event, void *arg)
     case BLE_GAP_EVENT_DISCONNECT:
         ESP_LOGI(TAG, "Disconnected! Reason: %d", event->disconnect.reason);
         conn_handle = BLE_HS_CONN_HANDLE_NONE;
+        frame_format = FORMAT_CSV; /* Every new client negotiates again */
+        batch_count = 0;           /* Unsent batch stays in the ring for backfill */
         ble_connection_status(false);
         
         /* Resume advertising to allow reconnection */
@@ -170,6 +377,10 @@ static void ble_app_host_task(void *param)
  */
 void ble_app_start(void)
 {
+    /* Sample history must exist before the first sample is recorded */
+    ring_lock = xSemaphoreCreateMutex();
+    xTaskCreate(backfill_task, "ble_backfill", 3072, NULL, 5, &backfill_task_handle);
+
     nimble_port_init();
     
     /* Configure NimBLE stack */
@@ -184,7 +395,90 @@ void ble_app_start(void)
 }
 
 /**
- * @brief Formats and sends sensor data via BLE Notification
+ * @brief Number of batch entries fitting into one notification at the current MTU
+ */
+static uint8_t batch_capacity(void)
+{
+    int payload = ble_att_mtu(conn_handle) - ATT_NOTIFY_OVERHEAD - (int)sizeof(batch_header_t);
+    int capacity = payload / (int)sizeof(batch_entry_t);
+
+    if (capacity < 1) capacity = 1;
+    if (capacity > MAX_BATCH_SAMPLES) capacity = MAX_BATCH_SAMPLES;
+    return (uint8_t)capacity;
+}
+
+/**
+ * @brief Sends the pending batch as one notification
+ */
+static void flush_batch(void)
+{
+    uint8_t frame[sizeof(batch_header_t) + sizeof(batch_entries)];
+
+    batch_header.count = batch_count;
+    memcpy(frame, &batch_header, sizeof(batch_header));
+    memcpy(frame + sizeof(batch_header), batch_entries, batch_count * sizeof(batch_entry_t));
+    notify_frame(gatt_char_handle, frame, sizeof(batch_header) + batch_count * sizeof(batch_entry_t));
+    batch_count = 0;
+}
+
+/**
+ * @brief Adds a recorded sample to the pending batch
+ * The batch is sent once it fills the MTU or spans the configured batch window.
+ */
+static void batch_sample(const seq_sample_frame_t *record)
+{
+    if (batch_count == 0) {
+        batch_header.header = FRAME_HEADER_V(FRAME_TYPE_BATCH, 2);
+        batch_header.first_seq = record->seq;
+        batch_header.first_ms = record->device_ms;
+    }
+
+    uint32_t offset = record->device_ms - batch_header.first_ms;
+    batch_entries[batch_count++] = (batch_entry_t) {
+        .offset_ms = (uint16_t)offset,
+        .bpm = record->bpm,
+        .spo2 = record->spo2,
+        .battery = record->battery,
+        .millivolts = record->millivolts,
+    };
+
+    if (batch_count >= batch_capacity() || offset + sample_period_ms > batch_window_ms) {
+        flush_batch();
+    }
+}
+
+/**
+ * @brief Returns the acquisition period requested by the client
+ */
+uint32_t ble_app_sample_period_ms(void)
+{
+    return sample_period_ms;
+}
+
+/**
+ * @brief Notifies a program progress report, if a client is connected
+ * Sent once, without waiting for buffers: the program must not stall on the radio.
+ */
+void ble_app_send_program_progress(uint8_t program_id, uint8_t state, uint8_t kind,
+                                   uint16_t rep, uint32_t program_ms)
+{
+    if (conn_handle == BLE_HS_CONN_HANDLE_NONE) return;
+
+    program_progress_frame_t frame = {
+        .header = FRAME_HEADER_V(FRAME_TYPE_PROGRAM, 2),
+        .program_id = program_id,
+        .state = state,
+        .kind = kind,
+        .rep = rep,
+        .program_ms = program_ms,
+        .device_ms = (uint32_t)(esp_timer_get_time() / 1000),
+    };
+    struct os_mbuf *om = ble_hs_mbuf_from_flat(&frame, sizeof(frame));
+    if (om != NULL) ble_gattc_notify_custom(conn_handle, gatt_char_handle, om);
+}
+
+/**
+ * @brief Stores sensor data in the history ring and sends it via BLE Notification
  * @param bpm Heart Rate in Beats Per Minute
  * @param spo2 Oxygen Saturation percentage
  * @param battery_percentage Battery level (0-100)
@@ -192,15 +486,55 @@ void ble_app_start(void)
  */
 void ble_app_send_data(uint32_t bpm, uint8_t spo2, uint32_t battery_percentage, float batter_voltage)
 {
+    seq_sample_frame_t record = {
+        .header = FRAME_HEADER_V(FRAME_TYPE_SAMPLE, 2),
+        .device_ms = (uint32_t)(esp_timer_get_time() / 1000),
+        .bpm = (uint16_t)(bpm > UINT16_MAX ? UINT16_MAX : bpm),
+        .spo2 = spo2,
+        .battery = (uint8_t)battery_percentage,
+        .millivolts = (uint16_t)(batter_voltage * 1000.0f + 0.5f),
+    };
+
+    /* Record first, so samples taken while disconnected can be backfilled */
+    xSemaphoreTake(ring_lock, portMAX_DELAY);
+    record.seq = next_seq;
+    sample_ring[next_seq % SAMPLE_RING_CAPACITY] = record;
+    next_seq++;
+    xSemaphoreGive(ring_lock);
+
     if (conn_handle == BLE_HS_CONN_HANDLE_NONE) return;
 
-    /* Format data as a comma-separated string */
-    snprintf((char *)gatt_char_val, sizeof(gatt_char_val), "%lu,%u,%lu,%.2f",
-             bpm, spo2, battery_percentage, batter_voltage);
+    if (frame_format == FORMAT_BATCHED) {
+        batch_sample(&record);
+        return;
+    }
+
+    uint16_t len;
+
+    if (frame_format == FORMAT_SEQUENCED) {
+        memcpy(gatt_char_val, &record, sizeof(record));
+        len = sizeof(record);
+    } else if (frame_format == FORMAT_BINARY) {
+        /* Pack values into the fixed-layout frame */
+        sample_frame_t frame = {
+            .header = FRAME_HEADER(FRAME_TYPE_SAMPLE),
+            .bpm = record.bpm,
+            .spo2 = record.spo2,
+            .battery = record.battery,
+            .millivolts = record.millivolts,
+        };
+        memcpy(gatt_char_val, &frame, sizeof(frame));
+        len = sizeof(frame);
+    } else {
+        /* Format data as a comma-separated string */
+        snprintf((char *)gatt_char_val, sizeof(gatt_char_val), "%lu,%u,%lu,%.2f",
+                 bpm, spo2, battery_percentage, batter_voltage);
+        len = strlen((char *)gatt_char_val);
+    }
 
     /* Allocate mbuf for GATT notification */
-    struct os_mbuf *om = ble_hs_mbuf_from_flat(gatt_char_val, strlen((char *)gatt_char_val));
+    struct os_mbuf *om = ble_hs_mbuf_from_flat(gatt_char_val, len);
     
     /* Push notification to the connected client */
     ble_gattc_notify_custom(conn_handle, gatt_char_handle, om);
-}
\ No newline at end of file
+}
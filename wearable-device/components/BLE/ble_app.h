@@ -13,6 +13,148 @@
 #define BLE_DEVICE_NAME       "ESP32CE_BLE"    /**< Name of the device visible during scanning */
 #define GATTS_SERVICE_UUID    0x00FF           /**< 16-bit Custom Service UUID */
 #define GATTS_CHAR_UUID       0xFF01           /**< 16-bit Custom Characteristic UUID */
+#define GATTS_BACKFILL_UUID   0xFF02           /**< Notify-only characteristic carrying backfilled samples */
+
+/* --- Sample History --- */
+#define SAMPLE_RING_CAPACITY  256              /**< Samples kept in RAM for backfill (~4 min at 1 Hz) */
+
+/* --- Acquisition Rate --- */
+#define DEFAULT_SAMPLE_PERIOD_MS 1000
+#define MIN_SAMPLE_PERIOD_MS  100
+#define MAX_SAMPLE_PERIOD_MS  5000
+#define DEFAULT_BATCH_WINDOW_MS 0              /**< 0: every sample is notified on its own */
+#define MAX_BATCH_SAMPLES     32
+
+/* --- Telemetry Frame Format (mirrors companion-app/telemetry_protocol.py) --- */
+#define FRAME_BINARY_FLAG     0x80             /**< Bit 7 set: binary frame, never valid ASCII */
+#define FRAME_TYPE_SAMPLE     0x0
+#define FRAME_TYPE_BACKFILL_END 0x1
+#define FRAME_TYPE_BATCH      0x2
+#define FRAME_TYPE_TIME_SYNC  0x3
+#define FRAME_TYPE_PROGRAM    0x4
+#define FRAME_TYPE_INFO       0x7
+#define PROTOCOL_VERSION      1
+#define FRAME_HEADER_V(type, version) (FRAME_BINARY_FLAG | ((type) << 4) | (version))
+#define FRAME_HEADER(type)    FRAME_HEADER_V(type, PROTOCOL_VERSION)
+
+#define FORMAT_CSV            0                /**< Legacy 'BPM,SpO2,Battery,Voltage' text */
+#define FORMAT_BINARY         1                /**< Packed sample_frame_t */
+#define FORMAT_SEQUENCED      2                /**< Packed seq_sample_frame_t (sequence number + device time) */
+#define FORMAT_BATCHED        3                /**< batch_header_t + batch_entry_t[], sized to the MTU */
+
+/* --- Capability Record Feature Flags (third byte of the INFO read) --- */
+#define FEATURE_TIME_SYNC     0x01             /**< Device answers CMD_TIME_SYNC */
+#define FEATURE_PROGRAM       0x02             /**< Device runs interval programs (CMD_PROGRAM_*) */
+
+/* --- Control Commands (client -> device) --- */
+#define CMD_SET_FORMAT        0xC1             /**< [CMD, format] */
+#define CMD_BACKFILL          0xC2             /**< [CMD, from_seq (u32), count (u16)] */
+#define CMD_SET_RATE          0xC3             /**< [CMD, sample period ms (u16), batch window ms (u16)] */
+#define CMD_TIME_SYNC         0xC4             /**< [CMD, token (u32)] -> time_sync_frame_t */
+#define CMD_PROGRAM_LOAD      0xC5             /**< program_load_command_t */
+#define CMD_PROGRAM_CONTROL   0xC6             /**< program_control_command_t */
+
+/**
+ * @brief Fixed-layout binary sample frame (little-endian, 7 bytes)
+ */
+typedef struct __attribute__((packed)) {
+    uint8_t  header;       /**< FRAME_HEADER(FRAME_TYPE_SAMPLE) */
+    uint16_t bpm;          /**< Heart rate in beats per minute */
+    uint8_t  spo2;         /**< Blood oxygen saturation (0-100) */
+    uint8_t  battery;      /**< Battery capacity remaining (0-100) */
+    uint16_t millivolts;   /**< Battery voltage in millivolts */
+} sample_frame_t;
+
+/**
+ * @brief Sequenced binary sample frame, layout version 2 (little-endian, 15 bytes)
+ * Also the record stored in the sample history ring.
+ */
+typedef struct __attribute__((packed)) {
+    uint8_t  header;       /**< FRAME_HEADER_V(FRAME_TYPE_SAMPLE, 2) */
+    uint32_t seq;          /**< Sample counter since boot, never reused */
+    uint32_t device_ms;    /**< esp_timer time of the measurement in milliseconds */
+    uint16_t bpm;          /**< Heart rate in beats per minute */
+    uint8_t  spo2;         /**< Blood oxygen saturation (0-100) */
+    uint8_t  battery;      /**< Battery capacity remaining (0-100) */
+    uint16_t millivolts;   /**< Battery voltage in millivolts */
+} seq_sample_frame_t;
+
+/**
+ * @brief Terminates a backfill response on the backfill characteristic (7 bytes)
+ */
+typedef struct __attribute__((packed)) {
+    uint8_t  header;       /**< FRAME_HEADER_V(FRAME_TYPE_BACKFILL_END, 2) */
+    uint32_t first_seq;    /**< Oldest sequence number actually sent */
+    uint16_t count;        /**< Number of samples sent (older ones had left the ring) */
+} backfill_end_frame_t;
+
+/**
+ * @brief Header of a batched notification (little-endian, 10 bytes)
+ * Followed by `count` batch_entry_t; entry i has sequence number first_seq + i.
+ */
+typedef struct __attribute__((packed)) {
+    uint8_t  header;       /**< FRAME_HEADER_V(FRAME_TYPE_BATCH, 2) */
+    uint32_t first_seq;    /**< Sequence number of the first entry */
+    uint32_t first_ms;     /**< Device time of the first entry in milliseconds */
+    uint8_t  count;        /**< Number of entries that follow */
+} batch_header_t;
+
+/**
+ * @brief One sample inside a batched notification (8 bytes)
+ */
+typedef struct __attribute__((packed)) {
+    uint16_t offset_ms;    /**< Device time relative to first_ms */
+    uint16_t bpm;
+    uint8_t  spo2;
+    uint8_t  battery;
+    uint16_t millivolts;
+} batch_entry_t;
+
+/**
+ * @brief Clock sync reply, notified on the main characteristic (13 bytes)
+ */
+typedef struct __attribute__((packed)) {
+    uint8_t  header;       /**< FRAME_HEADER_V(FRAME_TYPE_TIME_SYNC, 2) */
+    uint32_t token;        /**< Echo of the request token */
+    uint64_t device_us;    /**< esp_timer_get_time() when the request was handled */
+} time_sync_frame_t;
+
+/**
+ * @brief Interval program upload (little-endian, 19 bytes: fits a default MTU write)
+ */
+typedef struct __attribute__((packed)) {
+    uint8_t  command;      /**< CMD_PROGRAM_LOAD */
+    uint8_t  program_id;   /**< Client chosen id (1-255), echoed in progress frames */
+    uint32_t prestart_ms;  /**< Countdown before the first send-off */
+    uint32_t interval_ms;  /**< Send-off interval, 0 for a task without a time limit */
+    uint32_t pacer_ms;     /**< Pacer period inside a rep, 0 for none */
+    uint32_t total_ms;     /**< Program time of the end, 0 for a task without a time limit */
+    uint8_t  countdown;    /**< Short cues in the last seconds before each boundary */
+} program_load_command_t;
+
+/**
+ * @brief Start, pause, resume or stop of the loaded program (11 bytes)
+ */
+typedef struct __attribute__((packed)) {
+    uint8_t  command;      /**< CMD_PROGRAM_CONTROL */
+    uint8_t  program_id;
+    uint8_t  action;       /**< PROGRAM_START, PROGRAM_PAUSE, PROGRAM_RESUME or PROGRAM_STOP */
+    uint32_t program_ms;   /**< Program time at the moment of the action */
+    uint32_t at_device_ms; /**< Device time of the action (client's clock sync), 0 for on receipt */
+} program_control_command_t;
+
+/**
+ * @brief Program progress report, notified on the main characteristic (14 bytes)
+ */
+typedef struct __attribute__((packed)) {
+    uint8_t  header;       /**< FRAME_HEADER_V(FRAME_TYPE_PROGRAM, 2) */
+    uint8_t  program_id;
+    uint8_t  state;        /**< PROGRAM_IDLE ... PROGRAM_FINISHED */
+    uint8_t  kind;         /**< Event that fired, PROGRAM_NO_EVENT for a state change */
+    uint16_t rep;          /**< 1-based rep of the event */
+    uint32_t program_ms;   /**< Program time of the event or state change */
+    uint32_t device_ms;    /**< esp_timer time of the report in milliseconds */
+} program_progress_frame_t;
 
 /**
  * @brief Initializes the NimBLE stack and starts advertising
@@ -21,7 +163,9 @@
 void ble_app_start(void);
 
 /**
- * @brief Formats and transmits sensor and battery data via BLE notification
+ * @brief Records a sample in the history ring and notifies it to a connected client
+ * Samples are stored even while disconnected so the client can backfill them later.
+ * The frame layout follows the format negotiated by the client (CSV by default).
  * * @param bpm Heart rate in beats per minute
  * @param spo2 Blood oxygen saturation level (0-100)
  * @param battery_percentage Battery capacity remaining (0-100)
@@ -29,6 +173,24 @@ void ble_app_start(void);
  */
 void ble_app_send_data(uint32_t bpm, uint8_t spo2, uint32_t battery_percentage, float batter_voltage);
 
+/**
+ * @brief Returns the acquisition period requested by the client (CMD_SET_RATE)
+ * @return Sample period in milliseconds
+ */
+uint32_t ble_app_sample_period_ms(void);
+
+/**
+ * @brief Notifies a program progress report to a connected client (dropped otherwise)
+ * Matches program_progress_cb_t, so it is passed to interval_program_init().
+ * @param program_id Id of the program
+ * @param state Current program state
+ * @param kind Event that fired, PROGRAM_NO_EVENT for a state change
+ * @param rep 1-based rep of the event
+ * @param program_ms Program time of the event or state change
+ */
+void ble_app_send_program_progress(uint8_t program_id, uint8_t state, uint8_t kind,
+                                   uint16_t rep, uint32_t program_ms);
+
 #endif /* BLE_APP_H_ */
 
 
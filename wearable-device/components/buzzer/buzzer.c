@@ -101,4 +101,18 @@ void play_pace_mark_sound() {
     buzzer_play_tone(freq, 100, 70);
     vTaskDelay(pdMS_TO_TICKS(80));
     buzzer_play_tone(freq, 100, 70);
-}
\ No newline at end of file
+}
+
+/**
+ * @brief Plays a short single beep for countdown cues
+ */
+void play_countdown_sound() {
+    buzzer_play_tone(2730, 100, 100);
+}
+
+/**
+ * @brief Plays a long beep for start, send-offs and end
+ */
+void play_sendoff_sound() {
+    buzzer_play_tone(2093, 100, 600);
+}
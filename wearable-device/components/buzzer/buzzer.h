@@ -49,4 +49,14 @@ void play_power_on_sound(void);
  */
 void play_pace_mark_sound(void);
 
+/**
+ * @brief Plays a short single beep for interval program countdown cues
+ */
+void play_countdown_sound(void);
+
+/**
+ * @brief Plays a long beep for interval program start, send-offs and end
+ */
+void play_sendoff_sound(void);
+
 #endif /* BUZZER_H */
\ No newline at end of file
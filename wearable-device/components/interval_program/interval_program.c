@@ -0,0 +1,299 @@
+/**
+ * @file interval_program.c
+ * @brief Executes interval programs against esp_timer
+ *
+ * The program is expanded lazily by a cursor, in the same order as
+ * IntervalProgram.events() in companion-app/interval_timeline.py. A one-shot
+ * esp_timer wakes the executor task at the next event; an event that became
+ * due while a cue was playing is fired late rather than skipped.
+ */
+
+#include "interval_program.h"
+#include "buzzer.h"
+#include "esp_log.h"
+#include "esp_timer.h"
+#include "freertos/FreeRTOS.h"
+#include "freertos/semphr.h"
+#include "freertos/task.h"
+#include <stdbool.h>
+
+#define TAG "PROGRAM"
+
+#define PROGRAM_TASK_STACK    3072
+#define PROGRAM_TASK_PRIORITY 6                 /**< Above the sampling loop, cues are time critical */
+
+/* --- Cursor Phases --- */
+#define CURSOR_PRESTART       0
+#define CURSOR_REP            1
+#define CURSOR_DONE           2
+
+/**
+ * @brief One timed action of a program
+ */
+typedef struct {
+    uint32_t time_ms;      /**< Program time of the event */
+    uint8_t  kind;         /**< PROGRAM_EVENT_* */
+    uint16_t rep;          /**< 1-based rep, 0 before the start */
+} program_event_t;
+
+/**
+ * @brief Position in the lazily expanded program
+ */
+typedef struct {
+    uint8_t  phase;        /**< CURSOR_PRESTART, CURSOR_REP or CURSOR_DONE */
+    uint16_t rep;          /**< 0-based rep index while in CURSOR_REP */
+    uint8_t  second;       /**< Next countdown cue, counting down (0: none left) */
+    uint32_t next_pacer_ms;/**< Next pacer beep of the current rep */
+} program_cursor_t;
+
+/**
+ * @brief Loaded program, as received in CMD_PROGRAM_LOAD
+ */
+typedef struct {
+    uint8_t  id;           /**< 0: nothing loaded (clients use 1-255) */
+    uint32_t prestart_ms;
+    uint32_t interval_ms;  /**< 0: no time limit */
+    uint32_t pacer_ms;     /**< 0: no pacer */
+    uint16_t reps;         /**< Reps over all blocks, derived from the total duration */
+    uint8_t  countdown;
+} program_t;
+
+/* --- Executor State (guarded by program_lock) --- */
+static program_t program;
+static uint8_t  state = PROGRAM_IDLE;
+static program_cursor_t cursor;
+static int64_t  origin_us;                      /**< esp_timer time of program time 0 while running */
+static uint32_t last_event_ms;                  /**< Program time of the last fired event */
+
+static SemaphoreHandle_t program_lock;
+static TaskHandle_t program_task_handle;
+static esp_timer_handle_t wake_timer;
+static program_progress_cb_t report;
+
+/**
+ * @brief Moves the cursor to the start of a rep
+ * @param index 0-based rep index
+ */
+static void enter_rep(uint16_t index)
+{
+    cursor.phase = CURSOR_REP;
+    cursor.rep = index;
+    cursor.next_pacer_ms = program.prestart_ms + index * program.interval_ms + program.pacer_ms;
+    /* Countdown cues stay inside the rep they end */
+    cursor.second = program.countdown;
+    while (cursor.second > 0 && cursor.second * 1000u >= program.interval_ms) cursor.second--;
+}
+
+/**
+ * @brief Rewinds the cursor to the first event of the program
+ */
+static void cursor_reset(void)
+{
+    cursor.phase = CURSOR_PRESTART;
+    cursor.second = program.countdown;
+    while (cursor.second > 0 && cursor.second * 1000u > program.prestart_ms) cursor.second--;
+}
+
+/**
+ * @brief Returns the next event, optionally consuming it
+ * At equal times a pacer beep comes before a countdown cue.
+ * @param event Filled with the next event
+ * @param consume Advance the cursor past the event
+ * @return false once the program has no events left
+ */
+static bool cursor_next(program_event_t *event, bool consume)
+{
+    if (cursor.phase == CURSOR_PRESTART) {
+        if (cursor.second > 0) {
+            *event = (program_event_t){ program.prestart_ms - cursor.second * 1000u, PROGRAM_EVENT_COUNTDOWN, 0 };
+            if (consume) cursor.second--;
+        } else {
+            *event = (program_event_t){ program.prestart_ms, PROGRAM_EVENT_START, 1 };
+            if (consume) {
+                enter_rep(0);
+                /* Without a time limit only the pacer keeps running after the start */
+                if (program.interval_ms == 0 && program.pacer_ms == 0) cursor.phase = CURSOR_DONE;
+            }
+        }
+        return true;
+    }
+    if (cursor.phase != CURSOR_REP) return false;
+
+    if (program.interval_ms == 0) {
+        *event = (program_event_t){ cursor.next_pacer_ms, PROGRAM_EVENT_PACER, 1 };
+        if (consume) cursor.next_pacer_ms += program.pacer_ms;
+        return true;
+    }
+
+    uint32_t boundary = program.prestart_ms + (cursor.rep + 1) * program.interval_ms;
+    bool has_pacer = program.pacer_ms > 0 && cursor.next_pacer_ms < boundary;
+    bool has_countdown = cursor.second > 0;
+    uint32_t countdown_ms = boundary - cursor.second * 1000u;
+
+    if (has_pacer && (!has_countdown || cursor.next_pacer_ms <= countdown_ms)) {
+        *event = (program_event_t){ cursor.next_pacer_ms, PROGRAM_EVENT_PACER, cursor.rep + 1 };
+        if (consume) cursor.next_pacer_ms += program.pacer_ms;
+    } else if (has_countdown) {
+        *event = (program_event_t){ countdown_ms, PROGRAM_EVENT_COUNTDOWN, cursor.rep + 1 };
+        if (consume) cursor.second--;
+    } else if (cursor.rep + 1 < program.reps) {
+        *event = (program_event_t){ boundary, PROGRAM_EVENT_SENDOFF, cursor.rep + 2 };
+        if (consume) enter_rep(cursor.rep + 1);
+    } else {
+        *event = (program_event_t){ boundary, PROGRAM_EVENT_END, program.reps };
+        if (consume) cursor.phase = CURSOR_DONE;
+    }
+    return true;
+}
+
+/**
+ * @brief Converts a 32-bit device time in ms to the full esp_timer time in us
+ * @param at_device_ms esp_timer time in ms (truncated), 0 for now
+ * @param now_us Current esp_timer time
+ */
+static int64_t device_time_us(uint32_t at_device_ms, int64_t now_us)
+{
+    if (at_device_ms == 0) return now_us;
+    /* Signed difference handles the 32-bit wrap and times slightly in the past */
+    int32_t delta_ms = (int32_t)(at_device_ms - (uint32_t)(now_us / 1000));
+    return now_us + (int64_t)delta_ms * 1000;
+}
+
+/**
+ * @brief esp_timer callback: wakes the executor at the next event
+ */
+static void wake_timer_cb(void *arg)
+{
+    xTaskNotifyGive(program_task_handle);
+}
+
+/**
+ * @brief Plays the cue of an event
+ * Start, send-off and end share the long cue, like the base station buzzer.
+ */
+static void play_cue(uint8_t kind)
+{
+    switch (kind) {
+    case PROGRAM_EVENT_COUNTDOWN: play_countdown_sound(); break;
+    case PROGRAM_EVENT_PACER:     play_pace_mark_sound(); break;
+    default:                      play_sendoff_sound();   break;
+    }
+}
+
+/**
+ * @brief FreeRTOS task firing due events and arming the timer for the next one
+ */
+static void program_task(void *param)
+{
+    while (1) {
+        program_event_t event;
+        bool fire = false, finished = false;
+        uint8_t id;
+
+        xSemaphoreTake(program_lock, portMAX_DELAY);
+        id = program.id;
+        esp_timer_stop(wake_timer);
+        if (state == PROGRAM_RUNNING) {
+            if (!cursor_next(&event, false)) {
+                state = PROGRAM_FINISHED;
+                event.time_ms = last_event_ms;
+                finished = true;
+            } else {
+                int64_t due_us = origin_us + (int64_t)event.time_ms * 1000;
+                int64_t wait_us = due_us - esp_timer_get_time();
+                if (wait_us <= 0) {
+                    cursor_next(&event, true);
+                    last_event_ms = event.time_ms;
+                    fire = true;
+                } else {
+                    esp_timer_start_once(wake_timer, wait_us);
+                }
+            }
+        }
+        xSemaphoreGive(program_lock);
+
+        if (fire) {
+            /* Reported first: the report carries the event time, the cue takes a while */
+            report(id, PROGRAM_RUNNING, event.kind, event.rep, event.time_ms);
+            play_cue(event.kind);
+            continue;
+        }
+        if (finished) {
+            ESP_LOGI(TAG, "Program %u finished", id);
+            report(id, PROGRAM_FINISHED, PROGRAM_NO_EVENT, 0, event.time_ms);
+            continue;
+        }
+        ulTaskNotifyTake(pdTRUE, portMAX_DELAY);
+    }
+}
+
+void interval_program_init(program_progress_cb_t progress_cb)
+{
+    report = progress_cb;
+    program_lock = xSemaphoreCreateMutex();
+
+    const esp_timer_create_args_t timer_args = { .callback = wake_timer_cb, .name = "program" };
+    ESP_ERROR_CHECK(esp_timer_create(&timer_args, &wake_timer));
+    xTaskCreate(program_task, "program", PROGRAM_TASK_STACK, NULL, PROGRAM_TASK_PRIORITY, &program_task_handle);
+}
+
+void interval_program_load(uint8_t program_id, uint32_t prestart_ms, uint32_t interval_ms,
+                           uint32_t pacer_ms, uint32_t total_ms, uint8_t countdown)
+{
+    xSemaphoreTake(program_lock, portMAX_DELAY);
+    program = (program_t){
+        .id = program_id,
+        .prestart_ms = prestart_ms,
+        .interval_ms = interval_ms,
+        .pacer_ms = pacer_ms,
+        .reps = interval_ms > 0 && total_ms > prestart_ms ? (total_ms - prestart_ms) / interval_ms : 0,
+        .countdown = countdown,
+    };
+    state = PROGRAM_LOADED;
+    last_event_ms = 0;
+    cursor_reset();
+    xSemaphoreGive(program_lock);
+    xTaskNotifyGive(program_task_handle);
+
+    ESP_LOGI(TAG, "Program %u loaded: prestart %lu ms, %u x %lu ms, pacer %lu ms",
+             program_id, prestart_ms, program.reps, interval_ms, pacer_ms);
+    report(program_id, PROGRAM_LOADED, PROGRAM_NO_EVENT, 0, 0);
+}
+
+void interval_program_control(uint8_t program_id, uint8_t action, uint32_t program_ms, uint32_t at_device_ms)
+{
+    xSemaphoreTake(program_lock, portMAX_DELAY);
+    if (program_id != program.id) {
+        xSemaphoreGive(program_lock);
+        ESP_LOGW(TAG, "Command for program %u ignored (program %u loaded)", program_id, program.id);
+        return;
+    }
+
+    int64_t at_us = device_time_us(at_device_ms, esp_timer_get_time());
+    switch (action) {
+    case PROGRAM_START: {
+        /* Events before the start time were gone through before (a resumed task) */
+        program_event_t event;
+        cursor_reset();
+        while (cursor_next(&event, false) && event.time_ms < program_ms) cursor_next(&event, true);
+    }   /* fall through */
+    case PROGRAM_RESUME:
+        origin_us = at_us - (int64_t)program_ms * 1000;
+        state = PROGRAM_RUNNING;
+        break;
+    case PROGRAM_PAUSE:
+        state = PROGRAM_PAUSED;
+        break;
+    case PROGRAM_STOP:
+        state = PROGRAM_IDLE;
+        break;
+    default:
+        xSemaphoreGive(program_lock);
+        return;
+    }
+    uint8_t current = state;
+    xSemaphoreGive(program_lock);
+    xTaskNotifyGive(program_task_handle);
+
+    report(program_id, current, PROGRAM_NO_EVENT, 0, program_ms);
+}
@@ -0,0 +1,72 @@
+/**
+ * @file interval_program.h
+ * @brief Interval program executor: runs a task's countdown cues, send-offs,
+ * pacer and end on the device clock, independent of the BLE link
+ */
+
+#ifndef INTERVAL_PROGRAM_H
+#define INTERVAL_PROGRAM_H
+
+#include <stdint.h>
+
+/* --- Program Actions (mirrors companion-app/telemetry_protocol.py) --- */
+#define PROGRAM_STOP          0
+#define PROGRAM_START         1
+#define PROGRAM_PAUSE         2
+#define PROGRAM_RESUME        3
+
+/* --- Program States --- */
+#define PROGRAM_IDLE          0
+#define PROGRAM_LOADED        1
+#define PROGRAM_RUNNING       2
+#define PROGRAM_PAUSED        3
+#define PROGRAM_FINISHED      4
+
+/* --- Event Kinds (index in companion-app/interval_timeline.py EVENT_KINDS) --- */
+#define PROGRAM_EVENT_COUNTDOWN 0
+#define PROGRAM_EVENT_START   1
+#define PROGRAM_EVENT_SENDOFF 2
+#define PROGRAM_EVENT_PACER   3
+#define PROGRAM_EVENT_END     4
+#define PROGRAM_NO_EVENT      0xFF             /**< Progress report of a state change */
+
+/**
+ * @brief Progress callback, invoked from the executor task
+ * @param program_id Id of the program the report is about
+ * @param state Current program state
+ * @param kind Event that fired, PROGRAM_NO_EVENT for a state change
+ * @param rep 1-based rep of the event (0 before the start)
+ * @param program_ms Program time of the event or state change in milliseconds
+ */
+typedef void (*program_progress_cb_t)(uint8_t program_id, uint8_t state, uint8_t kind,
+                                      uint16_t rep, uint32_t program_ms);
+
+/**
+ * @brief Creates the executor task and its esp_timer
+ * @param progress_cb Receives every event and state change (e.g. to notify the client)
+ */
+void interval_program_init(program_progress_cb_t progress_cb);
+
+/**
+ * @brief Replaces the loaded program; it waits for PROGRAM_START
+ * @param program_id Client chosen id, echoed in progress reports
+ * @param prestart_ms Countdown before the first send-off
+ * @param interval_ms Send-off interval, 0 for a task without a time limit
+ * @param pacer_ms Pacer period inside a rep, 0 for none
+ * @param total_ms Program time of the end (0 for a task without a time limit)
+ * @param countdown Short cues in the last seconds before each boundary
+ */
+void interval_program_load(uint8_t program_id, uint32_t prestart_ms, uint32_t interval_ms,
+                           uint32_t pacer_ms, uint32_t total_ms, uint8_t countdown);
+
+/**
+ * @brief Starts, pauses, resumes or stops the loaded program
+ * Commands for another program id are ignored.
+ * @param program_id Id of the loaded program
+ * @param action PROGRAM_START, PROGRAM_PAUSE, PROGRAM_RESUME or PROGRAM_STOP
+ * @param program_ms Program time at the moment of the action
+ * @param at_device_ms Device time (esp_timer ms) of the action, 0 for now
+ */
+void interval_program_control(uint8_t program_id, uint8_t action, uint32_t program_ms, uint32_t at_device_ms);
+
+#endif /* INTERVAL_PROGRAM_H */
@@ -10,6 +10,7 @@
 #include "ble_app.h"
 #include "SEN0344.h"
 #include "buzzer.h"
+#include "interval_program.h"
 #include "esp_timer.h" 
 
 #define TAG "MAIN"
@@ -116,6 +117,7 @@ void ble_connection_status(bool connected)
         
         ESP_LOGE(TAG, "BLE Disconnected! Measuring downtime...");
         play_bluetooth_disconnected_sound();
+        /* The legacy pacer stops; an interval program keeps running on the device clock */
         stop_pace_timer(); 
     }
 }
@@ -175,11 +177,15 @@ void app_main(void)
     /* Create the software timer for pace marking */
     xPaceTimer = xTimerCreate("PaceTimer", pdMS_TO_TICKS(1000), pdTRUE, (void *)0, vPaceTimerCallback);
 
+    /* Interval programs uploaded by the client report their progress over BLE */
+    interval_program_init(ble_app_send_program_progress);
+
     /* Start system services */
     play_power_on_sound();
     ble_app_start();
     
     /* --- Main Execution Loop --- */
+    TickType_t last_wake = xTaskGetTickCount();
     while (1) {
         /* 1. Read and Process Battery Level */
         int adc_raw = 0;
@@ -195,17 +201,17 @@ void app_main(void)
             battery.percentage = percentage;
         }
 
-        /* 2. Read Sensor Data and Transmit via BLE */
+        /* 2. Read Sensor Data, record it and transmit via BLE when connected */
         SEN0344_data_t sensor_data;
         if (SEN0344_read_data(I2C_MASTER_NUM, &sensor_data) == ESP_OK) {
-            if (ble_ready) {
-                ble_app_send_data(sensor_data.bpm, 
-                                  sensor_data.spo2, 
-                                  battery.percentage, 
-                                  battery.voltage);
-            }
+            /* Always recorded: samples taken while disconnected are backfilled on reconnect */
+            ble_app_send_data(sensor_data.bpm, 
+                              sensor_data.spo2, 
+                              battery.percentage, 
+                              battery.voltage);
         }
 
-        vTaskDelay(pdMS_TO_TICKS(1000));
+        /* Fixed-rate schedule: the period is set by the client through CMD_SET_RATE */
+        vTaskDelayUntil(&last_wake, pdMS_TO_TICKS(ble_app_sample_period_ms()));
     }
 }
\ No newline at end of file